@@ -3,8 +3,27 @@ import threading
 
 from fastapi import FastAPI
 
-from alws import routers
+from alws import database, jobs, routers
+from alws.build_status import StartedTasksBuffer, set_started_tasks_buffer
+from alws.config import settings
+from alws.crud import build_node
+from alws.repository_pool import (
+    RepositoryPoolRefiller,
+    set_repository_pool_refiller,
+)
 from alws.test_scheduler import TestTaskScheduler
+from alws.utils.artifact_cache import (
+    create_artifact_cache,
+    set_artifact_cache,
+)
+from alws.utils.heartbeats import (
+    HeartbeatFlusher,
+    create_heartbeat_store,
+    set_heartbeat_store,
+)
+from alws.utils.job_queue import set_job_queue
+from alws.utils.pulp_client import close_pulp_session, open_pulp_session
+from alws.utils.task_notifier import create_task_notifier, set_task_notifier
 
 
 ROUTERS = [importlib.import_module(f'alws.routers.{module}')
@@ -14,6 +33,14 @@ app = FastAPI(
     prefix='/api/v1/'
 )
 scheduler = None
+job_queue = None
+job_workers = None
+task_notifier = None
+heartbeat_store = None
+heartbeat_flusher = None
+started_tasks_buffer = None
+repository_pool_refiller = None
+artifact_cache = None
 terminate_event = threading.Event()
 graceful_terminate_event = threading.Event()
 
@@ -21,14 +48,67 @@ graceful_terminate_event = threading.Event()
 @app.on_event('startup')
 async def startup():
     global scheduler, terminate_event, graceful_terminate_event
+    global job_queue, job_workers, task_notifier
+    global heartbeat_store, heartbeat_flusher, repository_pool_refiller
+    global artifact_cache, started_tasks_buffer
     scheduler = TestTaskScheduler(terminate_event, graceful_terminate_event)
     scheduler.start()
+    await open_pulp_session()
+    artifact_cache = create_artifact_cache()
+    set_artifact_cache(artifact_cache)
+    task_notifier = create_task_notifier()
+    await task_notifier.start()
+    set_task_notifier(task_notifier)
+    heartbeat_store = create_heartbeat_store()
+    if heartbeat_store is not None:
+        set_heartbeat_store(heartbeat_store)
+        heartbeat_flusher = HeartbeatFlusher(
+            heartbeat_store,
+            build_node.save_heartbeats,
+            interval=settings.heartbeat_flush_interval,
+            expiry=settings.build_task_expiry
+        )
+        heartbeat_flusher.start()
+    started_tasks_buffer = StartedTasksBuffer(
+        interval=settings.build_status_flush_interval)
+    set_started_tasks_buffer(started_tasks_buffer)
+    started_tasks_buffer.start()
+    job_queue = jobs.create_job_queue()
+    set_job_queue(job_queue)
+    job_workers = jobs.create_worker_pool(job_queue)
+    job_workers.start()
+    if settings.repository_pool_size > 0:
+        repository_pool_refiller = RepositoryPoolRefiller(
+            settings.repository_pool_size,
+            interval=settings.repository_pool_refill_interval
+        )
+        set_repository_pool_refiller(repository_pool_refiller)
+        repository_pool_refiller.start()
 
 
 @app.on_event('shutdown')
 async def shutdown():
     global terminate_event
     terminate_event.set()
+    if repository_pool_refiller is not None:
+        set_repository_pool_refiller(None)
+        await repository_pool_refiller.stop()
+    await job_workers.stop()
+    await job_queue.close()
+    set_job_queue(None)
+    set_task_notifier(None)
+    await task_notifier.close()
+    if heartbeat_store is not None:
+        await heartbeat_flusher.stop()
+        set_heartbeat_store(None)
+        await heartbeat_store.close()
+    set_started_tasks_buffer(None)
+    await started_tasks_buffer.stop()
+    set_artifact_cache(None)
+    if artifact_cache is not None:
+        await artifact_cache.close()
+    await close_pulp_session()
+    await database.engine.dispose()
 
 
 for module in ROUTERS:
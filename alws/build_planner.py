@@ -13,12 +13,30 @@ from alws.errors import DataNotFoundError
 from alws.config import settings
 from alws.schemas import build_schema
 from alws.constants import BuildTaskStatus, BuildTaskRefType
+from alws.repository_pool import PoolBucket, claim_pooled_repositories
 from alws.utils.pulp_client import PulpClient
+from alws.utils.repo_provisioning import (
+    RepositoryProvisioner,
+    RepositoryRequest,
+)
 from alws.utils.modularity import ModuleWrapper, calc_dist_macro
 from alws.utils.gitea import download_modules_yaml, GiteaClient
 
 
-__all__ = ['BuildPlanner']
+__all__ = ['BuildPlanner', 'get_build_repo_name']
+
+
+def get_build_repo_name(
+            platform_name: str,
+            arch: str,
+            build_id: int,
+            repo_type: str,
+            is_debug: typing.Optional[bool] = False,
+            task_id: typing.Optional[int] = None
+        ) -> str:
+    suffix = 'br' if repo_type != 'build_log' else f'artifacts-{task_id}'
+    debug_suffix = 'debug-' if is_debug else ''
+    return f'{platform_name}-{arch}-{build_id}-{debug_suffix}{suffix}'
 
 
 class BuildPlanner:
@@ -59,80 +77,95 @@ class BuildPlanner:
                 f'platforms: {missing_platforms} cannot be found in database'
             )
 
-    async def create_build_repo(
+    def get_build_repo_name(
                 self,
-                pulp_client: PulpClient,
                 platform: models.Platform,
                 arch: str,
                 repo_type: str,
-                is_debug: typing.Optional[bool] = False,
-                task_id: typing.Optional[int] = None
-            ):
-        suffix = 'br' if repo_type != 'build_log' else f'artifacts-{task_id}'
-        debug_suffix = 'debug-' if is_debug else ''
-        repo_name = (
-            f'{platform.name}-{arch}-{self._build.id}-{debug_suffix}{suffix}'
-        )
-        if repo_type == 'rpm':
-            repo_url, pulp_href = await pulp_client.create_build_rpm_repo(
-                repo_name)
-            module = self._modules_by_target.get((platform.name, arch))
-            if module:
-                await pulp_client.modify_repository(
-                    pulp_href, add=[module.pulp_href]
-                )
-        else:
-            repo_url, pulp_href = await pulp_client.create_log_repo(
-                repo_name)
-        repo = models.Repository(
-            name=repo_name,
-            url=repo_url,
-            arch=arch,
-            pulp_href=pulp_href,
-            type=repo_type,
-            debug=is_debug
-        )
-        await self._db.run_sync(self.sync_append_build_repo, repo)
+                is_debug: typing.Optional[bool] = False
+            ) -> str:
+        return get_build_repo_name(
+            platform.name, arch, self._build.id, repo_type, is_debug=is_debug)
 
     def sync_append_build_repo(self, db: Session, repo: models.BuildRepo):
         self._build.repos.append(repo)
 
-    def sync_get_build_tasks(self, db: Session):
-        return self._build.tasks
+    async def claim_pooled_repos(self, repos_info: list,
+                                 repo_names: typing.List[str],
+                                 created_repos: list):
+        """
+        Takes pre-created repositories from the pool, pooled repositories
+        keep their names instead of the build ones.
+        """
+        indexes_by_bucket = collections.defaultdict(list)
+        for index, (platform, arch, repo_type, is_debug) in enumerate(
+                repos_info):
+            bucket = PoolBucket(platform.id, arch, repo_type, is_debug)
+            indexes_by_bucket[bucket].append(index)
+        for bucket, indexes in indexes_by_bucket.items():
+            pooled_repos = await claim_pooled_repositories(
+                self._db, bucket, len(indexes))
+            for index, pooled_repo in zip(indexes, pooled_repos):
+                repo_names[index] = pooled_repo.name
+                created_repos[index] = (pooled_repo.url, pooled_repo.pulp_href)
 
     async def init_build_repos(self):
+        # (platform, arch, type, is_debug) of every build repository,
+        # build log repositories are created by build_done of their tasks
+        repos_info = []
+        for platform in self._platforms:
+            for arch in ['src'] + self._request_platforms[platform.name]:
+                repos_info.append((platform, arch, 'rpm', False))
+                if arch == 'src':
+                    continue
+                repos_info.append((platform, arch, 'rpm', True))
+        repo_names = [
+            self.get_build_repo_name(platform, arch, repo_type,
+                                     is_debug=is_debug)
+            for platform, arch, repo_type, is_debug in repos_info
+        ]
+        created_repos = [None] * len(repos_info)
+        if settings.repository_pool_size > 0:
+            await self.claim_pooled_repos(repos_info, repo_names,
+                                          created_repos)
+        missing = [index for index, created in enumerate(created_repos)
+                   if created is None]
+        if missing:
+            provisioner = RepositoryProvisioner(
+                settings.pulp_host,
+                settings.pulp_user,
+                settings.pulp_password
+            )
+            provisioned = await provisioner.provision([
+                RepositoryRequest(name=repo_names[index], content_type='rpm')
+                for index in missing
+            ])
+            for index, repo in zip(missing, provisioned):
+                created_repos[index] = repo
         pulp_client = PulpClient(
             settings.pulp_host,
             settings.pulp_user,
             settings.pulp_password
         )
-        tasks = []
-        for platform in self._platforms:
-            for arch in ['src'] + self._request_platforms[platform.name]:
-                tasks.append(self.create_build_repo(
-                    pulp_client,
-                    platform,
-                    arch,
-                    'rpm'
-                ))
-                if arch == 'src':
-                    continue
-                tasks.append(self.create_build_repo(
-                    pulp_client,
-                    platform,
-                    arch,
-                    'rpm',
-                    is_debug=True
+        modify_tasks = []
+        for repo_name, repo_info, (repo_url, pulp_href) in zip(
+                repo_names, repos_info, created_repos):
+            platform, arch, repo_type, is_debug = repo_info
+            module = self._modules_by_target.get((platform.name, arch))
+            if module:
+                modify_tasks.append(pulp_client.modify_repository(
+                    pulp_href, add=[module.pulp_href]
                 ))
-        for task in await self._db.run_sync(self.sync_get_build_tasks):
-            tasks.append(self.create_build_repo(
-                pulp_client,
-                task.platform,
-                task.arch,
-                'build_log',
-                task_id=task.id
-            ))
-        await asyncio.gather(*tasks)
+            repo = models.Repository(
+                name=repo_name,
+                url=repo_url,
+                arch=arch,
+                pulp_href=pulp_href,
+                type=repo_type,
+                debug=is_debug
+            )
+            await self._db.run_sync(self.sync_append_build_repo, repo)
+        await asyncio.gather(*modify_tasks)
 
     async def add_linked_builds(self, linked_build):
         self._build.linked_builds.append(linked_build)
@@ -180,8 +213,9 @@ class BuildPlanner:
                 module.set_arch_list(
                     self._request_platforms[platform.name]
                 )
+                rendered_template = module.render()
                 module_pulp_href, sha256 = await pulp_client.create_module(
-                    module.render())
+                    rendered_template)
                 db_module = models.RpmModule(
                     name=module.name,
                     version=str(module.version),
@@ -189,7 +223,8 @@ class BuildPlanner:
                     context=module.context,
                     arch=module.arch,
                     pulp_href=module_pulp_href,
-                    sha256=sha256
+                    sha256=sha256,
+                    template=rendered_template
                 )
                 self._modules_by_target[(platform.name, arch)] = db_module
         self._db.add_all(list(self._modules_by_target.values()))
@@ -0,0 +1,284 @@
+import datetime
+import time
+import typing
+
+import sqlalchemy
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from alws import models
+from alws.config import settings
+from alws.constants import BuildTaskStatus
+from alws.utils.scheduling import (
+    ReadyTask,
+    SchedulingPolicy,
+    get_scheduling_policy,
+)
+
+
+__all__ = [
+    'claim_ready_task',
+    'enqueue_ready_tasks',
+    'get_expired_tasks_query',
+    'get_ready_task_claim_query',
+    'get_requeue_due_arches',
+    'remove_ready_task',
+    'requeue_expired_tasks',
+    'update_ready_tasks_priority',
+]
+
+
+# monotonic time of the last requeue of expired tasks by arch
+REQUEUED_AT: typing.Dict[str, float] = {}
+# running tasks column and model with priority for fair share groups
+FAIR_SHARE_GROUPS = {
+    'user_id': (models.Build.user_id, models.User),
+    'platform_id': (models.BuildTask.platform_id, models.Platform),
+    'build_id': (models.BuildTask.build_id, models.Build),
+}
+
+
+def get_task_priority():
+    return (
+        models.Build.priority + models.User.priority +
+        models.Platform.priority
+    )
+
+
+def get_share_weight(priority: int) -> float:
+    # priority of a user, platform or build doubles as its fair share
+    # weight: group with priority 1 gets twice as many build nodes
+    return 1.0 + max(priority, 0)
+
+
+def inline_status(status: BuildTaskStatus):
+    # Status is rendered inline to match the partial
+    # build_tasks_pending_arch_id_idx index with prepared statements too
+    return sqlalchemy.bindparam(
+        f'status_{status.name.lower()}', int(status), literal_execute=True)
+
+
+def get_ready_task_claim_query(
+            supported_arches: typing.List[str],
+            use_priority: bool = True
+        ):
+    order = [models.BuildTaskReady.build_task_id]
+    if use_priority:
+        order.insert(0, models.BuildTaskReady.priority.desc())
+    # Rows locked by concurrent build nodes are skipped, so every node
+    # claims its own task instead of waiting for the others' locks
+    return select(models.BuildTaskReady.build_task_id).where(
+        models.BuildTaskReady.arch.in_(supported_arches)
+    ).order_by(*order).limit(1).with_for_update(skip_locked=True)
+
+
+def get_ready_candidates_query(
+            supported_arches: typing.List[str],
+            group_key: str
+        ):
+    group_column = getattr(models.BuildTaskReady, group_key)
+    return select(
+        models.BuildTaskReady.build_task_id,
+        models.BuildTaskReady.arch,
+        models.BuildTaskReady.priority,
+        models.BuildTaskReady.build_id,
+        models.BuildTaskReady.user_id,
+        models.BuildTaskReady.platform_id,
+    ).where(
+        models.BuildTaskReady.arch.in_(supported_arches)
+    ).distinct(group_column).order_by(
+        group_column,
+        models.BuildTaskReady.priority.desc(),
+        models.BuildTaskReady.build_task_id
+    )
+
+
+def get_expired_tasks_query(
+            supported_arches: typing.List[str],
+            ts_expired: datetime.datetime,
+            alive_task_ids: typing.Optional[typing.Iterable[int]] = None
+        ):
+    query = select(models.BuildTask.id).where(
+        models.BuildTask.status == inline_status(BuildTaskStatus.STARTED),
+        models.BuildTask.arch.in_(supported_arches),
+        models.BuildTask.ts < ts_expired,
+    )
+    if alive_task_ids:
+        # heartbeats that aren't flushed to the database yet, IDs are
+        # bound as a single array instead of a literal per task
+        query = query.where(
+            models.BuildTask.id != sqlalchemy.all_(sqlalchemy.bindparam(
+                'alive_task_ids', list(alive_task_ids),
+                type_=ARRAY(sqlalchemy.Integer)))
+        )
+    return query
+
+
+async def _enqueue_tasks(db: Session, *conditions) -> typing.List[str]:
+    ready_query = select(
+        models.BuildTask.id,
+        models.BuildTask.arch,
+        get_task_priority(),
+        models.BuildTask.build_id,
+        models.Build.user_id,
+        models.BuildTask.platform_id,
+    ).join(models.BuildTask.build).join(models.Build.user).join(
+        models.BuildTask.platform
+    ).where(~models.BuildTask.dependencies.any(), *conditions)
+    enqueued = await db.execute(
+        insert(models.BuildTaskReady).from_select(
+            ['build_task_id', 'arch', 'priority', 'build_id', 'user_id',
+             'platform_id'],
+            ready_query
+        ).on_conflict_do_nothing().returning(models.BuildTaskReady.arch)
+    )
+    return enqueued.scalars().all()
+
+
+async def enqueue_ready_tasks(
+            db: Session,
+            task_ids: typing.Optional[typing.Iterable[int]] = None,
+            build_id: typing.Optional[int] = None
+        ) -> typing.List[str]:
+    """
+    Adds idle tasks which have no dependencies left to the ready queue.
+    Returns architectures of enqueued tasks.
+    """
+    conditions = [models.BuildTask.status == BuildTaskStatus.IDLE]
+    if task_ids is not None:
+        conditions.append(models.BuildTask.id.in_(list(task_ids)))
+    if build_id is not None:
+        conditions.append(models.BuildTask.build_id == build_id)
+    return await _enqueue_tasks(db, *conditions)
+
+
+async def requeue_expired_tasks(
+            db: Session,
+            supported_arches: typing.List[str],
+            ts_expired: datetime.datetime,
+            alive_task_ids: typing.Optional[typing.Iterable[int]] = None
+        ) -> typing.List[str]:
+    """
+    Returns started tasks which build nodes stopped pinging
+    to the ready queue.
+    """
+    return await _enqueue_tasks(db, models.BuildTask.id.in_(
+        get_expired_tasks_query(
+            supported_arches, ts_expired, alive_task_ids)
+    ))
+
+
+def get_requeue_due_arches(
+            supported_arches: typing.List[str],
+            interval: float
+        ) -> typing.List[str]:
+    """
+    Returns architectures which expired tasks weren't requeued for
+    by this process during the interval and marks them requeued.
+    """
+    now = time.monotonic()
+    due_arches = [
+        arch for arch in supported_arches
+        if arch not in REQUEUED_AT or now - REQUEUED_AT[arch] >= interval
+    ]
+    for arch in due_arches:
+        REQUEUED_AT[arch] = now
+    return due_arches
+
+
+async def get_fair_share_stats(
+            db: Session,
+            group_key: str,
+            groups: typing.List[int]
+        ) -> typing.Tuple[typing.Dict[int, int], typing.Dict[int, float]]:
+    """
+    Returns numbers of running tasks and fair share weights of groups.
+    """
+    group_column, group_model = FAIR_SHARE_GROUPS[group_key]
+    running = await db.execute(
+        select(group_column, sqlalchemy.func.count(models.BuildTask.id)).join(
+            models.BuildTask.build
+        ).where(
+            models.BuildTask.status == inline_status(BuildTaskStatus.STARTED),
+            group_column.in_(groups)
+        ).group_by(group_column)
+    )
+    weights = await db.execute(
+        select(group_model.id, group_model.priority).where(
+            group_model.id.in_(groups))
+    )
+    return (
+        dict(running.all()),
+        {group: get_share_weight(priority)
+         for group, priority in weights.all()}
+    )
+
+
+async def claim_ready_task(
+            db: Session,
+            supported_arches: typing.List[str],
+            policy: typing.Optional[SchedulingPolicy] = None
+        ) -> typing.Optional[int]:
+    if policy is None:
+        policy = get_scheduling_policy(
+            settings.scheduling_policy,
+            group_key=settings.scheduling_fair_share_key
+        )
+    if policy.group_key is None:
+        claim_query = get_ready_task_claim_query(
+            supported_arches, use_priority=policy.use_priority)
+        return await _claim(db, claim_query)
+    candidates = await db.execute(
+        get_ready_candidates_query(supported_arches, policy.group_key))
+    candidates = [ReadyTask(*row) for row in candidates.all()]
+    if not candidates:
+        return
+    groups = [getattr(task, policy.group_key) for task in candidates]
+    running, weights = await get_fair_share_stats(
+        db, policy.group_key, groups)
+    policy.weights = weights
+    while candidates:
+        task = policy.select(candidates, running)
+        claim_query = select(models.BuildTaskReady.build_task_id).where(
+            models.BuildTaskReady.build_task_id == task.task_id
+        ).with_for_update(skip_locked=True)
+        task_id = await _claim(db, claim_query)
+        if task_id is not None:
+            return task_id
+        # task is taken by another build node meanwhile
+        candidates.remove(task)
+    # all candidates are taken, fall back to the next task in the queue
+    return await _claim(db, get_ready_task_claim_query(supported_arches))
+
+
+async def _claim(db: Session, claim_query) -> typing.Optional[int]:
+    claimed = await db.execute(
+        delete(models.BuildTaskReady).where(
+            models.BuildTaskReady.build_task_id ==
+            claim_query.scalar_subquery()
+        ).returning(models.BuildTaskReady.build_task_id).execution_options(
+            synchronize_session=False)
+    )
+    return claimed.scalar()
+
+
+async def update_ready_tasks_priority(db: Session, build_id: int):
+    await db.execute(
+        update(models.BuildTaskReady).where(
+            models.BuildTaskReady.build_id == build_id,
+            models.Build.id == models.BuildTaskReady.build_id,
+            models.User.id == models.BuildTaskReady.user_id,
+            models.Platform.id == models.BuildTaskReady.platform_id,
+        ).values(priority=get_task_priority()).execution_options(
+            synchronize_session=False)
+    )
+
+
+async def remove_ready_task(db: Session, task_id: int):
+    await db.execute(
+        delete(models.BuildTaskReady).where(
+            models.BuildTaskReady.build_task_id == task_id
+        ).execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,283 @@
+import asyncio
+import datetime
+import logging
+import typing
+
+import sqlalchemy
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import func
+
+from alws import database, models
+from alws.constants import BuildTaskStatus
+
+
+__all__ = [
+    'StartedTasksBuffer',
+    'get_rollup_refresh_query',
+    'get_started_tasks_buffer',
+    'get_unfinished_builds_query',
+    'is_build_finished',
+    'refresh_build_status_rollup',
+    'remove_build_status_rollup',
+    'save_started_tasks',
+    'set_started_tasks_buffer',
+    'update_build_status_rollup',
+]
+
+
+# rollup column with number of tasks in the status
+STATUS_COLUMNS = {
+    BuildTaskStatus.IDLE: 'idle',
+    BuildTaskStatus.STARTED: 'started',
+    BuildTaskStatus.COMPLETED: 'completed',
+    BuildTaskStatus.FAILED: 'failed',
+    BuildTaskStatus.EXCLUDED: 'excluded',
+}
+FINISHED_STATUSES = [
+    int(status) for status in BuildTaskStatus
+    if BuildTaskStatus.is_finished(status)
+]
+
+
+def get_rollup_refresh_query(build_id: int):
+    """
+    Counts tasks of the build by status and architecture.
+    """
+    task = models.BuildTask
+    columns = [task.build_id, task.arch]
+    for status in STATUS_COLUMNS:
+        columns.append(func.count().filter(task.status == int(status)))
+    # task timestamp is its last heartbeat, good enough
+    # for builds which rollup didn't follow from the start
+    columns.extend((
+        func.min(task.ts).filter(task.status != int(BuildTaskStatus.IDLE)),
+        func.max(task.ts).filter(task.status.in_(FINISHED_STATUSES)),
+    ))
+    return select(*columns).where(task.build_id == build_id).group_by(
+        task.build_id, task.arch)
+
+
+async def refresh_build_status_rollup(db: Session, build_id: int):
+    """
+    Recounts rollup of the build from its tasks. Called when tasks are
+    created or restarted in bulk, single task status changes go through
+    update_build_status_rollup.
+    """
+    rollup = models.BuildStatusRollup
+    # locked rows make concurrent status changes of the build wait,
+    # so the recount below sees them instead of overwriting them
+    await db.execute(
+        select(rollup.build_id).where(
+            rollup.build_id == build_id).with_for_update()
+    )
+    query = insert(rollup).from_select(
+        ['build_id', 'arch', *STATUS_COLUMNS.values(),
+         'first_started_at', 'last_finished_at'],
+        get_rollup_refresh_query(build_id)
+    )
+    await db.execute(query.on_conflict_do_update(
+        index_elements=[rollup.build_id, rollup.arch],
+        set_={
+            **{
+                column: query.excluded[column]
+                for column in STATUS_COLUMNS.values()
+            },
+            'first_started_at': func.coalesce(
+                rollup.first_started_at, query.excluded.first_started_at),
+            'last_finished_at': func.coalesce(
+                rollup.last_finished_at, query.excluded.last_finished_at),
+        }
+    ))
+
+
+async def update_build_status_rollup(
+            db: Session,
+            build_id: int,
+            arch: str,
+            old_status: int,
+            new_status: int,
+            ts: typing.Optional[datetime.datetime] = None
+        ):
+    """
+    Moves a task from old to new status in the rollup row of its
+    architecture. Should be executed in the transaction which changes
+    the task status, started tasks are counted by StartedTasksBuffer.
+    """
+    if old_status == new_status:
+        return
+    if ts is None:
+        ts = datetime.datetime.now()
+    rollup = models.BuildStatusRollup
+    old_column = STATUS_COLUMNS[BuildTaskStatus(old_status)]
+    new_column = STATUS_COLUMNS[BuildTaskStatus(new_status)]
+    values = {
+        old_column: getattr(rollup, old_column) - 1,
+        new_column: getattr(rollup, new_column) + 1,
+    }
+    if new_status == BuildTaskStatus.STARTED:
+        values['first_started_at'] = func.coalesce(
+            rollup.first_started_at, ts)
+    if BuildTaskStatus.is_finished(new_status):
+        # GREATEST ignores NULL in PostgreSQL
+        values['last_finished_at'] = func.greatest(
+            rollup.last_finished_at, ts)
+    await db.execute(
+        update(rollup).where(
+            rollup.build_id == build_id,
+            rollup.arch == arch,
+        ).values(**values).execution_options(synchronize_session=False)
+    )
+
+
+async def is_build_finished(db: Session, build_id: int) -> bool:
+    rollup = models.BuildStatusRollup
+    # buffered started tasks don't change the sum of idle and started
+    # ones, so the build state doesn't depend on the flush lag
+    unfinished = await db.execute(
+        select(func.sum(rollup.idle + rollup.started)).where(
+            rollup.build_id == build_id)
+    )
+    unfinished = unfinished.scalar()
+    return unfinished is not None and unfinished == 0
+
+
+def get_unfinished_builds_query():
+    rollup = models.BuildStatusRollup
+    # condition is rendered inline to match the partial
+    # build_status_rollup_unfinished_idx index with prepared statements too
+    return select(rollup.build_id).where(
+        rollup.idle + rollup.started > sqlalchemy.bindparam(
+            'unfinished_tasks', 0, literal_execute=True),
+    )
+
+
+async def remove_build_status_rollup(
+            db: Session,
+            build_ids: typing.List[int]
+        ):
+    await db.execute(
+        delete(models.BuildStatusRollup).where(
+            models.BuildStatusRollup.build_id.in_(build_ids)
+        ).execution_options(synchronize_session=False)
+    )
+
+
+async def save_started_tasks(
+            db: Session,
+            started_tasks: typing.Dict[
+                typing.Tuple[int, str], typing.Tuple[int, datetime.datetime]]
+        ):
+    """
+    Moves numbers of claimed tasks from idle to started in the rollup,
+    keys are build IDs and architectures, values are numbers of tasks
+    and the earliest claim time.
+    """
+    rollup = models.BuildStatusRollup
+    keys = sorted(started_tasks)
+    started_values = func.unnest(
+        sqlalchemy.cast([build_id for build_id, _ in keys],
+                        ARRAY(sqlalchemy.Integer)),
+        sqlalchemy.cast([arch for _, arch in keys],
+                        ARRAY(sqlalchemy.VARCHAR(length=50))),
+        sqlalchemy.cast([started_tasks[key][0] for key in keys],
+                        ARRAY(sqlalchemy.Integer)),
+        sqlalchemy.cast([started_tasks[key][1] for key in keys],
+                        ARRAY(sqlalchemy.DateTime)),
+    ).table_valued(
+        'build_id', 'arch', 'tasks', 'ts').render_derived(name='started_tasks')
+    async with db.begin():
+        await db.execute(
+            update(rollup).where(
+                rollup.build_id == started_values.c.build_id,
+                rollup.arch == started_values.c.arch,
+            ).values(
+                idle=rollup.idle - started_values.c.tasks,
+                started=rollup.started + started_values.c.tasks,
+                # LEAST ignores NULL in PostgreSQL
+                first_started_at=func.least(
+                    rollup.first_started_at, started_values.c.ts),
+            ).execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+
+STARTED_TASKS_BUFFER: typing.Optional['StartedTasksBuffer'] = None
+
+
+def get_started_tasks_buffer() -> typing.Optional['StartedTasksBuffer']:
+    return STARTED_TASKS_BUFFER
+
+
+def set_started_tasks_buffer(buffer: typing.Optional['StartedTasksBuffer']):
+    global STARTED_TASKS_BUFFER
+    STARTED_TASKS_BUFFER = buffer
+
+
+class StartedTasksBuffer:
+    """
+    Collects claimed build tasks and periodically counts them in
+    the rollup with a single bulk update, so build nodes claiming
+    tasks of the same build don't queue on its rollup rows.
+    """
+
+    def __init__(
+                self,
+                interval: float = 5.0,
+                session_factory: typing.Callable = database.Session
+            ):
+        self._interval = interval
+        self._session_factory = session_factory
+        self._pending: typing.Dict[
+            typing.Tuple[int, str],
+            typing.Tuple[int, datetime.datetime]
+        ] = {}
+        self._task: typing.Optional[asyncio.Task] = None
+
+    def add(self, build_id: int, arch: str,
+            ts: typing.Optional[datetime.datetime] = None):
+        self._merge({(build_id, arch): (1, ts or datetime.datetime.now())})
+
+    def _merge(self, started_tasks: typing.Dict[
+                typing.Tuple[int, str],
+                typing.Tuple[int, datetime.datetime]]):
+        for key, (tasks, ts) in started_tasks.items():
+            pending_tasks, pending_ts = self._pending.get(key, (0, ts))
+            self._pending[key] = (pending_tasks + tasks, min(pending_ts, ts))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logging.exception('Cannot flush started build tasks')
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception('Cannot flush started build tasks')
+
+    async def flush(self) -> int:
+        started_tasks, self._pending = self._pending, {}
+        if not started_tasks:
+            return 0
+        try:
+            async with self._session_factory() as db:
+                await save_started_tasks(db, started_tasks)
+        except BaseException:
+            self._merge(started_tasks)
+            raise
+        return sum(tasks for tasks, _ in started_tasks.values())
@@ -8,6 +8,26 @@ class Settings(BaseSettings):
     pulp_host: str = 'http://pulp'
     pulp_user: str = 'admin'
     pulp_password: str = 'admin'
+    pulp_connection_limit: int = 100
+    pulp_connection_limit_per_host: int = 30
+    pulp_keepalive_timeout: float = 30.0
+    pulp_dns_cache_ttl: int = 300
+    pulp_request_timeout: typing.Optional[float] = 300.0
+    pulp_connect_timeout: float = 30.0
+    pulp_read_timeout: float = 300.0
+    pulp_task_timeout: typing.Optional[float] = 3600.0
+    pulp_task_poll_min_interval: float = 0.3
+    pulp_task_poll_max_interval: float = 5.0
+    pulp_provisioning_concurrency: int = 20
+    pulp_upload_chunk_size: int = 5 * 1024 * 1024
+    pulp_upload_concurrency: int = 4
+    artifact_cache_backend: typing.Literal['redis', 'local', 'none'] = 'local'
+    artifact_cache_size: int = 1024
+    artifact_cache_ttl: float = 3600.0
+    build_done_concurrency: int = 10
+    # empty build repositories kept per platform, arch and type, 0 disables
+    repository_pool_size: int = 0
+    repository_pool_refill_interval: float = 300.0
     alts_host: str = 'http://alts-scheduler:8000'
     alts_token: str
     gitea_host: str = 'https://git.almalinux.org/api/v1/'
@@ -18,8 +38,36 @@ class Settings(BaseSettings):
 
     redis_url: str = 'redis://redis:6379'
 
+    job_queue_backend: typing.Literal['redis', 'local'] = 'redis'
+    job_workers: int = 4
+    job_max_attempts: int = 5
+    job_retry_delay: float = 10.0
+    job_idempotency_ttl: int = 86400
+    job_stale_timeout: float = 3600.0
+    job_requeue_interval: float = 300.0
+
+    task_notifier_backend: typing.Literal['redis', 'local'] = 'redis'
+    build_node_max_wait: float = 60.0
+    build_task_expiry: float = 1200.0
+    build_task_requeue_interval: float = 60.0
+    heartbeat_backend: typing.Literal['redis', 'local', 'database'] = 'redis'
+    heartbeat_flush_interval: float = 30.0
+    build_status_flush_interval: float = 5.0
+    scheduling_policy: typing.Literal[
+        'fifo', 'priority', 'fair_share'] = 'fair_share'
+    scheduling_fair_share_key: typing.Literal[
+        'user_id', 'platform_id', 'build_id'] = 'user_id'
+
+    builds_count_cache_ttl: float = 60.0
+
     database_url: str = 'postgresql+asyncpg://postgres:password@db/almalinux-bs'
     sync_database_url: str = 'postgresql+psycopg2://postgres:password@db/almalinux-bs'
+    database_pool: typing.Literal['null', 'queue'] = 'queue'
+    database_pool_size: int = 10
+    database_max_overflow: int = 20
+    database_pool_timeout: float = 30.0
+    database_pool_recycle: int = 1800
+    database_pool_pre_ping: bool = True
 
     github_client: str
     github_client_secret: str
@@ -5,7 +5,8 @@ from collections import namedtuple
 
 
 __all__ = ['BuildTaskStatus', 'ReleaseStatus', 'TestTaskStatus',
-           'BuildTaskRefType', 'SignStatus', 'RepoType', 'debuginfo_regex']
+           'BuildTaskRefType', 'SignStatus', 'JobStatus', 'RepoType',
+           'debuginfo_regex']
 
 
 class BuildTaskStatus(enum.IntEnum):
@@ -42,6 +43,13 @@ class SignStatus(enum.IntEnum):
     FAILED = 4
 
 
+class JobStatus(enum.IntEnum):
+    QUEUED = 1
+    RUNNING = 2
+    COMPLETED = 3
+    FAILED = 4
+
+
 class BuildTaskRefType(enum.IntEnum):
     GIT_BRANCH = 1
     GIT_TAG = 2
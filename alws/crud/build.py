@@ -1,4 +1,8 @@
+import asyncio
+import collections
+import datetime
 import logging
+import time
 import typing
 
 import sqlalchemy
@@ -7,12 +11,20 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.sql.expression import func
 
-from alws import models
+from alws import build_scheduler, build_status, models
 from alws.build_planner import BuildPlanner
 from alws.config import settings
 from alws.errors import DataNotFoundError
 from alws.schemas import build_schema
 from alws.utils.pulp_client import PulpClient
+from alws.utils.task_notifier import notify_build_tasks_ready
+
+
+BUILDS_PAGE_SIZE = 10
+BUILDS_REMOVAL_BATCH_SIZE = 100
+BUILDS_COUNT_CACHE_SIZE = 256
+# search parameters JSON -> (expiration time, number of builds)
+BUILDS_COUNT_CACHE: typing.Dict[str, typing.Tuple[float, int]] = {}
 
 
 async def create_build(
@@ -33,29 +45,138 @@ async def create_build(
         if build.mock_options:
             planner.add_mock_options(build.mock_options)
         db_build = planner.create_build()
+        db_build.priority = build.priority
         db.add(db_build)
         await db.flush()
         await db.refresh(db_build)
         await planner.init_build_repos()
+        await db.flush()
+        await build_status.refresh_build_status_rollup(db, db_build.id)
+        ready_arches = await build_scheduler.enqueue_ready_tasks(
+            db, build_id=db_build.id)
         await db.commit()
+    await notify_build_tasks_ready(ready_arches)
     # TODO: this is ugly hack for now
     return await get_builds(db, db_build.id)
 
 
+async def update_build_priority(
+            db: Session,
+            build_id: int,
+            priority: int
+        ) -> models.Build:
+    async with db.begin():
+        db_build = await db.execute(select(models.Build).where(
+            models.Build.id == build_id).with_for_update())
+        db_build = db_build.scalars().first()
+        if db_build is None:
+            raise DataNotFoundError(f'Build with {build_id=} is not found')
+        db_build.priority = priority
+        await db.flush()
+        await build_scheduler.update_ready_tasks_priority(db, build_id)
+        await db.commit()
+    return await get_builds(db, build_id)
+
+
+def get_build_search_conditions(
+            search_params: build_schema.BuildSearch) -> list:
+    """
+    Returns filters of builds. Task, ref and artifact filters are
+    EXISTS subqueries of a single task, so builds aren't multiplied
+    by their tasks and artifacts.
+    """
+    conditions = []
+    task_conditions = []
+    if search_params.project is not None:
+        task_conditions.append(models.BuildTask.ref.has(
+            models.BuildTaskRef.url.like(f'%/{search_params.project}%')))
+    if search_params.created_by is not None:
+        conditions.append(models.Build.user_id == search_params.created_by)
+    if search_params.ref is not None:
+        task_conditions.append(models.BuildTask.ref.has(sqlalchemy.or_(
+            models.BuildTaskRef.url.like(f'%{search_params.ref}%'),
+            models.BuildTaskRef.git_ref.like(f'%{search_params.ref}%'),
+        )))
+    if search_params.platform_id is not None:
+        task_conditions.append(
+            models.BuildTask.platform_id == search_params.platform_id)
+    if search_params.build_task_arch is not None:
+        task_conditions.append(
+            models.BuildTask.arch == search_params.build_task_arch)
+    if search_params.is_package_filter:
+        # NEVRA is stored with artifacts, see alws.utils.nevra
+        package_conditions = [
+            getattr(models.BuildTaskArtifact, field) == value
+            for field, value in search_params.dict().items()
+            if field.startswith('rpm_') and value is not None
+        ]
+        task_conditions.append(models.BuildTask.artifacts.any(sqlalchemy.and_(
+            models.BuildTaskArtifact.type == 'rpm',
+            *package_conditions,
+        )))
+    if search_params.released is not None:
+        conditions.append(models.Build.released == search_params.released)
+    if search_params.signed is not None:
+        conditions.append(models.Build.signed == search_params.signed)
+    if search_params.finished is not None:
+        unfinished_ids = build_status.get_unfinished_builds_query()
+        if search_params.finished:
+            conditions.append(models.Build.id.notin_(unfinished_ids))
+        else:
+            conditions.append(models.Build.id.in_(unfinished_ids))
+    if task_conditions:
+        conditions.append(models.Build.tasks.any(
+            sqlalchemy.and_(*task_conditions)))
+    return conditions
+
+
+async def get_builds_count(
+            db: Session,
+            search_params: typing.Optional[build_schema.BuildSearch],
+            conditions: list
+        ) -> int:
+    # counting is the slowest part of a page, it is cached for a while
+    # since the total doesn't have to be exact
+    cache_key = search_params.json() if search_params is not None else ''
+    now = time.monotonic()
+    cached = BUILDS_COUNT_CACHE.get(cache_key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    total_builds = await db.execute(
+        select(func.count(models.Build.id)).where(*conditions))
+    total_builds = total_builds.scalar()
+    if len(BUILDS_COUNT_CACHE) >= BUILDS_COUNT_CACHE_SIZE:
+        for key, (expires_at, _) in list(BUILDS_COUNT_CACHE.items()):
+            if expires_at <= now:
+                del BUILDS_COUNT_CACHE[key]
+        if len(BUILDS_COUNT_CACHE) >= BUILDS_COUNT_CACHE_SIZE:
+            BUILDS_COUNT_CACHE.clear()
+    BUILDS_COUNT_CACHE[cache_key] = (
+        now + settings.builds_count_cache_ttl, total_builds)
+    return total_builds
+
+
+def get_builds_page_query(
+            conditions: list,
+            page_number: typing.Optional[int] = None,
+            last_build_id: typing.Optional[int] = None
+        ):
+    query = select(models.Build.id).where(*conditions).order_by(
+        models.Build.id.desc()).limit(BUILDS_PAGE_SIZE)
+    if last_build_id is not None:
+        # keyset pagination reads only the rows of the page
+        return query.where(models.Build.id < last_build_id)
+    return query.offset(BUILDS_PAGE_SIZE * (page_number - 1))
+
+
 async def get_builds(
             db: Session,
             build_id: typing.Optional[int] = None,
             page_number: typing.Optional[int] = None,
             search_params: build_schema.BuildSearch = None,
+            last_build_id: typing.Optional[int] = None,
         ) -> typing.Union[typing.List[models.Build], dict]:
-    query = select(models.Build).join(
-        models.Build.tasks,
-    ).join(
-        models.BuildTask.ref,
-    ).join(
-        models.BuildTask.artifacts,
-        isouter=True,
-    ).order_by(models.Build.id.desc()).options(
+    query = select(models.Build).order_by(models.Build.id.desc()).options(
         selectinload(models.Build.tasks).selectinload(
             models.BuildTask.platform),
         selectinload(models.Build.tasks).selectinload(models.BuildTask.ref),
@@ -63,165 +184,291 @@ async def get_builds(
         selectinload(models.Build.tasks).selectinload(
             models.BuildTask.artifacts),
         selectinload(models.Build.linked_builds)
-    ).distinct(models.Build.id)
-
-    pulp_params = {
-        'fields': ['pulp_href'],
-    }
-    pulp_client = PulpClient(
-        settings.pulp_host,
-        settings.pulp_user,
-        settings.pulp_password,
     )
-
-    if page_number:
-        query = query.slice(10 * page_number - 10, 10 * page_number)
     if build_id is not None:
-        query = query.where(models.Build.id == build_id)
+        result = await db.execute(query.where(models.Build.id == build_id))
+        return result.scalars().first()
+    conditions = []
     if search_params is not None:
-        if search_params.project is not None:
-            query = query.filter(models.BuildTaskRef.url.like(
-                f'%/{search_params.project}%'))
-        if search_params.created_by is not None:
-            query = query.filter(
-                models.Build.user_id == search_params.created_by)
-        if search_params.ref is not None:
-            query = query.filter(sqlalchemy.or_(
-                models.BuildTaskRef.url.like(f'%{search_params.ref}%'),
-                models.BuildTaskRef.git_ref.like(f'%{search_params.ref}%'),
-            ))
-        if search_params.platform_id is not None:
-            query = query.filter(
-                models.BuildTask.platform_id == search_params.platform_id)
-        if search_params.build_task_arch is not None:
-            query = query.filter(
-                models.BuildTask.arch == search_params.build_task_arch)
-        if search_params.is_package_filter:
-            pulp_params.update({
-                key.replace('rpm_', ''): value
-                for key, value in search_params.dict().items()
-                if key.startswith('rpm_') and value is not None
-            })
-            pulp_hrefs = await pulp_client.get_rpm_packages(pulp_params)
-            pulp_hrefs = [row['pulp_href'] for row in pulp_hrefs]
-            query = query.filter(sqlalchemy.and_(
-                models.BuildTaskArtifact.href.in_(pulp_hrefs),
-                models.BuildTaskArtifact.type == 'rpm',
-            ))
-        if search_params.released is not None:
-            query = query.filter(
-                models.Build.released == search_params.released)
-        if search_params.signed is not None:
-            query = query.filter(models.Build.signed == search_params.signed)
+        conditions = get_build_search_conditions(search_params)
+    is_paginated = page_number or last_build_id is not None
+    if is_paginated:
+        query = query.where(models.Build.id.in_(get_builds_page_query(
+            conditions, page_number=page_number,
+            last_build_id=last_build_id)))
+    else:
+        query = query.where(*conditions)
     result = await db.execute(query)
-    if build_id:
-        return result.scalars().first()
-    elif page_number:
-        total_builds = await db.execute(func.count(models.Build.id))
-        total_builds = total_builds.scalar()
-        return {'builds': result.scalars().all(),
-                'total_builds': total_builds,
-                'current_page': page_number}
-    return result.scalars().all()
-
-
-async def remove_build_job(db: Session, build_id: int) -> bool:
-    query_bj = select(models.Build).where(
-        models.Build.id == build_id).options(
-        selectinload(models.Build.tasks).selectinload(
-            models.BuildTask.artifacts),
-        selectinload(models.Build.repos),
-        selectinload(models.Build.tasks).selectinload(
-            models.BuildTask.test_tasks).selectinload(
-            models.TestTask.artifacts)
+    builds = result.scalars().all()
+    if not is_paginated:
+        return builds
+    return {
+        'builds': builds,
+        'total_builds': await get_builds_count(
+            db, search_params, conditions),
+        'current_page': page_number,
+        'last_build_id': (
+            builds[-1].id if len(builds) == BUILDS_PAGE_SIZE else None),
+    }
+
+
+async def get_builds_summary(
+            db: Session,
+            page_number: typing.Optional[int] = None,
+            search_params: build_schema.BuildSearch = None,
+            last_build_id: typing.Optional[int] = None,
+        ) -> dict:
+    """
+    Returns a page of builds with numbers of their tasks by platform,
+    arch and status. Rows are read without ORM objects, so list views
+    don't load every task, ref and artifact of a build.
+    """
+    conditions = []
+    if search_params is not None:
+        conditions = get_build_search_conditions(search_params)
+    page_query = get_builds_page_query(
+        conditions, page_number=page_number, last_build_id=last_build_id)
+    builds = await db.execute(
+        select(
+            models.Build.id,
+            models.Build.created_at,
+            models.Build.priority,
+            models.Build.released,
+            models.Build.signed,
+            models.User.id.label('user_id'),
+            models.User.username,
+            models.User.email,
+        ).join(models.Build.user).where(
+            models.Build.id.in_(page_query)
+        ).order_by(models.Build.id.desc())
     )
-    repos = []
-    repo_ids = []
-    build_task_ids = []
-    build_task_artifact_ids = []
-    build_task_ref_ids = []
-    test_task_ids = []
-    test_task_artifact_ids = []
+    builds = builds.all()
+    build_ids = [build.id for build in builds]
+    tasks_counts = await db.execute(
+        select(
+            models.BuildTask.build_id,
+            models.Platform.name,
+            models.BuildTask.arch,
+            models.BuildTask.status,
+            func.count(models.BuildTask.id),
+        ).join(models.BuildTask.platform).where(
+            models.BuildTask.build_id.in_(build_ids)
+        ).group_by(
+            models.BuildTask.build_id,
+            models.Platform.name,
+            models.BuildTask.arch,
+            models.BuildTask.status,
+        ).order_by(
+            models.Platform.name,
+            models.BuildTask.arch,
+            models.BuildTask.status,
+        )
+    )
+    tasks_by_build = collections.defaultdict(list)
+    for build_id, platform, arch, status, count in tasks_counts.all():
+        tasks_by_build[build_id].append({
+            'platform': platform,
+            'arch': arch,
+            'status': status,
+            'count': count,
+        })
+    return {
+        'builds': [
+            {
+                'id': build.id,
+                'created_at': build.created_at,
+                'user': {
+                    'id': build.user_id,
+                    'username': build.username,
+                    'email': build.email,
+                },
+                'priority': build.priority,
+                'released': build.released,
+                'signed': build.signed,
+                'tasks_count': sum(
+                    item['count'] for item in tasks_by_build[build.id]),
+                'tasks': tasks_by_build[build.id],
+            }
+            for build in builds
+        ],
+        'total_builds': await get_builds_count(
+            db, search_params, conditions),
+        'current_page': page_number,
+        'last_build_id': (
+            build_ids[-1] if len(build_ids) == BUILDS_PAGE_SIZE else None),
+    }
+
+
+async def delete_builds(
+            db: Session,
+            build_ids: typing.List[int]
+        ) -> typing.List[dict]:
+    """
+    Deletes builds with their tasks, artifacts, test tasks and
+    repositories. Every table is cleaned with a single statement
+    whatever the number of builds is. Returns Pulp repositories of
+    deleted builds, they should be removed after commit, see
+    remove_pulp_repositories.
+    """
+    task_ids = select(models.BuildTask.id).where(
+        models.BuildTask.build_id.in_(build_ids))
+    test_task_ids = select(models.TestTask.id).where(
+        models.TestTask.build_task_id.in_(task_ids))
+    repo_ids = await db.execute(
+        select(models.BuildRepo.c.repository_id).where(
+            models.BuildRepo.c.build_id.in_(build_ids)
+        ).union(
+            select(models.TestTask.repository_id).where(
+                models.TestTask.build_task_id.in_(task_ids),
+                models.TestTask.repository_id.isnot(None),
+            )
+        )
+    )
+    repo_ids = repo_ids.scalars().all()
+    statements = (
+        delete(models.BinaryRpm).where(
+            models.BinaryRpm.build_id.in_(build_ids)),
+        delete(models.SourceRpm).where(
+            models.SourceRpm.build_id.in_(build_ids)),
+        delete(models.TestTaskArtifact).where(
+            models.TestTaskArtifact.test_task_id.in_(test_task_ids)),
+        delete(models.TestTask).where(
+            models.TestTask.build_task_id.in_(task_ids)),
+        delete(models.BuildTaskArtifact).where(
+            models.BuildTaskArtifact.build_task_id.in_(task_ids)),
+        delete(models.BuildTaskDependency).where(sqlalchemy.or_(
+            models.BuildTaskDependency.c.build_task_id.in_(task_ids),
+            models.BuildTaskDependency.c.build_task_dependency.in_(task_ids),
+        )),
+        delete(models.BuildRepo).where(
+            models.BuildRepo.c.build_id.in_(build_ids)),
+        delete(models.SignTask).where(
+            models.SignTask.build_id.in_(build_ids)),
+        delete(models.BuildDependency).where(sqlalchemy.or_(
+            models.BuildDependency.c.build_dependency.in_(build_ids),
+            models.BuildDependency.c.build_id.in_(build_ids),
+        )),
+    )
+    for statement in statements:
+        await db.execute(
+            statement.execution_options(synchronize_session=False))
+    ref_ids = await db.execute(
+        delete(models.BuildTask).where(
+            models.BuildTask.build_id.in_(build_ids)
+        ).returning(models.BuildTask.ref_id).execution_options(
+            synchronize_session=False)
+    )
+    ref_ids = set(ref_ids.scalars().all())
+    await db.execute(
+        delete(models.BuildTaskRef).where(
+            models.BuildTaskRef.id.in_(list(ref_ids)),
+            ~sqlalchemy.exists().where(
+                models.BuildTask.ref_id == models.BuildTaskRef.id),
+        ).execution_options(synchronize_session=False)
+    )
+    repos = await db.execute(
+        delete(models.Repository).where(
+            models.Repository.id.in_(repo_ids)
+        ).returning(
+            models.Repository.name,
+            models.Repository.pulp_href,
+            models.Repository.type,
+        ).execution_options(synchronize_session=False)
+    )
+    repos = [
+        {'name': name, 'pulp_href': pulp_href,
+         'content_type': 'rpm' if repo_type == 'rpm' else 'file'}
+        for name, pulp_href, repo_type in repos.all()
+    ]
+    await build_status.remove_build_status_rollup(db, build_ids)
+    await db.execute(
+        delete(models.Build).where(
+            models.Build.id.in_(build_ids)
+        ).execution_options(synchronize_session=False)
+    )
+    return repos
+
+
+async def remove_build_job(
+            db: Session,
+            build_id: int
+        ) -> typing.Optional[typing.List[dict]]:
+    """
+    Removes build from the database. Returns Pulp repositories
+    of the build or None if the build is released.
+    """
     async with db.begin():
-        build = await db.execute(query_bj)
-        build = build.scalars().first()
+        build = await db.execute(
+            select(models.Build.released).where(
+                models.Build.id == build_id).with_for_update())
+        build = build.first()
         if build is None:
             raise DataNotFoundError(f'Build with {build_id} not found')
         if build.released:
-            return False
-        for bt in build.tasks:
-            build_task_ids.append(bt.id)
-            build_task_ref_ids.append(bt.ref_id)
-            for build_artifact in bt.artifacts:
-                build_task_artifact_ids.append(build_artifact.id)
-            for tt in bt.test_tasks:
-                test_task_ids.append(tt.id)
-                repo_ids.append(tt.repository_id)
-                for test_artifact in tt.artifacts:
-                    test_task_artifact_ids.append(test_artifact.id)
-        for br in build.repos:
-            repos.append(br.pulp_href)
-            repo_ids.append(br.id)
-        pulp_client = PulpClient(
-            settings.pulp_host,
-            settings.pulp_user,
-            settings.pulp_password
-        )
-        # FIXME
-        # it seems we cannot just delete any files because
-        # https://docs.pulpproject.org/pulpcore/restapi.html#tag/Content:-Files
-        # does not content delete option, but artifact does:
-        # https://docs.pulpproject.org/pulpcore/restapi.html#operation/
-        # artifacts_delete
-        # "Remove Artifact only if it is not associated with any Content."
-        # for artifact in artifacts:
-            # await pulp_client.remove_artifact(artifact)
-        for repo in repos:
-            try:
-                await pulp_client.remove_artifact(repo, need_wait_sync=True)
-            except Exception as err:
-                logging.exception("Cannot delete repo from pulp: %s", err)
-        await db.execute(
-            delete(models.BuildRepo).where(models.BuildRepo.c.build_id == build_id)
-        )
-        await db.execute(delete(models.BinaryRpm).where(
-            models.BinaryRpm.build_id == build_id))
-        await db.execute(delete(models.SourceRpm).where(
-            models.SourceRpm.build_id == build_id))
-        await db.execute(
-            delete(models.BuildTaskArtifact).where(
-                models.BuildTaskArtifact.id.in_(build_task_artifact_ids))
-        )
-        await db.execute(
-            delete(models.TestTaskArtifact).where(
-                models.TestTaskArtifact.id.in_(test_task_artifact_ids))
-        )
-        await db.execute(
-            delete(models.TestTask).where(
-                models.TestTask.id.in_(test_task_ids))
-        )
-        await db.execute(
-            delete(models.BuildTask).where(
-                models.BuildTask.id.in_(build_task_ids))
-        )
-        await db.execute(
-            delete(models.Repository).where(
-                models.Repository.id.in_(repo_ids))
-        )
-        await db.execute(
-            delete(models.BuildTask).where(models.BuildTask.build_id == build_id)
-        )
-        await db.execute(
-            delete(models.BuildDependency).where(sqlalchemy.or_(
-                models.BuildDependency.c.build_dependency == build_id,
-                models.BuildDependency.c.build_id == build_id,
-            ))
-        )
-        await db.execute(
-            delete(models.BuildTaskRef).where(
-                models.BuildTaskRef.id.in_(build_task_ref_ids))
-        )
-        await db.execute(
-            delete(models.Build).where(models.Build.id == build_id))
+            return None
+        repos = await delete_builds(db, [build_id])
         await db.commit()
-    return True
+    return repos
+
+
+async def remove_old_builds(
+            db: Session,
+            created_before: datetime.datetime,
+            limit: int,
+            user_id: int
+        ) -> typing.Tuple[typing.List[int], typing.List[dict]]:
+    """
+    Removes up to limit finished builds of the user created before
+    the date, released builds and builds of distributions are kept. Builds are
+    removed in batches with a transaction per batch, so removal
+    doesn't lock the builds for long. Returns IDs of removed builds
+    and their Pulp repositories.
+    """
+    removed_ids = []
+    repos = []
+    while len(removed_ids) < limit:
+        batch_size = min(BUILDS_REMOVAL_BATCH_SIZE, limit - len(removed_ids))
+        async with db.begin():
+            # builds locked by a concurrent removal are skipped
+            build_ids = await db.execute(
+                select(models.Build.id).where(
+                    models.Build.user_id == user_id,
+                    models.Build.created_at < created_before,
+                    models.Build.released.isnot(True),
+                    models.Build.id.notin_(
+                        select(models.DistributionBuilds.c.build_id)),
+                    models.Build.id.notin_(
+                        build_status.get_unfinished_builds_query()),
+                ).order_by(models.Build.id).limit(batch_size).with_for_update(
+                    skip_locked=True)
+            )
+            build_ids = build_ids.scalars().all()
+            if not build_ids:
+                break
+            repos.extend(await delete_builds(db, build_ids))
+            await db.commit()
+        removed_ids.extend(build_ids)
+    return removed_ids, repos
+
+
+async def remove_pulp_repositories(repositories: typing.List[dict]):
+    """
+    Removes repositories of deleted builds and their distributions
+    from Pulp concurrently.
+    """
+    pulp_client = PulpClient(
+        settings.pulp_host,
+        settings.pulp_user,
+        settings.pulp_password
+    )
+    results = await asyncio.gather(*(
+        pulp_client.remove_repository(
+            repo['name'], repo['pulp_href'],
+            content_type=repo['content_type'])
+        for repo in repositories
+    ), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, Exception)]
+    for error in errors:
+        logging.error('Cannot delete repo from pulp: %s', error)
+    if errors:
+        raise errors[0]
@@ -1,41 +1,115 @@
+import asyncio
+import collections
 import datetime
+import hashlib
+import logging
 import typing
 
 import sqlalchemy
 from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.future import select
 from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.sql.expression import func
 
-from alws import models
+from alws import build_scheduler, build_status, models
+from alws.build_planner import get_build_repo_name
 from alws.config import settings
 from alws.constants import BuildTaskStatus
-from alws.errors import AlreadyBuiltError
+from alws.errors import AlreadyBuiltError, DataNotFoundError
 from alws.schemas import build_node_schema
+from alws.utils.heartbeats import get_heartbeat_store
 from alws.utils.modularity import ModuleWrapper
 from alws.utils.multilib import add_multilib_packages, get_multilib_packages
+from alws.utils.nevra import get_artifacts_nevra
 from alws.utils.noarch import save_noarch_packages
 from alws.utils.pulp_client import PulpClient
+from alws.utils.task_notifier import (
+    get_task_notifier,
+    notify_build_tasks_ready,
+)
+
+
+async def claim_build_task(
+            db: Session,
+            supported_arches: typing.List[str],
+            ts_expired: datetime.datetime,
+            alive_task_ids: typing.Optional[typing.Iterable[int]] = None
+        ) -> typing.Optional[typing.Tuple[int, int, str, int]]:
+    """
+    Marks the next ready task as started, returns its ID, build ID,
+    arch and previous status. The build status rollup isn't updated
+    here, so build nodes claiming tasks of the same build don't wait
+    for each other on its rows.
+    """
+    # tasks which build nodes stopped pinging are returned to the queue
+    # periodically, so they are dispatched while there is a backlog too
+    due_arches = build_scheduler.get_requeue_due_arches(
+        supported_arches, settings.build_task_requeue_interval)
+    if due_arches:
+        await build_scheduler.requeue_expired_tasks(
+            db, due_arches, ts_expired, alive_task_ids)
+    requeued = False
+    while True:
+        task_id = await build_scheduler.claim_ready_task(
+            db, supported_arches)
+        if task_id is None:
+            if requeued:
+                return
+            # the queue is empty, no need to wait for the next requeue
+            await build_scheduler.requeue_expired_tasks(
+                db, supported_arches, ts_expired, alive_task_ids)
+            requeued = True
+            continue
+        # previous status is read from the locked row in the same
+        # statement, it is needed for the build status rollup
+        claimed_task = select(
+            models.BuildTask.id, models.BuildTask.status
+        ).where(models.BuildTask.id == task_id).with_for_update().subquery(
+            'claimed_task')
+        now = datetime.datetime.now()
+        claimed = await db.execute(
+            update(models.BuildTask).where(
+                models.BuildTask.id == claimed_task.c.id,
+                claimed_task.c.status < build_scheduler.inline_status(
+                    BuildTaskStatus.COMPLETED)
+            ).values(
+                ts=now,
+                status=BuildTaskStatus.STARTED
+            ).returning(
+                models.BuildTask.id,
+                models.BuildTask.build_id,
+                models.BuildTask.arch,
+                claimed_task.c.status,
+            ).execution_options(synchronize_session=False)
+        )
+        claimed = claimed.first()
+        # task could be finished while it was waiting in the queue
+        if claimed is not None:
+            return tuple(claimed)
 
 
 async def get_available_build_task(
             db: Session,
             request: build_node_schema.RequestTask
         ) -> models.BuildTask:
+    ts_expired = datetime.datetime.now() - datetime.timedelta(
+        seconds=settings.build_task_expiry)
+    alive_task_ids = None
+    heartbeat_store = get_heartbeat_store()
+    if heartbeat_store is not None:
+        alive_task_ids = await heartbeat_store.get_alive_task_ids(
+            ts_expired.timestamp())
     async with db.begin():
-        # TODO: here should be config value
-        ts_expired = datetime.datetime.now() - datetime.timedelta(minutes=20)
-        query = ~models.BuildTask.dependencies.any()
+        claimed = await claim_build_task(
+            db, request.supported_arches, ts_expired,
+            alive_task_ids=alive_task_ids)
+        if claimed is None:
+            return
+        task_id, build_id, arch, old_status = claimed
         db_task = await db.execute(
-            select(models.BuildTask).where(query).with_for_update().filter(
-                    sqlalchemy.and_(
-                        models.BuildTask.status < BuildTaskStatus.COMPLETED,
-                        models.BuildTask.arch.in_(request.supported_arches),
-                        sqlalchemy.or_(
-                            models.BuildTask.ts < ts_expired,
-                            models.BuildTask.ts.__eq__(None)
-                        )
-                    )
-                ).options(
+            select(models.BuildTask).where(
+                models.BuildTask.id == task_id).options(
                 selectinload(models.BuildTask.ref),
                 selectinload(models.BuildTask.build).selectinload(
                     models.Build.repos),
@@ -46,17 +120,59 @@ async def get_available_build_task(
                 selectinload(models.BuildTask.build).selectinload(
                     models.Build.linked_builds).selectinload(
                     models.Build.repos)
-            ).order_by(models.BuildTask.id)
+            )
         )
         db_task = db_task.scalars().first()
-        if not db_task:
-            return
-        db_task.ts = datetime.datetime.now()
-        db_task.status = BuildTaskStatus.STARTED
         await db.commit()
+    # expired tasks are claimed again without changing their status
+    if old_status == BuildTaskStatus.IDLE:
+        buffer = build_status.get_started_tasks_buffer()
+        if buffer is not None:
+            buffer.add(build_id, arch, ts=db_task.ts)
+        else:
+            async with db.begin():
+                await build_status.update_build_status_rollup(
+                    db, build_id, arch, old_status,
+                    BuildTaskStatus.STARTED, ts=db_task.ts)
+                await db.commit()
     return db_task
 
 
+async def wait_for_build_task(
+            db: Session,
+            request: build_node_schema.RequestTask,
+            timeout: float,
+            is_disconnected: typing.Optional[
+                typing.Callable[[], typing.Awaitable[bool]]] = None
+        ) -> typing.Optional[models.BuildTask]:
+    """
+    Long-poll variant of get_available_build_task: waits up to timeout
+    seconds for a notification about tasks of supported architectures
+    instead of querying the database in a loop.
+    """
+    notifier = get_task_notifier()
+    if timeout <= 0 or notifier is None:
+        return await get_available_build_task(db, request)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        with notifier.subscribe(request.supported_arches) as tasks_ready:
+            task = await get_available_build_task(db, request)
+            remaining = deadline - loop.time()
+            if task or remaining <= 0:
+                return task
+            try:
+                await asyncio.wait_for(tasks_ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        # build node won't receive a task claimed after it went away
+        if is_disconnected and await is_disconnected():
+            return
+        if loop.time() >= deadline:
+            # tasks which timestamps have expired don't send notifications
+            return await get_available_build_task(db, request)
+
+
 def add_build_task_dependencies(db: Session, task: models.BuildTask,
                                 last_task: models.BuildTask):
     task.dependencies.append(last_task)
@@ -70,19 +186,32 @@ async def update_failed_build_items(db: Session, build_id: int):
     ).order_by(models.BuildTask.index, models.BuildTask.id)
     async with db.begin():
         last_task = None
+        restarted_ids = []
         failed_tasks = await db.execute(query)
         for task in failed_tasks.scalars():
             task.status = BuildTaskStatus.IDLE
+            task.attempt += 1
+            restarted_ids.append(task.id)
             if last_task is not None:
                 await db.run_sync(add_build_task_dependencies, task, last_task)
             last_task = task
+        await db.flush()
+        await build_status.refresh_build_status_rollup(db, build_id)
+        ready_arches = await build_scheduler.enqueue_ready_tasks(
+            db, task_ids=restarted_ids)
         await db.commit()
+    await notify_build_tasks_ready(ready_arches)
 
 
 async def ping_tasks(
             db: Session,
             task_list: typing.List[int]
         ):
+    heartbeat_store = get_heartbeat_store()
+    if heartbeat_store is not None:
+        # saved to the database by HeartbeatFlusher
+        await heartbeat_store.record(task_list)
+        return
     query = models.BuildTask.id.in_(task_list)
     now = datetime.datetime.now()
     async with db.begin():
@@ -90,10 +219,141 @@ async def ping_tasks(
         await db.commit()
 
 
+async def save_heartbeats(
+            db: Session,
+            heartbeats: typing.Dict[int, float]
+        ):
+    # IDs and timestamps are sent as two arrays, so the statement
+    # doesn't depend on the number of pinged tasks
+    heartbeats_values = func.unnest(
+        sqlalchemy.cast(list(heartbeats.keys()),
+                        ARRAY(sqlalchemy.Integer)),
+        sqlalchemy.cast([datetime.datetime.fromtimestamp(timestamp)
+                         for timestamp in heartbeats.values()],
+                        ARRAY(sqlalchemy.DateTime)),
+    ).table_valued('task_id', 'ts').render_derived(name='heartbeats')
+    async with db.begin():
+        await db.execute(
+            update(models.BuildTask).where(
+                models.BuildTask.id == heartbeats_values.c.task_id,
+                sqlalchemy.or_(
+                    models.BuildTask.ts < heartbeats_values.c.ts,
+                    models.BuildTask.ts.__eq__(None)
+                )
+            ).values(ts=heartbeats_values.c.ts).execution_options(
+                synchronize_session=False)
+        )
+        await db.commit()
+
+
+async def get_build_task_state(
+            db: Session,
+            task_id: int
+        ) -> typing.Optional[typing.Tuple[int, int]]:
+    """
+    Returns status and attempt number of the build task.
+    """
+    state = await db.execute(
+        select(models.BuildTask.status, models.BuildTask.attempt).where(
+            models.BuildTask.id == task_id))
+    return state.first()
+
+
+async def __get_build_log_repo(
+            db: Session,
+            pulp_client: PulpClient,
+            build_task: models.BuildTask
+        ) -> models.Repository:
+    """
+    Returns build log repository of the task. Repository is created
+    on the first build_done of the task, so tasks which never finish
+    don't leave empty repositories in Pulp.
+    """
+    repo_name = get_build_repo_name(
+        build_task.platform.name, build_task.arch, build_task.build_id,
+        'build_log', task_id=build_task.id
+    )
+    log_repo = next((
+        repo for repo in build_task.build.repos
+        if repo.type == 'build_log' and repo.name == repo_name
+    ), None)
+    if log_repo:
+        return log_repo
+    pulp_repo = await pulp_client.get_log_repository(repo_name)
+    if pulp_repo is None:
+        repo_url, repo_href = await pulp_client.create_log_repo(repo_name)
+    else:
+        # left by a previous attempt which failed before saving it
+        repo_href = pulp_repo['pulp_href']
+        distro = await pulp_client.get_log_distro(repo_name)
+        if distro:
+            repo_url = distro['base_url']
+        else:
+            repo_url = await pulp_client.create_file_distro(
+                repo_name, repo_href)
+    log_repo = models.Repository(
+        name=repo_name,
+        url=repo_url,
+        arch=build_task.arch,
+        pulp_href=repo_href,
+        type='build_log',
+        debug=False
+    )
+    async with db.begin():
+        db.add(log_repo)
+        await db.flush()
+        await db.execute(insert(models.BuildRepo).values(
+            build_id=build_task.build_id, repository_id=log_repo.id))
+        await db.commit()
+    return log_repo
+
+
+async def __create_build_artifact(
+            pulp_client: PulpClient,
+            build_task: models.BuildTask,
+            artifact: build_node_schema.BuildDoneArtifact,
+            log_repo: typing.Optional[models.Repository],
+            semaphore: asyncio.Semaphore
+        ) -> typing.Optional[typing.Tuple[models.BuildTaskArtifact, str]]:
+    if artifact.type not in ('rpm', 'build_log'):
+        logging.error('Build task %d has artifact %s of unknown type %s',
+                      build_task.id, artifact.name, artifact.type)
+        return None
+    href = None
+    arch = build_task.arch
+    if artifact.type == 'rpm' and artifact.arch == 'src':
+        arch = artifact.arch
+    # Content is created without repository, all of the build task
+    # artifacts are added to repositories with a single modify call
+    async with semaphore:
+        if artifact.type == 'rpm':
+            repo = next(
+                build_repo for build_repo in build_task.build.repos
+                if build_repo.arch == arch
+                and build_repo.type == artifact.type
+                and build_repo.debug == artifact.is_debuginfo
+            )
+            href = await pulp_client.create_rpm_package(
+                artifact.name, artifact.href)
+        else:
+            repo = log_repo
+            href = await pulp_client.create_file(
+                artifact.name, artifact.href)
+    build_artifact = models.BuildTaskArtifact(
+        build_task_id=build_task.id,
+        name=artifact.name,
+        type=artifact.type,
+        href=href
+    )
+    return build_artifact, repo.pulp_href
+
+
 async def build_done(
             db: Session,
             request: build_node_schema.BuildDone
         ):
+    # Pulp processing can take a while, so the build task row
+    # is locked only for the final status update
     async with db.begin():
         query = models.BuildTask.id == request.task_id
         build_task = await db.execute(
@@ -102,90 +362,234 @@ async def build_done(
                 selectinload(models.BuildTask.build).selectinload(
                     models.Build.repos
                 ),
-                selectinload(models.BuildTask.rpm_module)
-            ).with_for_update()
+            )
         )
         build_task = build_task.scalars().first()
-        if BuildTaskStatus.is_finished(build_task.status):
+    if BuildTaskStatus.is_finished(build_task.status):
+        raise AlreadyBuiltError(
+            f'Build task {build_task.id} already completed')
+    status = BuildTaskStatus.COMPLETED
+    if request.status == 'failed':
+        status = BuildTaskStatus.FAILED
+    elif request.status == 'excluded':
+        status = BuildTaskStatus.EXCLUDED
+    pulp_client = PulpClient(
+        settings.pulp_host,
+        settings.pulp_user,
+        settings.pulp_password
+    )
+    log_repo = None
+    if any(artifact.type == 'build_log' for artifact in request.artifacts):
+        log_repo = await __get_build_log_repo(db, pulp_client, build_task)
+    semaphore = asyncio.Semaphore(settings.build_done_concurrency)
+    created_artifacts = await asyncio.gather(*(
+        __create_build_artifact(
+            pulp_client, build_task, artifact, log_repo, semaphore)
+        for artifact in request.artifacts
+    ))
+    artifacts = []
+    repos_content = collections.defaultdict(list)
+    for created_artifact in created_artifacts:
+        if created_artifact is None:
+            continue
+        artifact, repo_href = created_artifact
+        artifacts.append(artifact)
+        if artifact.href:
+            repos_content[repo_href].append(artifact.href)
+    # NEVRA is stored with artifacts, module metadata is rendered
+    # from it when all tasks of the module are finished
+    rpm_artifacts = [artifact for artifact in artifacts
+                     if artifact.type == 'rpm' and artifact.href]
+    await get_artifacts_nevra(pulp_client, rpm_artifacts)
+    await asyncio.gather(*(
+        pulp_client.modify_repository(repo_href, add=content)
+        for repo_href, content in repos_content.items()
+    ))
+
+    async with db.begin():
+        current_status = await db.execute(
+            select(models.BuildTask.status).where(
+                models.BuildTask.id == build_task.id).with_for_update()
+        )
+        current_status = current_status.scalar()
+        if BuildTaskStatus.is_finished(current_status):
             raise AlreadyBuiltError(
                 f'Build task {build_task.id} already completed')
-        status = BuildTaskStatus.COMPLETED
-        if request.status == 'failed':
-            status = BuildTaskStatus.FAILED
-        elif request.status == 'excluded':
-            status = BuildTaskStatus.EXCLUDED
         build_task.status = status
+        await build_status.update_build_status_rollup(
+            db, build_task.build_id, build_task.arch, current_status, status)
         remove_query = (
             models.BuildTaskDependency.c.build_task_dependency == request.task_id
         )
-        await db.execute(
-            delete(models.BuildTaskDependency).where(remove_query)
-        )
-        pulp_client = PulpClient(
-            settings.pulp_host,
-            settings.pulp_user,
-            settings.pulp_password
+        dependent_ids = await db.execute(
+            delete(models.BuildTaskDependency).where(
+                remove_query).returning(
+                models.BuildTaskDependency.c.build_task_id)
         )
-        build_module = None
-        module_repo = None
-        if build_task.rpm_module:
-            module_repo = next(
-                build_repo for build_repo in build_task.build.repos
-                if build_repo.arch == build_task.arch
-                and not build_repo.debug
-                and build_repo.type == 'rpm'
-            )
-            repo_modules_yaml = await pulp_client.get_repo_modules_yaml(
-                module_repo.url, build_task.rpm_module.sha256)
-            build_module = ModuleWrapper.from_template(repo_modules_yaml)
-        artifacts = []
-        for artifact in request.artifacts:
-            href = None
-            arch = build_task.arch
-            if artifact.type == 'rpm' and artifact.arch == 'src':
-                arch = artifact.arch
-            repos = list(
-                build_repo for build_repo in build_task.build.repos
-                if build_repo.arch == arch
-                and build_repo.type == artifact.type
-                and build_repo.debug == artifact.is_debuginfo
-            )
-            if artifact.type == 'rpm':
-                repo = repos[0]
-                href = await pulp_client.create_rpm_package(
-                    artifact.name, artifact.href, repo.pulp_href)
-                if build_module:
-                    rpm_package = await pulp_client.get_rpm_package(href)
-                    build_module.add_rpm_artifact(rpm_package)
-            elif artifact.type == 'build_log':
-                repo = next(
-                    repo for repo in repos
-                    if repo.name.endswith(str(request.task_id))
-                )
-                href = await pulp_client.create_file(
-                    artifact.name, artifact.href, repo.pulp_href)
-            artifacts.append(
-                models.BuildTaskArtifact(
-                    build_task_id=build_task.id,
-                    name=artifact.name,
-                    type=artifact.type,
-                    href=href
-                )
-            )
-        if build_module:
-            module_pulp_href, sha256 = await pulp_client.create_module(
-                build_module.render())
-            await pulp_client.modify_repository(
-                module_repo.pulp_href,
-                add=[module_pulp_href],
-                remove=[build_task.rpm_module.pulp_href]
-            )
-            build_task.rpm_module.sha256 = sha256
-            build_task.rpm_module.pulp_href = module_pulp_href
+        dependent_ids = dependent_ids.scalars().all()
+        await build_scheduler.remove_ready_task(db, build_task.id)
         db.add_all(artifacts)
         db.add(build_task)
+        await db.flush()
+        # dependency graph is updated incrementally: only tasks which
+        # waited for this one can become ready
+        ready_arches = []
+        if dependent_ids:
+            ready_arches = await build_scheduler.enqueue_ready_tasks(
+                db, task_ids=dependent_ids)
         await db.commit()
+    await notify_build_tasks_ready(ready_arches)
+
+
+async def get_finished_module(
+            db: Session,
+            task_id: int
+        ) -> typing.Optional[models.RpmModule]:
+    """
+    Returns module of the task if all tasks of the module are finished.
+    """
+    async with db.begin():
+        rpm_module = await db.execute(
+            select(models.RpmModule).join(
+                models.BuildTask,
+                models.BuildTask.rpm_module_id == models.RpmModule.id
+            ).where(models.BuildTask.id == task_id))
+        rpm_module = rpm_module.scalars().first()
+        if rpm_module is None:
+            return None
+        unfinished = await db.execute(
+            select(models.BuildTask.id).where(
+                models.BuildTask.rpm_module_id == rpm_module.id,
+                models.BuildTask.status.in_(
+                    (BuildTaskStatus.IDLE, BuildTaskStatus.STARTED))
+            ).limit(1)
+        )
+        if unfinished.scalar() is not None:
+            return None
+    return rpm_module
+
 
+async def render_build_module(db: Session, rpm_module_id: int):
+    """
+    Renders modules.yaml with RPM artifacts of all module tasks
+    and replaces the module in the build repository. Pulp calls are
+    made without locks, the module row is locked only to save
+    the result.
+    """
+    pulp_client = PulpClient(
+        settings.pulp_host,
+        settings.pulp_user,
+        settings.pulp_password
+    )
+    async with db.begin():
+        rpm_module = await db.execute(select(models.RpmModule).where(
+            models.RpmModule.id == rpm_module_id))
+        rpm_module = rpm_module.scalars().first()
+        if rpm_module is None:
+            raise DataNotFoundError(
+                f'Module with {rpm_module_id=} is not found')
+        module_tasks = await db.execute(
+            select(models.BuildTask).where(
+                models.BuildTask.rpm_module_id == rpm_module_id).options(
+                selectinload(models.BuildTask.artifacts),
+                selectinload(models.BuildTask.build).selectinload(
+                    models.Build.repos
+                ),
+            )
+        )
+        module_tasks = module_tasks.scalars().all()
+    old_pulp_href = rpm_module.pulp_href
+    module_repo = next(
+        build_repo for build_repo in module_tasks[0].build.repos
+        if build_repo.arch == rpm_module.arch
+        and not build_repo.debug
+        and build_repo.type == 'rpm'
+    )
+    template = rpm_module.template
+    if template is None:
+        # modules created before templates were stored
+        template = await pulp_client.get_repo_modules_yaml(
+            module_repo.url, rpm_module.sha256)
+    build_module = ModuleWrapper.from_template(template)
+    rpm_artifacts = [
+        artifact for task in module_tasks for artifact in task.artifacts
+        if artifact.type == 'rpm' and artifact.href
+    ]
+    rpm_packages = await get_artifacts_nevra(pulp_client, rpm_artifacts)
+    for artifact in rpm_artifacts:
+        if artifact.href in rpm_packages:
+            build_module.add_rpm_artifact(rpm_packages[artifact.href])
+    module_content = build_module.render()
+    sha256 = hashlib.sha256(module_content.encode()).hexdigest()
+    if sha256 == rpm_module.sha256:
+        # nothing changed since the previous render
+        return
+    module_pulp_href, sha256 = await pulp_client.create_module(
+        module_content)
+    await pulp_client.modify_repository(
+        module_repo.pulp_href,
+        add=[module_pulp_href],
+        remove=[old_pulp_href]
+    )
+    stale_pulp_href = None
+    async with db.begin():
+        rpm_module = await db.execute(select(models.RpmModule).where(
+            models.RpmModule.id == rpm_module_id).with_for_update())
+        rpm_module = rpm_module.scalars().first()
+        if rpm_module.sha256 == sha256:
+            # concurrent render saved the same module
+            await db.commit()
+            return
+        if rpm_module.pulp_href != old_pulp_href:
+            # module saved by a concurrent render is replaced by this one
+            stale_pulp_href = rpm_module.pulp_href
+        rpm_module.pulp_href = module_pulp_href
+        rpm_module.sha256 = sha256
+        await db.commit()
+    if stale_pulp_href:
+        await pulp_client.modify_repository(
+            module_repo.pulp_href, remove=[stale_pulp_href])
+
+
+async def get_build_module_ids(
+            db: Session,
+            build_id: int
+        ) -> typing.List[int]:
+    async with db.begin():
+        build = await db.execute(select(models.Build.id).where(
+            models.Build.id == build_id))
+        if build.scalar() is None:
+            raise DataNotFoundError(f'Build with {build_id=} is not found')
+        module_ids = await db.execute(
+            select(models.BuildTask.rpm_module_id).where(
+                models.BuildTask.build_id == build_id,
+                models.BuildTask.rpm_module_id.isnot(None)
+            ).distinct()
+        )
+        return module_ids.scalars().all()
+
+
+async def build_done_post_processing(
+            db: Session,
+            request: build_node_schema.BuildDone
+        ):
+    """
+    Processes finished build task: adds multilib and noarch packages
+    and links binary RPMs with their source RPM. Safe to run again
+    after a partial failure.
+    """
+    async with db.begin():
+        build_task = await db.execute(
+            select(models.BuildTask).where(
+                models.BuildTask.id == request.task_id).options(
+                selectinload(models.BuildTask.platform),
+                selectinload(models.BuildTask.build).selectinload(
+                    models.Build.repos
+                ),
+            )
+        )
+        build_task = build_task.scalars().first()
+    status = build_task.status
     multilib_conditions = (
         build_task.arch == 'x86_64',
         status == BuildTaskStatus.COMPLETED,
@@ -205,6 +609,11 @@ async def build_done(
     await save_noarch_packages(db, build_task)
 
     async with db.begin():
+        linked_rpms = await db.execute(
+            select(models.SourceRpm.id).join(models.SourceRpm.artifact).where(
+                models.BuildTaskArtifact.build_task_id == build_task.id))
+        if linked_rpms.scalars().first():
+            return
         rpms_result = await db.execute(select(models.BuildTaskArtifact).where(
             models.BuildTaskArtifact.build_task_id == build_task.id,
             models.BuildTaskArtifact.type == 'rpm'))
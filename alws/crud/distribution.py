@@ -4,7 +4,7 @@ from sqlalchemy import delete
 from sqlalchemy.future import select
 from sqlalchemy.orm import Session, selectinload
 
-from alws import models
+from alws import build_status, models
 from alws.config import settings
 from alws.constants import BuildTaskStatus
 from alws.errors import DistributionError
@@ -58,10 +58,14 @@ async def add_distributions_after_rebuild(
         request: build_node_schema.BuildDone,
 ):
 
-    subquery = select(models.BuildTask.build_id).where(
-        models.BuildTask.id == request.task_id).scalar_subquery()
+    build_id = await db.execute(select(models.BuildTask.build_id).where(
+        models.BuildTask.id == request.task_id))
+    build_id = build_id.scalar()
+    # tasks are loaded only when the whole build is finished
+    if not await build_status.is_build_finished(db, build_id):
+        return
     build_query = select(models.Build).where(
-        models.Build.id == subquery,
+        models.Build.id == build_id,
     ).options(
         selectinload(models.Build.tasks).selectinload(
             models.BuildTask.artifacts),
@@ -71,13 +75,6 @@ async def add_distributions_after_rebuild(
     db_build = await db.execute(build_query)
     db_build = db_build.scalars().first()
 
-    build_completed = all((
-        task.status >= BuildTaskStatus.COMPLETED
-        for task in db_build.tasks
-    ))
-    if not build_completed:
-        return
-
     distr_query = select(models.Distribution).join(
         models.Distribution.builds,
     ).where(models.Build.id == db_build.id).options(
@@ -11,13 +11,13 @@ from alws.constants import ReleaseStatus, RepoType
 from alws.errors import DataNotFoundError, EmptyReleasePlan, MissingRepository
 from alws.schemas import release_schema
 from alws.utils.beholder_client import BeholderClient
+from alws.utils.nevra import get_artifacts_nevra
 from alws.utils.pulp_client import PulpClient
 
 
 async def __get_pulp_packages(db: Session, build_ids: typing.List[int]) \
         -> typing.Tuple[typing.List[dict], typing.List[str]]:
     src_rpm_names = []
-    packages_fields = ['name', 'epoch', 'version', 'release', 'arch']
     pulp_packages = []
     pulp_client = PulpClient(
         settings.pulp_host,
@@ -35,26 +35,32 @@ async def __get_pulp_packages(db: Session, build_ids: typing.List[int]) \
             models.BinaryRpm.artifact)
     )
     build_result = await db.execute(builds_q)
+    artifacts = []
     for build in build_result.scalars().all():
         for src_rpm in build.source_rpms:
             # Failsafe to not process logs
             if src_rpm.artifact.type != 'rpm':
                 continue
             src_rpm_names.append(src_rpm.artifact.name)
-            pkg_info = await pulp_client.get_rpm_package(
-                src_rpm.artifact.href, include_fields=packages_fields)
-            pkg_info['artifact_href'] = src_rpm.artifact.href
-            pkg_info['full_name'] = src_rpm.artifact.name
-            pulp_packages.append(pkg_info)
+            artifacts.append(src_rpm.artifact)
         for binary_rpm in build.binary_rpms:
             # Failsafe to not process logs
             if binary_rpm.artifact.type != 'rpm':
                 continue
-            pkg_info = await pulp_client.get_rpm_package(
-                binary_rpm.artifact.href, include_fields=packages_fields)
-            pkg_info['artifact_href'] = binary_rpm.artifact.href
-            pkg_info['full_name'] = binary_rpm.artifact.name
-            pulp_packages.append(pkg_info)
+            artifacts.append(binary_rpm.artifact)
+    packages_info = await get_artifacts_nevra(pulp_client, artifacts)
+    missing_hrefs = sorted({
+        artifact.href for artifact in artifacts
+        if artifact.href not in packages_info
+    })
+    if missing_hrefs:
+        raise DataNotFoundError(
+            f'Packages are not found in Pulp: {", ".join(missing_hrefs)}')
+    for artifact in artifacts:
+        pkg_info = dict(packages_info[artifact.href])
+        pkg_info['artifact_href'] = artifact.href
+        pkg_info['full_name'] = artifact.name
+        pulp_packages.append(pkg_info)
     return pulp_packages, src_rpm_names
 
 
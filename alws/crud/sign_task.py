@@ -10,6 +10,7 @@ from alws.constants import SignStatus
 from alws.errors import BuildAlreadySignedError, DataNotFoundError
 from alws.schemas import sign_schema
 from alws.utils.debuginfo import is_debuginfo_rpm
+from alws.utils.nevra import get_artifacts_nevra
 from alws.utils.pulp_client import PulpClient
 
 
@@ -183,6 +184,12 @@ async def complete_sign_task(db: Session, sign_task_id: int,
             db_package.artifact.href = new_pkg_href
             modified_items.append(db_package)
             modified_items.append(db_package.artifact)
+        # signed packages keep NEVRA, artifacts stored before NEVRA
+        # was saved get it from the new packages for build search
+        await get_artifacts_nevra(pulp_client, [
+            item for item in modified_items
+            if isinstance(item, models.BuildTaskArtifact)
+        ])
 
     sign_tasks = await db.execute(select(models.SignTask).where(
         models.SignTask.id == sign_task_id
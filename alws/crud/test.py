@@ -1,3 +1,5 @@
+import logging
+
 from sqlalchemy.future import select
 from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.sql.expression import func
@@ -6,6 +8,7 @@ from alws import models
 from alws.config import settings
 from alws.constants import TestTaskStatus
 from alws.schemas import test_schema
+from alws.utils.nevra import get_artifacts_nevra
 from alws.utils.pulp_client import PulpClient
 
 
@@ -53,13 +56,15 @@ async def create_test_tasks(db: Session, build_task_id: int):
         repository = results.scalars().first()
 
     test_tasks = []
-    for artifact in build_task.artifacts:
-        if artifact.type != 'rpm':
+    rpm_artifacts = [artifact for artifact in build_task.artifacts
+                     if artifact.type == 'rpm']
+    packages_info = await get_artifacts_nevra(pulp_client, rpm_artifacts)
+    for artifact in rpm_artifacts:
+        artifact_info = packages_info.get(artifact.href)
+        if artifact_info is None:
+            logging.error('Package %s of build task %d is not found in Pulp',
+                          artifact.href, build_task_id)
             continue
-        artifact_info = await pulp_client.get_rpm_package(
-            artifact.href,
-            include_fields=['name', 'version', 'release', 'arch']
-        )
         task = models.TestTask(build_task_id=build_task_id,
                                package_name=artifact_info['name'],
                                package_version=artifact_info['version'],
@@ -1,21 +1,95 @@
 # -*- mode:python; coding:utf-8; -*-
 # author: Vyacheslav Potoropin <vpotoropin@almalinux.org>
 # created: 2021-06-22
+import time
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
 from alws.config import settings
 
 
-__all__ = ['Base', 'Session', 'engine']
+__all__ = ['Base', 'Session', 'engine', 'get_pool_stats']
 
 
 DATABASE_URL = settings.database_url
 
-engine = create_async_engine(DATABASE_URL, poolclass=NullPool)
+
+class PoolMetrics:
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+        self.checkout_errors = 0
+
+    def record_checkout(self, wait: float, failed: bool = False):
+        self.checkouts += 1
+        self.checkout_wait_total += wait
+        self.checkout_wait_max = max(self.checkout_wait_max, wait)
+        if failed:
+            self.checkout_errors += 1
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+
+    def connect(self):
+        start = time.monotonic()
+        failed = False
+        try:
+            return super().connect()
+        except Exception:
+            failed = True
+            raise
+        finally:
+            pool_metrics.record_checkout(
+                time.monotonic() - start, failed=failed)
+
+
+def create_database_engine():
+    if settings.database_pool == 'null':
+        return create_async_engine(DATABASE_URL, poolclass=NullPool)
+    return create_async_engine(
+        DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_timeout=settings.database_pool_timeout,
+        pool_recycle=settings.database_pool_recycle,
+        pool_pre_ping=settings.database_pool_pre_ping,
+    )
+
+
+def get_pool_stats() -> dict:
+    pool = engine.sync_engine.pool
+    stats = {
+        'pool_class': pool.__class__.__name__,
+        'checkouts': pool_metrics.checkouts,
+        'checkout_wait_total': pool_metrics.checkout_wait_total,
+        'checkout_wait_max': pool_metrics.checkout_wait_max,
+        'checkout_wait_avg': (
+            pool_metrics.checkout_wait_total / pool_metrics.checkouts
+            if pool_metrics.checkouts else 0.0
+        ),
+        'checkout_errors': pool_metrics.checkout_errors,
+    }
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update({
+            'size': pool.size(),
+            'in_use': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': pool.overflow(),
+        })
+    return stats
+
+
+engine = create_database_engine()
 sync_engine = create_engine(settings.sync_database_url)
 Base = declarative_base()
 Session = sessionmaker(
@@ -28,3 +28,7 @@ class SignKeyAlreadyExistsError(ValueError):
 
 class BuildAlreadySignedError(ValueError):
     pass
+
+
+class PulpTaskTimeoutError(TimeoutError):
+    pass
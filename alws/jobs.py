@@ -0,0 +1,102 @@
+import logging
+
+from alws import database
+from alws.config import settings
+from alws.crud import build as build_crud, build_node, test
+from alws.errors import AlreadyBuiltError
+from alws.schemas import build_node_schema
+from alws.utils.job_queue import (
+    JobWorkerPool,
+    LocalJobQueue,
+    RedisJobQueue,
+    get_job_queue,
+)
+
+
+__all__ = [
+    'BUILD_DONE_JOB',
+    'REMOVE_REPOSITORIES_JOB',
+    'RENDER_MODULE_JOB',
+    'create_job_queue',
+    'create_worker_pool',
+]
+
+
+BUILD_DONE_JOB = 'build_done'
+BUILD_POST_PROCESSING_JOB = 'build_post_processing'
+RENDER_MODULE_JOB = 'render_module'
+REMOVE_REPOSITORIES_JOB = 'remove_repositories'
+
+
+async def build_done_job(payload: dict):
+    request = build_node_schema.BuildDone(**payload)
+    async with database.Session() as db:
+        try:
+            await build_node.build_done(db, request)
+        except AlreadyBuiltError:
+            # Previous attempt or duplicate report already stored results,
+            # post processing is deduplicated by its idempotency key
+            logging.info('Build task %d is already done', request.task_id)
+        rpm_module = await build_node.get_finished_module(
+            db, request.task_id)
+    if rpm_module is not None:
+        # the last finished task of the module renders its metadata,
+        # the key changes with every render, so restarted tasks
+        # render the module again
+        await get_job_queue().enqueue(
+            RENDER_MODULE_JOB, {'rpm_module_id': rpm_module.id},
+            idempotency_key=(
+                f'{RENDER_MODULE_JOB}:{rpm_module.id}:{rpm_module.sha256}')
+        )
+    attempt = payload.get('attempt', 0)
+    await get_job_queue().enqueue(
+        BUILD_POST_PROCESSING_JOB, payload,
+        idempotency_key=(
+            f'{BUILD_POST_PROCESSING_JOB}:{request.task_id}:{attempt}')
+    )
+
+
+async def build_post_processing_job(payload: dict):
+    request = build_node_schema.BuildDone(**payload)
+    async with database.Session() as db:
+        await build_node.build_done_post_processing(db, request)
+        if request.status == 'done':
+            await test.create_test_tasks(db, request.task_id)
+
+
+async def render_module_job(payload: dict):
+    async with database.Session() as db:
+        await build_node.render_build_module(db, payload['rpm_module_id'])
+
+
+async def remove_repositories_job(payload: dict):
+    await build_crud.remove_pulp_repositories(payload['repositories'])
+
+
+JOB_HANDLERS = {
+    BUILD_DONE_JOB: build_done_job,
+    BUILD_POST_PROCESSING_JOB: build_post_processing_job,
+    RENDER_MODULE_JOB: render_module_job,
+    REMOVE_REPOSITORIES_JOB: remove_repositories_job,
+}
+
+
+def create_job_queue():
+    if settings.job_queue_backend == 'local':
+        return LocalJobQueue(max_attempts=settings.job_max_attempts)
+    return RedisJobQueue(
+        settings.redis_url,
+        max_attempts=settings.job_max_attempts,
+        idempotency_ttl=settings.job_idempotency_ttl
+    )
+
+
+def create_worker_pool(queue) -> JobWorkerPool:
+    return JobWorkerPool(
+        queue,
+        JOB_HANDLERS,
+        concurrency=settings.job_workers,
+        retry_delay=settings.job_retry_delay,
+        stale_timeout=settings.job_stale_timeout,
+        requeue_interval=settings.job_requeue_interval
+    )
@@ -5,7 +5,7 @@ import sqlalchemy
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
 
-from alws.constants import ReleaseStatus, SignStatus
+from alws.constants import BuildTaskStatus, ReleaseStatus, SignStatus
 from alws.database import Base, engine
 
 
@@ -103,6 +103,8 @@ class Platform(Base):
     )
     arch_list = sqlalchemy.Column(JSONB, nullable=False)
     data = sqlalchemy.Column(JSONB, nullable=False)
+    priority = sqlalchemy.Column(
+        sqlalchemy.Integer, nullable=False, default=0, server_default='0')
     repos = relationship('Repository', secondary=PlatformRepo)
 
 
@@ -148,6 +150,37 @@ class Repository(CustomRepoRepr):
     pulp_href = sqlalchemy.Column(sqlalchemy.Text)
 
 
+class PooledRepository(Base):
+    """
+    Pre-created empty build repositories waiting for a build,
+    see alws.repository_pool.
+    """
+
+    __tablename__ = 'repository_pool'
+    __table_args__ = (
+        sqlalchemy.Index(
+            'repository_pool_bucket_idx',
+            'platform_id', 'arch', 'type', 'debug', 'id'
+        ),
+    )
+
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
+    platform_id = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey('platforms.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    arch = sqlalchemy.Column(sqlalchemy.Text, nullable=False)
+    type = sqlalchemy.Column(sqlalchemy.Text, nullable=False)
+    debug = sqlalchemy.Column(sqlalchemy.Boolean, nullable=False,
+                              default=False)
+    name = sqlalchemy.Column(sqlalchemy.Text, nullable=False, unique=True)
+    url = sqlalchemy.Column(sqlalchemy.Text, nullable=False)
+    pulp_href = sqlalchemy.Column(sqlalchemy.Text, nullable=False)
+    created_at = sqlalchemy.Column(
+        sqlalchemy.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+
 class RepositoryRemote(CustomRepoRepr):
     __tablename__ = 'repository_remotes'
     __tableargs__ = [
@@ -235,6 +268,8 @@ class Build(Base):
     released = sqlalchemy.Column(sqlalchemy.Boolean, default=False)
     signed = sqlalchemy.Column(sqlalchemy.Boolean, default=False,
                                nullable=True)
+    priority = sqlalchemy.Column(
+        sqlalchemy.Integer, nullable=False, default=0, server_default='0')
 
 
 BuildTaskDependency = sqlalchemy.Table(
@@ -251,13 +286,26 @@ BuildTaskDependency = sqlalchemy.Table(
         sqlalchemy.Integer,
         sqlalchemy.ForeignKey('build_tasks.id'),
         primary_key=True
-    )
+    ),
+    sqlalchemy.Index(
+        'build_task_dependency_dependency_idx', 'build_task_dependency')
 )
 
 
 class BuildTask(Base):
 
     __tablename__ = 'build_tasks'
+    __table_args__ = (
+        # covers the build task dispatch query, see
+        # build_scheduler.get_expired_tasks_query
+        sqlalchemy.Index(
+            'build_tasks_pending_arch_id_idx', 'arch', 'id',
+            postgresql_where=sqlalchemy.text(
+                f'status < {BuildTaskStatus.COMPLETED:d}')
+        ),
+        # build search filters are EXISTS subqueries on build tasks
+        sqlalchemy.Index('build_tasks_build_id_idx', 'build_id'),
+    )
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
     ts = sqlalchemy.Column(sqlalchemy.DateTime, nullable=True)
@@ -284,6 +332,10 @@ class BuildTask(Base):
         nullable=True
     )
     status = sqlalchemy.Column(sqlalchemy.Integer, nullable=False)
+    # incremented on every restart, keeps build_done jobs
+    # of different attempts apart
+    attempt = sqlalchemy.Column(
+        sqlalchemy.Integer, nullable=False, default=0, server_default='0')
     index = sqlalchemy.Column(sqlalchemy.Integer, nullable=False)
     arch = sqlalchemy.Column(sqlalchemy.VARCHAR(length=50), nullable=False)
     mock_options = sqlalchemy.Column(JSONB)
@@ -301,9 +353,94 @@ class BuildTask(Base):
     rpm_module = relationship('RpmModule')
 
 
+class BuildTaskReady(Base):
+    """
+    Build tasks which have no unfinished dependencies and wait for
+    a build node, see alws.build_scheduler.
+    """
+
+    __tablename__ = 'build_task_ready'
+    __table_args__ = (
+        sqlalchemy.Index(
+            'build_task_ready_arch_priority_idx',
+            'arch', sqlalchemy.text('priority DESC'), 'build_task_id'
+        ),
+        # fair share dispatch reads the first ready task of every group,
+        # see build_scheduler.get_ready_candidates_query
+        *(
+            sqlalchemy.Index(
+                f'build_task_ready_{group_key}_priority_idx',
+                group_key, sqlalchemy.text('priority DESC'), 'build_task_id'
+            )
+            for group_key in ('user_id', 'platform_id', 'build_id')
+        ),
+    )
+
+    build_task_id = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey('build_tasks.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    arch = sqlalchemy.Column(sqlalchemy.VARCHAR(length=50), nullable=False)
+    priority = sqlalchemy.Column(
+        sqlalchemy.Integer, nullable=False, default=0, server_default='0')
+    # copied from the task, build and user for fair share scheduling
+    build_id = sqlalchemy.Column(sqlalchemy.Integer, nullable=False)
+    user_id = sqlalchemy.Column(sqlalchemy.Integer, nullable=False)
+    platform_id = sqlalchemy.Column(sqlalchemy.Integer, nullable=False)
+
+
+class BuildStatusRollup(Base):
+    """
+    Numbers of build tasks in every status by architecture,
+    see alws.build_status.
+    """
+
+    __tablename__ = 'build_status_rollup'
+    __table_args__ = (
+        sqlalchemy.Index(
+            'build_status_rollup_unfinished_idx', 'build_id',
+            postgresql_where=sqlalchemy.text(
+                "idle + started > 0")
+        ),
+    )
+
+    build_id = sqlalchemy.Column(
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey('builds.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    arch = sqlalchemy.Column(sqlalchemy.VARCHAR(length=50), primary_key=True)
+    idle = sqlalchemy.Column(
+        sqlalchemy.Integer, nullable=False, default=0, server_default='0')
+    started = sqlalchemy.Column(
+        sqlalchemy.Integer, nullable=False, default=0, server_default='0')
+    completed = sqlalchemy.Column(
+        sqlalchemy.Integer, nullable=False, default=0, server_default='0')
+    failed = sqlalchemy.Column(
+        sqlalchemy.Integer, nullable=False, default=0, server_default='0')
+    excluded = sqlalchemy.Column(
+        sqlalchemy.Integer, nullable=False, default=0, server_default='0')
+    first_started_at = sqlalchemy.Column(sqlalchemy.DateTime, nullable=True)
+    last_finished_at = sqlalchemy.Column(sqlalchemy.DateTime, nullable=True)
+
+
 class BuildTaskRef(Base):
 
     __tablename__ = 'build_task_refs'
+    __table_args__ = (
+        # trigram indexes serve LIKE '%...%' build searches,
+        # they need the pg_trgm extension
+        sqlalchemy.Index(
+            'build_task_refs_url_trgm_idx', 'url',
+            postgresql_using='gin', postgresql_ops={'url': 'gin_trgm_ops'}
+        ),
+        sqlalchemy.Index(
+            'build_task_refs_git_ref_trgm_idx', 'git_ref',
+            postgresql_using='gin',
+            postgresql_ops={'git_ref': 'gin_trgm_ops'}
+        ),
+    )
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
     url = sqlalchemy.Column(sqlalchemy.TEXT, nullable=False)
@@ -323,11 +460,22 @@ class RpmModule(Base):
     arch = sqlalchemy.Column(sqlalchemy.TEXT, nullable=False)
     pulp_href = sqlalchemy.Column(sqlalchemy.TEXT, nullable=False)
     sha256 = sqlalchemy.Column(sqlalchemy.VARCHAR(64), nullable=False)
+    # modules.yaml without artifacts, they are added by render_build_module
+    template = sqlalchemy.Column(sqlalchemy.TEXT, nullable=True)
 
 
 class BuildTaskArtifact(Base):
 
     __tablename__ = 'build_artifacts'
+    __table_args__ = (
+        sqlalchemy.Index('build_artifacts_build_task_id_idx',
+                         'build_task_id'),
+        # package search of builds, NEVRA is empty for non-RPM artifacts
+        sqlalchemy.Index(
+            'build_artifacts_rpm_nevra_idx',
+            'rpm_name', 'rpm_version', 'rpm_release', 'rpm_arch'
+        ),
+    )
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
     build_task_id = sqlalchemy.Column(
@@ -338,6 +486,12 @@ class BuildTaskArtifact(Base):
     name = sqlalchemy.Column(sqlalchemy.Text, nullable=False)
     type = sqlalchemy.Column(sqlalchemy.Text, nullable=False)
     href = sqlalchemy.Column(sqlalchemy.Text, nullable=False)
+    # Parsed RPM header fields, empty for non-RPM artifacts
+    rpm_name = sqlalchemy.Column(sqlalchemy.Text, nullable=True)
+    rpm_epoch = sqlalchemy.Column(sqlalchemy.Text, nullable=True)
+    rpm_version = sqlalchemy.Column(sqlalchemy.Text, nullable=True)
+    rpm_release = sqlalchemy.Column(sqlalchemy.Text, nullable=True)
+    rpm_arch = sqlalchemy.Column(sqlalchemy.Text, nullable=True)
     build_task = relationship('BuildTask', back_populates='artifacts')
 
 
@@ -393,6 +547,8 @@ class User(Base):
     email = sqlalchemy.Column(sqlalchemy.TEXT, nullable=False)
     jwt_token = sqlalchemy.Column(sqlalchemy.TEXT)
     github_token = sqlalchemy.Column(sqlalchemy.TEXT)
+    priority = sqlalchemy.Column(
+        sqlalchemy.Integer, nullable=False, default=0, server_default='0')
 
 
 class TestTask(Base):
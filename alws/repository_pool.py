@@ -0,0 +1,365 @@
+import asyncio
+import logging
+import typing
+import uuid
+
+import sqlalchemy
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from alws import database, models
+from alws.config import settings
+from alws.utils.repo_provisioning import (
+    RepositoryProvisioner,
+    RepositoryRequest,
+)
+
+
+__all__ = [
+    'PoolBucket',
+    'RepositoryPoolRefiller',
+    'claim_pooled_repositories',
+    'get_pool_buckets',
+    'get_repository_pool_refiller',
+    'pool_metrics',
+    'refill_repository_pool',
+    'request_pool_refill',
+    'set_repository_pool_refiller',
+    'trim_repository_pool',
+]
+
+
+# number of repositories created and added to the pool at once
+REFILL_BATCH_SIZE = 20
+# advisory lock key which keeps trims of several app instances apart
+TRIM_LOCK_KEY = 0x616c7773
+# Pulp content type, base path and name suffix of build repository types
+POOL_REPO_TYPES = {
+    'rpm': ('rpm', 'builds', 'br'),
+}
+
+
+class PoolBucket(typing.NamedTuple):
+
+    platform_id: int
+    arch: str
+    repo_type: str
+    debug: bool = False
+
+
+class PooledRepo(typing.NamedTuple):
+
+    name: str
+    url: str
+    pulp_href: str
+
+
+class PoolMetrics:
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.refilled = 0
+        self.trimmed = 0
+        self.refill_errors = 0
+
+    def get_stats(self) -> dict:
+        claims = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / claims if claims else 0.0,
+            'refilled': self.refilled,
+            'trimmed': self.trimmed,
+            'refill_errors': self.refill_errors,
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+def get_pool_buckets(
+            platform: models.Platform
+        ) -> typing.List[PoolBucket]:
+    """
+    Returns buckets of repositories which builds of the platform use.
+    Build log repositories are created on the first build_done of a task,
+    so they aren't pooled.
+    """
+    buckets = [PoolBucket(platform.id, 'src', 'rpm')]
+    for arch in platform.arch_list:
+        buckets.extend((
+            PoolBucket(platform.id, arch, 'rpm'),
+            PoolBucket(platform.id, arch, 'rpm', debug=True),
+        ))
+    return buckets
+
+
+def get_pooled_repo_name(platform: models.Platform,
+                         bucket: PoolBucket) -> str:
+    suffix = POOL_REPO_TYPES[bucket.repo_type][2]
+    debug_suffix = 'debug-' if bucket.debug else ''
+    return (
+        f'{platform.name}-{bucket.arch}-pool-{uuid.uuid4().hex[:12]}-'
+        f'{debug_suffix}{suffix}'
+    )
+
+
+async def claim_pooled_repositories(
+            db: Session,
+            bucket: PoolBucket,
+            count: int
+        ) -> typing.List[PooledRepo]:
+    """
+    Takes up to count repositories of the bucket out of the pool.
+    Repositories return to the pool if the transaction is rolled back.
+    """
+    if count <= 0:
+        return []
+    # concurrent builds skip each other's rows instead of waiting for them
+    pooled_ids = select(models.PooledRepository.id).where(
+        models.PooledRepository.platform_id == bucket.platform_id,
+        models.PooledRepository.arch == bucket.arch,
+        models.PooledRepository.type == bucket.repo_type,
+        models.PooledRepository.debug == bucket.debug,
+    ).order_by(models.PooledRepository.id).limit(count).with_for_update(
+        skip_locked=True)
+    claimed = await db.execute(
+        delete(models.PooledRepository).where(
+            models.PooledRepository.id.in_(pooled_ids)
+        ).returning(
+            models.PooledRepository.name,
+            models.PooledRepository.url,
+            models.PooledRepository.pulp_href,
+        ).execution_options(synchronize_session=False)
+    )
+    repos = [PooledRepo(*row) for row in claimed.all()]
+    pool_metrics.hits += len(repos)
+    pool_metrics.misses += count - len(repos)
+    if len(repos) < count:
+        request_pool_refill()
+    return repos
+
+
+async def get_pool_deficit(
+            db: Session,
+            platforms: typing.List[models.Platform],
+            pool_size: int
+        ) -> typing.Dict[PoolBucket, int]:
+    columns = (
+        models.PooledRepository.platform_id,
+        models.PooledRepository.arch,
+        models.PooledRepository.type,
+        models.PooledRepository.debug,
+    )
+    counts = await db.execute(
+        select(*columns, sqlalchemy.func.count()).group_by(*columns))
+    available = {PoolBucket(*row[:4]): row[4] for row in counts.all()}
+    deficit = {}
+    for platform in platforms:
+        for bucket in get_pool_buckets(platform):
+            missing = pool_size - available.get(bucket, 0)
+            if missing > 0:
+                deficit[bucket] = missing
+    return deficit
+
+
+async def get_refill_batch(
+            db: Session,
+            pool_size: int,
+            batch_size: int
+        ) -> typing.List[typing.Tuple[PoolBucket, RepositoryRequest]]:
+    """
+    Returns up to batch_size repositories missing in the pool.
+    """
+    platforms = await db.execute(select(models.Platform))
+    platforms = platforms.scalars().all()
+    deficit = await get_pool_deficit(db, platforms, pool_size)
+    platforms_by_id = {platform.id: platform for platform in platforms}
+    batch = []
+    for bucket, missing in deficit.items():
+        content_type, base_path_start, _ = POOL_REPO_TYPES[bucket.repo_type]
+        for _ in range(min(missing, batch_size - len(batch))):
+            batch.append((bucket, RepositoryRequest(
+                name=get_pooled_repo_name(
+                    platforms_by_id[bucket.platform_id], bucket),
+                content_type=content_type,
+                base_path_start=base_path_start
+            )))
+        if len(batch) >= batch_size:
+            break
+    return batch
+
+
+async def refill_repository_pool(
+            db: Session,
+            provisioner: RepositoryProvisioner,
+            pool_size: int,
+            batch_size: int = REFILL_BATCH_SIZE
+        ) -> int:
+    """
+    Creates repositories missing in the pool, returns their number.
+
+    Repositories are created in batches outside of transactions, every
+    batch is added to the pool as soon as it's created. Refills of
+    several app instances count the same deficit and can overfill
+    the pool, the surplus is trimmed once the pool is full.
+    """
+    refilled = 0
+    while True:
+        async with db.begin():
+            batch = await get_refill_batch(db, pool_size, batch_size)
+        if not batch:
+            await trim_repository_pool(db, provisioner, pool_size)
+            return refilled
+        buckets, requests = zip(*batch)
+        created = await provisioner.provision(list(requests))
+        try:
+            async with db.begin():
+                await db.execute(insert(models.PooledRepository).values([
+                    {
+                        'platform_id': bucket.platform_id,
+                        'arch': bucket.arch,
+                        'type': bucket.repo_type,
+                        'debug': bucket.debug,
+                        'name': request.name,
+                        'url': repo_url,
+                        'pulp_href': repo_href,
+                    }
+                    for bucket, request, (repo_url, repo_href)
+                    in zip(buckets, requests, created)
+                ]))
+                await db.commit()
+        except Exception:
+            # repositories which didn't get to the pool are never used
+            try:
+                await provisioner.remove(
+                    list(requests), [repo_href for _, repo_href in created])
+            except Exception:
+                logging.exception('Cannot remove unused pool repositories')
+            raise
+        pool_metrics.refilled += len(requests)
+        refilled += len(requests)
+
+
+async def trim_repository_pool(
+            db: Session,
+            provisioner: RepositoryProvisioner,
+            pool_size: int
+        ) -> int:
+    """
+    Removes the newest repositories of buckets which have more than
+    pool_size of them, returns their number.
+    """
+    pool = models.PooledRepository
+    bucket_position = sqlalchemy.func.row_number().over(
+        partition_by=(pool.platform_id, pool.arch, pool.type, pool.debug),
+        order_by=pool.id
+    ).label('position')
+    positions = select(pool.id, bucket_position).subquery('positions')
+    async with db.begin():
+        # concurrent trims would count the same surplus twice
+        await db.execute(
+            select(sqlalchemy.func.pg_advisory_xact_lock(TRIM_LOCK_KEY)))
+        trimmed = await db.execute(
+            delete(pool).where(pool.id.in_(
+                select(positions.c.id).where(
+                    positions.c.position > pool_size)
+            )).returning(
+                pool.name, pool.type, pool.pulp_href
+            ).execution_options(synchronize_session=False)
+        )
+        trimmed = trimmed.all()
+        await db.commit()
+    if not trimmed:
+        return 0
+    await provisioner.remove(
+        [RepositoryRequest(name=name,
+                           content_type=POOL_REPO_TYPES[repo_type][0])
+         for name, repo_type, _ in trimmed],
+        [repo_href for _, _, repo_href in trimmed]
+    )
+    pool_metrics.trimmed += len(trimmed)
+    logging.info('Removed %d surplus repositories from build repositories '
+                 'pool', len(trimmed))
+    return len(trimmed)
+
+
+class RepositoryPoolRefiller:
+    """
+    Keeps the pool of empty build repositories filled in background.
+    Refill runs periodically and as soon as a build finds a bucket empty.
+    """
+
+    def __init__(
+                self,
+                pool_size: int,
+                interval: float = 300.0,
+                session_factory: typing.Callable = database.Session
+            ):
+        self._pool_size = pool_size
+        self._interval = interval
+        self._session_factory = session_factory
+        self._wakeup = asyncio.Event()
+        self._task: typing.Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refill()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pool_metrics.refill_errors += 1
+                logging.exception('Cannot refill build repositories pool')
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def refill(self) -> int:
+        provisioner = RepositoryProvisioner(
+            settings.pulp_host,
+            settings.pulp_user,
+            settings.pulp_password
+        )
+        async with self._session_factory() as db:
+            refilled = await refill_repository_pool(
+                db, provisioner, self._pool_size)
+        if refilled:
+            logging.info('Added %d repositories to build repositories pool',
+                         refilled)
+        return refilled
+
+
+_refiller: typing.Optional[RepositoryPoolRefiller] = None
+
+
+def get_repository_pool_refiller() -> typing.Optional[RepositoryPoolRefiller]:
+    return _refiller
+
+
+def set_repository_pool_refiller(
+            refiller: typing.Optional[RepositoryPoolRefiller]):
+    global _refiller
+    _refiller = refiller
+
+
+def request_pool_refill():
+    if _refiller is not None:
+        _refiller.wake()
@@ -3,6 +3,8 @@ __all__ = [
     'build_node',
     'builds',
     'distro',
+    'jobs',
+    'metrics',
     'platforms',
     'projects',
     'releases',
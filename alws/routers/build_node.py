@@ -1,12 +1,15 @@
 import itertools
 
-from fastapi import APIRouter, Depends, Response, status
+from fastapi import APIRouter, Depends, Request, Response, status
 
 from alws import database
-from alws.crud import build_node, test
+from alws.config import settings
+from alws.constants import BuildTaskStatus
+from alws.crud import build_node
 from alws.dependencies import get_db, JWTBearer
-from alws.errors import AlreadyBuiltError
+from alws.jobs import BUILD_DONE_JOB
 from alws.schemas import build_node_schema
+from alws.utils.job_queue import get_job_queue
 
 
 router = APIRouter(
@@ -32,25 +35,38 @@ async def build_done(
             response: Response,
             db: database.Session = Depends(get_db)
         ):
-    try:
-        await build_node.build_done(db, build_done_)
-    except AlreadyBuiltError:
-        response.status_code = status.HTTP_409_CONFLICT
-    except Exception:
-        pass
-    # need add some logic after discussing with team
-    # await crud.add_distributions_after_rebuild(db, build_done)
-    if build_done_.status == 'done':
-        await test.create_test_tasks(db, build_done_.task_id)
-    return {'ok': True}
+    task_state = await build_node.get_build_task_state(
+        db, build_done_.task_id)
+    attempt = 0
+    if task_state is not None:
+        task_status, attempt = task_state
+        if BuildTaskStatus.is_finished(task_status):
+            response.status_code = status.HTTP_409_CONFLICT
+            return {'ok': True}
+    # Artifacts import and post processing are done by job workers,
+    # build node doesn't need to wait for them. Restarted task reports
+    # build_done again, so the attempt is a part of the idempotency key
+    job_id = await get_job_queue().enqueue(
+        BUILD_DONE_JOB, {**build_done_.dict(), 'attempt': attempt},
+        idempotency_key=(
+            f'{BUILD_DONE_JOB}:{build_done_.task_id}:{attempt}')
+    )
+    return {'ok': True, 'job_id': job_id}
 
 
 @router.get('/get_task', response_model=build_node_schema.Task)
 async def get_task(
             request: build_node_schema.RequestTask,
+            http_request: Request,
+            wait: float = 0,
             db: database.Session = Depends(get_db)
         ):
-    task = await build_node.get_available_build_task(db, request)
+    # with wait > 0 request is held until a task for one of supported
+    # arches becomes available or the timeout expires
+    task = await build_node.wait_for_build_task(
+        db, request, min(wait, settings.build_node_max_wait),
+        is_disconnected=http_request.is_disconnected
+    )
     if not task:
         return
     response = {
@@ -1,9 +1,11 @@
+import datetime
 import typing
 
 from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
+    Query,
     Request,
     status,
 )
@@ -12,7 +14,9 @@ from alws import database
 from alws.crud import build as build_crud, build_node
 from alws.dependencies import get_db, JWTBearer
 from alws.errors import DataNotFoundError
+from alws.jobs import REMOVE_REPOSITORIES_JOB, RENDER_MODULE_JOB
 from alws.schemas import build_schema
+from alws.utils.job_queue import get_job_queue
 
 
 router = APIRouter(
@@ -34,17 +38,31 @@ async def create_build(
 
 
 @router.get('/', response_model=typing.Union[
-    typing.List[build_schema.Build], build_schema.BuildsResponse])
+    typing.List[build_schema.Build], build_schema.BuildsResponse,
+    build_schema.BuildsSummaryResponse])
 async def get_builds_per_page(
     request: Request,
-    pageNumber: int,
+    pageNumber: typing.Optional[int] = None,
+    lastBuildId: typing.Optional[int] = None,
+    view: typing.Literal['full', 'summary'] = 'full',
     db: database.Session = Depends(get_db),
 ):
     search_params = build_schema.BuildSearch(**request.query_params)
+    if pageNumber is None and lastBuildId is None:
+        pageNumber = 1
+    if view == 'summary':
+        summary = await build_crud.get_builds_summary(
+            db=db,
+            page_number=pageNumber,
+            search_params=search_params,
+            last_build_id=lastBuildId,
+        )
+        return build_schema.BuildsSummaryResponse(**summary)
     return await build_crud.get_builds(
         db=db,
         page_number=pageNumber,
         search_params=search_params,
+        last_build_id=lastBuildId,
     )
 
 
@@ -65,6 +83,42 @@ async def restart_failed_build_items(build_id: int,
     return await build_node.update_failed_build_items(db, build_id)
 
 
+@router.post('/{build_id}/render-modules')
+async def render_build_modules(build_id: int,
+                               db: database.Session = Depends(get_db)):
+    # modules are rendered when all of their tasks are finished,
+    # this renders them with artifacts of the tasks finished so far
+    try:
+        module_ids = await build_node.get_build_module_ids(db, build_id)
+    except DataNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f'Build with {build_id=} is not found',
+        )
+    job_ids = [
+        await get_job_queue().enqueue(
+            RENDER_MODULE_JOB, {'rpm_module_id': module_id})
+        for module_id in module_ids
+    ]
+    return {'ok': True, 'job_ids': job_ids}
+
+
+@router.patch('/{build_id}/priority', response_model=build_schema.Build)
+async def update_build_priority(
+            build_id: int,
+            build_priority: build_schema.BuildPriority,
+            db: database.Session = Depends(get_db)
+        ):
+    try:
+        return await build_crud.update_build_priority(
+            db, build_id, build_priority.priority)
+    except DataNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f'Build with {build_id=} is not found',
+        )
+
+
 @router.delete('/{build_id}/remove', status_code=204)
 async def remove_build(build_id: int, db: database.Session = Depends(get_db)):
     try:
@@ -74,9 +128,31 @@ async def remove_build(build_id: int, db: database.Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f'Build with {build_id=} is not found',
         )
-    if not result:
+    if result is None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f'Build with {build_id=} is released',
         )
-    return result
+    # Pulp removal is slow, so it runs after the database is cleaned up
+    if result:
+        await get_job_queue().enqueue(
+            REMOVE_REPOSITORIES_JOB, {'repositories': result})
+
+
+@router.delete('/remove-old', response_model=build_schema.BuildsRemoveResponse)
+async def remove_old_builds(
+            older_than_days: int = Query(..., ge=1),
+            limit: int = Query(100, ge=1, le=1000),
+            user: dict = Depends(JWTBearer()),
+            db: database.Session = Depends(get_db)
+        ):
+    # users can remove only their own builds
+    created_before = datetime.datetime.utcnow() - datetime.timedelta(
+        days=older_than_days)
+    build_ids, repos = await build_crud.remove_old_builds(
+        db, created_before, limit, user['identity']['user_id'])
+    job_id = None
+    if repos:
+        job_id = await get_job_queue().enqueue(
+            REMOVE_REPOSITORIES_JOB, {'repositories': repos})
+    return {'removed_builds': build_ids, 'job_id': job_id}
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from alws.dependencies import JWTBearer
+from alws.schemas import job_schema
+from alws.utils.job_queue import get_job_queue
+
+
+router = APIRouter(
+    prefix='/jobs',
+    tags=['jobs'],
+    dependencies=[Depends(JWTBearer())]
+)
+
+
+@router.get('/{job_id}/', response_model=job_schema.Job)
+async def get_job(job_id: str):
+    job = await get_job_queue().get_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f'Job with {job_id=} is not found'
+        )
+    return job
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+
+from alws import database
+from alws.dependencies import JWTBearer
+from alws.repository_pool import pool_metrics
+from alws.utils.artifact_cache import get_artifact_cache
+from alws.utils.repo_provisioning import provisioning_metrics
+
+
+router = APIRouter(
+    prefix='/metrics',
+    tags=['metrics'],
+    dependencies=[Depends(JWTBearer())]
+)
+
+
+@router.get('/')
+async def get_metrics():
+    artifact_cache = get_artifact_cache()
+    return {
+        'database_pool': database.get_pool_stats(),
+        'repository_provisioning': provisioning_metrics.get_stats(),
+        'repository_pool': pool_metrics.get_stats(),
+        'artifact_cache': (
+            artifact_cache.get_stats() if artifact_cache else None),
+    }
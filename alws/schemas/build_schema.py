@@ -7,7 +7,9 @@ from pydantic import BaseModel, validator, Field, conlist
 from alws.constants import BuildTaskRefType
 
 
-__all__ = ['BuildTaskRef', 'BuildCreate', 'Build', 'BuildsResponse']
+__all__ = ['BuildTaskRef', 'BuildCreate', 'BuildPriority', 'Build',
+           'BuildsResponse', 'BuildSummary', 'BuildsSummaryResponse',
+           'BuildsRemoveResponse']
 
 
 class BuildTaskRef(BaseModel):
@@ -55,6 +57,12 @@ class BuildCreate(BaseModel):
     tasks: conlist(BuildTaskRef, min_items=1)
     linked_builds: typing.Optional[typing.List[int]]
     mock_options: typing.Optional[typing.Dict[str, typing.Any]]
+    priority: int = 0
+
+
+class BuildPriority(BaseModel):
+
+    priority: int
 
 
 class BuildPlatform(BaseModel):
@@ -108,6 +116,7 @@ class BuildSearch(BaseModel):
     build_task_arch: typing.Optional[str]
     released: typing.Optional[bool]
     signed: typing.Optional[bool]
+    finished: typing.Optional[bool]
 
     @property
     def is_package_filter(self):
@@ -138,6 +147,7 @@ class Build(BaseModel):
     user: BuildUser
     linked_builds: typing.Optional[typing.List[int]] = Field(default_factory=list)
     mock_options: typing.Optional[typing.Dict[str, typing.Any]]
+    priority: int = 0
 
     @validator('linked_builds', pre=True)
     def linked_builds_validator(cls, v):
@@ -152,3 +162,39 @@ class BuildsResponse(BaseModel):
     builds: typing.List[Build]
     total_builds: typing.Optional[int]
     current_page: typing.Optional[int]
+    # pass as lastBuildId to get the next page
+    last_build_id: typing.Optional[int]
+
+
+class BuildTasksCount(BaseModel):
+
+    platform: str
+    arch: str
+    status: int
+    count: int
+
+
+class BuildSummary(BaseModel):
+
+    id: int
+    created_at: datetime.datetime
+    user: BuildUser
+    priority: int = 0
+    released: typing.Optional[bool]
+    signed: typing.Optional[bool]
+    tasks_count: int
+    tasks: typing.List[BuildTasksCount]
+
+
+class BuildsSummaryResponse(BaseModel):
+
+    builds: typing.List[BuildSummary]
+    total_builds: typing.Optional[int]
+    current_page: typing.Optional[int]
+    last_build_id: typing.Optional[int]
+
+
+class BuildsRemoveResponse(BaseModel):
+
+    removed_builds: typing.List[int]
+    job_id: typing.Optional[str]
@@ -0,0 +1,20 @@
+import datetime
+import typing
+
+from pydantic import BaseModel
+
+
+__all__ = ['Job']
+
+
+class Job(BaseModel):
+
+    id: str
+    name: str
+    status: int
+    attempts: int
+    max_attempts: int
+    idempotency_key: typing.Optional[str]
+    error: typing.Optional[str]
+    created_at: datetime.datetime
+    updated_at: datetime.datetime
@@ -0,0 +1,149 @@
+import collections
+import time
+import typing
+
+import aioredis
+
+from alws.config import settings
+
+
+__all__ = [
+    'BaseArtifactCache',
+    'LocalArtifactCache',
+    'RedisArtifactCache',
+    'create_artifact_cache',
+    'get_artifact_cache',
+    'set_artifact_cache',
+]
+
+
+ARTIFACT_CACHE: typing.Optional['BaseArtifactCache'] = None
+
+
+def get_artifact_cache() -> typing.Optional['BaseArtifactCache']:
+    return ARTIFACT_CACHE
+
+
+def set_artifact_cache(cache: typing.Optional['BaseArtifactCache']):
+    global ARTIFACT_CACHE
+    ARTIFACT_CACHE = cache
+
+
+class BaseArtifactCache:
+    """
+    Maps sha256 of uploaded content to the href of its Pulp artifact.
+    Artifacts are content-addressed, so only existing ones are cached;
+    TTL bounds the time an artifact removed by orphan cleanup stays
+    in the cache.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, sha256: str) -> typing.Optional[str]:
+        raise NotImplementedError()
+
+    async def set(self, sha256: str, artifact_href: str):
+        raise NotImplementedError()
+
+    async def discard(self, sha256: str):
+        raise NotImplementedError()
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    async def close(self):
+        pass
+
+
+class LocalArtifactCache(BaseArtifactCache):
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0):
+        super().__init__()
+        self._max_size = max_size
+        self._ttl = ttl
+        self._items: typing.OrderedDict[str, typing.Tuple[str, float]] = \
+            collections.OrderedDict()
+
+    async def get(self, sha256: str) -> typing.Optional[str]:
+        item = self._items.get(sha256)
+        if item is None or item[1] < time.monotonic():
+            self._items.pop(sha256, None)
+            self.misses += 1
+            return None
+        self._items.move_to_end(sha256)
+        self.hits += 1
+        return item[0]
+
+    async def set(self, sha256: str, artifact_href: str):
+        self._items[sha256] = (artifact_href, time.monotonic() + self._ttl)
+        self._items.move_to_end(sha256)
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+    async def discard(self, sha256: str):
+        self._items.pop(sha256, None)
+
+
+class RedisArtifactCache(BaseArtifactCache):
+    """
+    Shares cached artifacts between web server processes,
+    recently used ones are also kept in process memory.
+    """
+
+    def __init__(self, redis_url: str, max_size: int = 1024,
+                 ttl: float = 3600.0, prefix: str = 'alws:artifacts'):
+        super().__init__()
+        self._redis = aioredis.from_url(redis_url)
+        self._local = LocalArtifactCache(max_size=max_size, ttl=ttl)
+        self._ttl = ttl
+        self._prefix = prefix
+
+    def _key(self, sha256: str) -> str:
+        return f'{self._prefix}:{sha256}'
+
+    async def get(self, sha256: str) -> typing.Optional[str]:
+        artifact_href = await self._local.get(sha256)
+        if artifact_href is None:
+            artifact_href = await self._redis.get(self._key(sha256))
+            if artifact_href is not None:
+                artifact_href = artifact_href.decode()
+                await self._local.set(sha256, artifact_href)
+        if artifact_href is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return artifact_href
+
+    async def set(self, sha256: str, artifact_href: str):
+        await self._local.set(sha256, artifact_href)
+        await self._redis.set(
+            self._key(sha256), artifact_href, ex=int(self._ttl))
+
+    async def discard(self, sha256: str):
+        await self._local.discard(sha256)
+        await self._redis.delete(self._key(sha256))
+
+    async def close(self):
+        await self._redis.close()
+
+
+def create_artifact_cache() -> typing.Optional[BaseArtifactCache]:
+    if settings.artifact_cache_backend == 'none':
+        return None
+    if settings.artifact_cache_backend == 'local':
+        return LocalArtifactCache(
+            max_size=settings.artifact_cache_size,
+            ttl=settings.artifact_cache_ttl
+        )
+    return RedisArtifactCache(
+        settings.redis_url,
+        max_size=settings.artifact_cache_size,
+        ttl=settings.artifact_cache_ttl
+    )
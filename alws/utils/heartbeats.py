@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+import typing
+import uuid
+
+import aioredis
+
+from alws import database
+from alws.config import settings
+
+
+__all__ = [
+    'BaseHeartbeatStore',
+    'HeartbeatFlusher',
+    'LocalHeartbeatStore',
+    'RedisHeartbeatStore',
+    'create_heartbeat_store',
+    'get_heartbeat_store',
+    'set_heartbeat_store',
+]
+
+
+HEARTBEAT_STORE: typing.Optional['BaseHeartbeatStore'] = None
+
+
+def get_heartbeat_store() -> typing.Optional['BaseHeartbeatStore']:
+    return HEARTBEAT_STORE
+
+
+def set_heartbeat_store(store: typing.Optional['BaseHeartbeatStore']):
+    global HEARTBEAT_STORE
+    HEARTBEAT_STORE = store
+
+
+class BaseHeartbeatStore:
+    """
+    Keeps the latest heartbeat time of build tasks until it is flushed
+    to the database. Heartbeats are unix timestamps.
+    """
+
+    async def record(self, task_ids: typing.Iterable[int],
+                     timestamp: typing.Optional[float] = None):
+        raise NotImplementedError()
+
+    async def restore(self, heartbeats: typing.Dict[int, float]):
+        """
+        Puts back heartbeats which were taken but weren't saved.
+        """
+        raise NotImplementedError()
+
+    async def take_pending(self) -> typing.Dict[int, float]:
+        """
+        Returns heartbeats received since the previous call.
+        """
+        raise NotImplementedError()
+
+    async def get_alive_task_ids(self, since: float) -> typing.Set[int]:
+        """
+        Returns IDs of tasks which were pinged after the given time,
+        including heartbeats which aren't flushed yet.
+        """
+        raise NotImplementedError()
+
+    async def prune(self, before: float):
+        pass
+
+    async def close(self):
+        pass
+
+
+class LocalHeartbeatStore(BaseHeartbeatStore):
+
+    def __init__(self):
+        self._heartbeats: typing.Dict[int, float] = {}
+        self._pending: typing.Dict[int, float] = {}
+
+    async def record(self, task_ids: typing.Iterable[int],
+                     timestamp: typing.Optional[float] = None):
+        timestamp = timestamp or time.time()
+        for task_id in task_ids:
+            self._heartbeats[task_id] = timestamp
+            self._pending[task_id] = timestamp
+
+    async def restore(self, heartbeats: typing.Dict[int, float]):
+        for task_id, timestamp in heartbeats.items():
+            if self._pending.get(task_id, 0) < timestamp:
+                self._pending[task_id] = timestamp
+
+    async def take_pending(self) -> typing.Dict[int, float]:
+        pending, self._pending = self._pending, {}
+        return pending
+
+    async def get_alive_task_ids(self, since: float) -> typing.Set[int]:
+        return {task_id for task_id, timestamp in self._heartbeats.items()
+                if timestamp >= since}
+
+    async def prune(self, before: float):
+        self._heartbeats = {
+            task_id: timestamp
+            for task_id, timestamp in self._heartbeats.items()
+            if timestamp >= before
+        }
+
+
+class RedisHeartbeatStore(BaseHeartbeatStore):
+    """
+    Shares heartbeats between web server processes. Both latest and
+    pending heartbeats are sorted sets of task IDs scored by time.
+    """
+
+    def __init__(self, redis_url: str, prefix: str = 'alws:heartbeats'):
+        self._redis = aioredis.from_url(redis_url)
+        self._prefix = prefix
+        self._heartbeats_key = f'{prefix}:latest'
+        self._pending_key = f'{prefix}:pending'
+
+    async def record(self, task_ids: typing.Iterable[int],
+                     timestamp: typing.Optional[float] = None):
+        timestamp = timestamp or time.time()
+        mapping = {str(task_id): timestamp for task_id in task_ids}
+        if not mapping:
+            return
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(self._heartbeats_key, mapping)
+            pipe.zadd(self._pending_key, mapping)
+            await pipe.execute()
+
+    async def restore(self, heartbeats: typing.Dict[int, float]):
+        # heartbeats which are already pending are newer ones
+        if heartbeats:
+            await self._redis.zadd(self._pending_key, {
+                str(task_id): timestamp
+                for task_id, timestamp in heartbeats.items()
+            }, nx=True)
+
+    async def take_pending(self) -> typing.Dict[int, float]:
+        # renaming is atomic, so heartbeats received meanwhile go
+        # to the new pending set and are saved by the next flush
+        flushing_key = f'{self._prefix}:flushing:{uuid.uuid4().hex}'
+        try:
+            await self._redis.rename(self._pending_key, flushing_key)
+        except aioredis.ResponseError:
+            # there are no pending heartbeats
+            return {}
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zrange(flushing_key, 0, -1, withscores=True)
+            pipe.delete(flushing_key)
+            heartbeats, _ = await pipe.execute()
+        return {int(task_id): timestamp for task_id, timestamp in heartbeats}
+
+    async def get_alive_task_ids(self, since: float) -> typing.Set[int]:
+        task_ids = await self._redis.zrangebyscore(
+            self._heartbeats_key, since, '+inf')
+        return {int(task_id) for task_id in task_ids}
+
+    async def prune(self, before: float):
+        await self._redis.zremrangebyscore(
+            self._heartbeats_key, '-inf', f'({before}')
+
+    async def close(self):
+        await self._redis.close()
+
+
+class HeartbeatFlusher:
+    """
+    Periodically saves buffered heartbeats to the database
+    with a single bulk update.
+    """
+
+    def __init__(
+                self,
+                store: BaseHeartbeatStore,
+                save: typing.Callable[
+                    [typing.Any, typing.Dict[int, float]], typing.Awaitable],
+                interval: float = 30.0,
+                expiry: float = 1200.0,
+                session_factory: typing.Callable = database.Session
+            ):
+        self._store = store
+        self._save = save
+        self._session_factory = session_factory
+        self._interval = interval
+        self._expiry = expiry
+        self._task: typing.Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logging.exception('Cannot flush build task heartbeats')
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.flush()
+                await self._store.prune(time.time() - self._expiry)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception('Cannot flush build task heartbeats')
+
+    async def flush(self) -> int:
+        heartbeats = await self._store.take_pending()
+        if not heartbeats:
+            return 0
+        try:
+            async with self._session_factory() as db:
+                await self._save(db, heartbeats)
+        except BaseException:
+            await self._store.restore(heartbeats)
+            raise
+        return len(heartbeats)
+
+
+def create_heartbeat_store() -> typing.Optional[BaseHeartbeatStore]:
+    if settings.heartbeat_backend == 'database':
+        return None
+    if settings.heartbeat_backend == 'local':
+        return LocalHeartbeatStore()
+    return RedisHeartbeatStore(settings.redis_url)
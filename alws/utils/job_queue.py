@@ -0,0 +1,356 @@
+import asyncio
+import json
+import logging
+import time
+import typing
+import uuid
+
+import aioredis
+
+from alws.constants import JobStatus
+
+
+__all__ = [
+    'BaseJobQueue',
+    'JobWorkerPool',
+    'LocalJobQueue',
+    'RedisJobQueue',
+    'get_job_queue',
+    'set_job_queue',
+]
+
+
+JOB_QUEUE: typing.Optional['BaseJobQueue'] = None
+
+
+def get_job_queue() -> 'BaseJobQueue':
+    if JOB_QUEUE is None:
+        raise RuntimeError('Job queue is not initialized')
+    return JOB_QUEUE
+
+
+def set_job_queue(queue: typing.Optional['BaseJobQueue']):
+    global JOB_QUEUE
+    JOB_QUEUE = queue
+
+
+def new_job(name: str, payload: dict, max_attempts: int,
+            idempotency_key: typing.Optional[str] = None) -> dict:
+    now = time.time()
+    return {
+        'id': str(uuid.uuid4()),
+        'name': name,
+        'payload': payload,
+        'status': JobStatus.QUEUED,
+        'attempts': 0,
+        'max_attempts': max_attempts,
+        'idempotency_key': idempotency_key,
+        'error': None,
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+class BaseJobQueue:
+
+    def __init__(self, max_attempts: int = 5):
+        self._max_attempts = max_attempts
+
+    async def enqueue(self, name: str, payload: dict,
+                      idempotency_key: typing.Optional[str] = None,
+                      max_attempts: typing.Optional[int] = None) -> str:
+        """
+        Puts job into the queue and returns its ID. If a job with the same
+        idempotency key was already enqueued and didn't fail, ID of
+        the existing job is returned instead.
+        """
+        raise NotImplementedError()
+
+    async def dequeue(self, timeout: float) -> typing.Optional[dict]:
+        raise NotImplementedError()
+
+    async def save_job(self, job: dict):
+        raise NotImplementedError()
+
+    async def finish_job(self, job: dict):
+        raise NotImplementedError()
+
+    async def retry_job(self, job: dict, delay: float):
+        raise NotImplementedError()
+
+    async def get_job(self, job_id: str) -> typing.Optional[dict]:
+        raise NotImplementedError()
+
+    async def requeue_stale_jobs(self, stale_timeout: float):
+        pass
+
+    async def close(self):
+        pass
+
+
+class LocalJobQueue(BaseJobQueue):
+    """
+    In-process stand-in for RedisJobQueue, jobs are lost on restart.
+    """
+
+    def __init__(self, max_attempts: int = 5):
+        super().__init__(max_attempts=max_attempts)
+        self._queue = asyncio.Queue()
+        self._jobs = {}
+        self._idempotency_keys = {}
+
+    async def enqueue(self, name: str, payload: dict,
+                      idempotency_key: typing.Optional[str] = None,
+                      max_attempts: typing.Optional[int] = None) -> str:
+        if idempotency_key:
+            job_id = self._idempotency_keys.get(idempotency_key)
+            job = self._jobs.get(job_id)
+            if job and job['status'] != JobStatus.FAILED:
+                return job_id
+        job = new_job(name, payload, max_attempts or self._max_attempts,
+                      idempotency_key=idempotency_key)
+        self._jobs[job['id']] = job
+        if idempotency_key:
+            self._idempotency_keys[idempotency_key] = job['id']
+        await self._queue.put(job['id'])
+        return job['id']
+
+    async def dequeue(self, timeout: float) -> typing.Optional[dict]:
+        try:
+            job_id = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self._jobs[job_id]
+
+    async def save_job(self, job: dict):
+        job['updated_at'] = time.time()
+        self._jobs[job['id']] = job
+
+    async def finish_job(self, job: dict):
+        await self.save_job(job)
+
+    async def retry_job(self, job: dict, delay: float):
+        await self.save_job(job)
+        loop = asyncio.get_running_loop()
+        loop.call_later(delay, self._queue.put_nowait, job['id'])
+
+    async def get_job(self, job_id: str) -> typing.Optional[dict]:
+        return self._jobs.get(job_id)
+
+
+class RedisJobQueue(BaseJobQueue):
+    """
+    Durable job queue. Ready job IDs are kept in a list, jobs waiting
+    for retry in a sorted set scored by the time they become ready,
+    and jobs taken by workers in a processing list until they finish.
+    """
+
+    def __init__(self, redis_url: str, prefix: str = 'alws:jobs',
+                 max_attempts: int = 5, idempotency_ttl: int = 86400):
+        super().__init__(max_attempts=max_attempts)
+        self._redis = aioredis.from_url(redis_url)
+        self._prefix = prefix
+        self._idempotency_ttl = idempotency_ttl
+        self._queue_key = f'{prefix}:queue'
+        self._delayed_key = f'{prefix}:delayed'
+        self._processing_key = f'{prefix}:processing'
+
+    def _job_key(self, job_id: str) -> str:
+        return f'{self._prefix}:job:{job_id}'
+
+    def _idempotency_key(self, key: str) -> str:
+        return f'{self._prefix}:idempotency:{key}'
+
+    async def enqueue(self, name: str, payload: dict,
+                      idempotency_key: typing.Optional[str] = None,
+                      max_attempts: typing.Optional[int] = None) -> str:
+        job = new_job(name, payload, max_attempts or self._max_attempts,
+                      idempotency_key=idempotency_key)
+        if idempotency_key:
+            redis_key = self._idempotency_key(idempotency_key)
+            while not await self._redis.set(
+                    redis_key, job['id'], nx=True, ex=self._idempotency_ttl):
+                existing_id = await self._redis.get(redis_key)
+                if existing_id is None:
+                    # key expired after SET NX, try to take it again
+                    continue
+                existing_id = existing_id.decode()
+                existing_job = await self.get_job(existing_id)
+                if existing_job and \
+                        existing_job['status'] != JobStatus.FAILED:
+                    return existing_id
+                await self._redis.set(
+                    redis_key, job['id'], ex=self._idempotency_ttl)
+                break
+        await self.save_job(job)
+        await self._redis.lpush(self._queue_key, job['id'])
+        return job['id']
+
+    async def _move_delayed_jobs(self):
+        job_ids = await self._redis.zrangebyscore(
+            self._delayed_key, 0, time.time())
+        for job_id in job_ids:
+            # only one of concurrent workers will remove the job
+            if await self._redis.zrem(self._delayed_key, job_id):
+                await self._redis.lpush(self._queue_key, job_id)
+
+    async def dequeue(self, timeout: float) -> typing.Optional[dict]:
+        await self._move_delayed_jobs()
+        job_id = await self._redis.brpoplpush(
+            self._queue_key, self._processing_key, timeout=int(timeout) or 1)
+        if not job_id:
+            return None
+        job = await self.get_job(job_id.decode())
+        if job is None:
+            await self._redis.lrem(self._processing_key, 0, job_id)
+        return job
+
+    async def save_job(self, job: dict):
+        job['updated_at'] = time.time()
+        await self._redis.set(self._job_key(job['id']), json.dumps(job))
+
+    async def finish_job(self, job: dict):
+        await self.save_job(job)
+        # finished jobs are kept only while their results may be requested
+        await self._redis.expire(
+            self._job_key(job['id']), self._idempotency_ttl)
+        await self._redis.lrem(self._processing_key, 0, job['id'])
+
+    async def retry_job(self, job: dict, delay: float):
+        await self.save_job(job)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self._delayed_key, {job['id']: time.time() + delay})
+            pipe.lrem(self._processing_key, 0, job['id'])
+            await pipe.execute()
+
+    async def requeue_stale_jobs(self, stale_timeout: float):
+        """
+        Returns jobs left in processing list by dead workers to the queue.
+        """
+        job_ids = await self._redis.lrange(self._processing_key, 0, -1)
+        for job_id in job_ids:
+            job = await self.get_job(job_id.decode())
+            if job and time.time() - job['updated_at'] < stale_timeout:
+                continue
+            if await self._redis.lrem(self._processing_key, 0, job_id):
+                await self._redis.lpush(self._queue_key, job_id)
+
+    async def get_job(self, job_id: str) -> typing.Optional[dict]:
+        job = await self._redis.get(self._job_key(job_id))
+        if job is None:
+            return None
+        return json.loads(job)
+
+    async def close(self):
+        await self._redis.close()
+
+
+class JobWorkerPool:
+
+    def __init__(
+                self,
+                queue: BaseJobQueue,
+                handlers: typing.Dict[
+                    str, typing.Callable[[dict], typing.Awaitable]],
+                concurrency: int = 4,
+                retry_delay: float = 10.0,
+                poll_timeout: float = 1.0,
+                stale_timeout: float = 3600.0,
+                requeue_interval: float = 300.0
+            ):
+        self._queue = queue
+        self._handlers = handlers
+        self._concurrency = concurrency
+        self._retry_delay = retry_delay
+        self._poll_timeout = poll_timeout
+        self._stale_timeout = stale_timeout
+        self._requeue_interval = requeue_interval
+        self._workers: typing.List[asyncio.Task] = []
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._workers = [loop.create_task(self._work())
+                         for _ in range(self._concurrency)]
+        self._workers.append(loop.create_task(self._requeue_stale_jobs()))
+
+    async def _requeue_stale_jobs(self):
+        # jobs of workers which died in other app instances
+        # are picked up without waiting for a restart
+        while True:
+            try:
+                await self._queue.requeue_stale_jobs(self._stale_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception('Cannot requeue stale jobs')
+            await asyncio.sleep(self._requeue_interval)
+
+    async def _keep_alive(self, job: dict):
+        # running job is saved periodically, so it isn't taken
+        # for a job of a dead worker however long it runs
+        while True:
+            await asyncio.sleep(self._stale_timeout / 3)
+            try:
+                await self._queue.save_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception('Cannot save running job %s', job['id'])
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _work(self):
+        while True:
+            try:
+                job = await self._queue.dequeue(self._poll_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception('Cannot fetch job from the queue')
+                await asyncio.sleep(self._poll_timeout)
+                continue
+            if job is None:
+                continue
+            await self.process_job(job)
+
+    async def _run_handler(
+                self,
+                handler: typing.Callable[[dict], typing.Awaitable],
+                job: dict
+            ):
+        keep_alive = asyncio.get_running_loop().create_task(
+            self._keep_alive(job))
+        try:
+            await handler(job['payload'])
+        finally:
+            keep_alive.cancel()
+            await asyncio.gather(keep_alive, return_exceptions=True)
+
+    async def process_job(self, job: dict):
+        handler = self._handlers.get(job['name'])
+        job['attempts'] += 1
+        job['status'] = JobStatus.RUNNING
+        await self._queue.save_job(job)
+        try:
+            if handler is None:
+                raise ValueError(f'Unknown job type: {job["name"]}')
+            await self._run_handler(handler, job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            logging.exception('Job %s (%s) failed', job['id'], job['name'])
+            job['error'] = str(err)
+            if handler is not None and job['attempts'] < job['max_attempts']:
+                job['status'] = JobStatus.QUEUED
+                delay = self._retry_delay * 2 ** (job['attempts'] - 1)
+                await self._queue.retry_job(job, delay)
+                return
+            job['status'] = JobStatus.FAILED
+        else:
+            job['status'] = JobStatus.COMPLETED
+            job['error'] = None
+        await self._queue.finish_job(job)
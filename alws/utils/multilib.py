@@ -10,6 +10,7 @@ from alws import models
 from alws.config import settings
 from alws.constants import BuildTaskStatus
 from alws.utils.beholder_client import BeholderClient
+from alws.utils.nevra import get_artifacts_nevra, set_artifact_nevra
 from alws.utils.pulp_client import PulpClient
 
 
@@ -89,27 +90,32 @@ async def add_multilib_packages(
         ))
         db_artifacts = await db.execute(query)
         db_artifacts = db_artifacts.scalars().all()
+        # multilib packages could be already added by previous attempt
+        existing_names = await db.execute(
+            select(models.BuildTaskArtifact.name).where(
+                models.BuildTaskArtifact.build_task_id == build_task.id))
+        existing_names = set(existing_names.scalars().all())
+        db_artifacts = [artifact for artifact in db_artifacts
+                        if artifact.name not in existing_names]
 
         artifacts = []
         pkg_hrefs = []
         debug_pkg_hrefs = []
 
+        packages_info = await get_artifacts_nevra(pulp_client, db_artifacts)
         for artifact in db_artifacts:
             for pkg_name, pkg_version in multilib_packages.items():
                 if artifact.name.startswith(pkg_name):
-                    rpm_pkg = await pulp_client.get_rpm_package(
-                        package_href=artifact.href,
-                        include_fields=['name', 'version'],
-                    )
+                    rpm_pkg = packages_info.get(artifact.href, {})
                     if rpm_pkg.get('version', '') == pkg_version:
-                        artifacts.append(
-                            models.BuildTaskArtifact(
-                                build_task_id=build_task.id,
-                                name=artifact.name,
-                                type=artifact.type,
-                                href=artifact.href,
-                            )
+                        multilib_artifact = models.BuildTaskArtifact(
+                            build_task_id=build_task.id,
+                            name=artifact.name,
+                            type=artifact.type,
+                            href=artifact.href,
                         )
+                        set_artifact_nevra(multilib_artifact, rpm_pkg)
+                        artifacts.append(multilib_artifact)
                         if re.search(r'-debug(info|source)$', rpm_pkg['name']):
                             debug_pkg_hrefs.append(artifact.href)
                         else:
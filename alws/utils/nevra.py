@@ -0,0 +1,62 @@
+import typing
+
+from alws import models
+from alws.utils.pulp_client import PulpClient
+
+
+__all__ = [
+    'NEVRA_FIELDS',
+    'get_artifact_nevra',
+    'get_artifacts_nevra',
+    'set_artifact_nevra',
+]
+
+
+NEVRA_FIELDS = ('name', 'epoch', 'version', 'release', 'arch')
+
+
+def get_artifact_nevra(
+        artifact: models.BuildTaskArtifact) -> typing.Optional[dict]:
+    if artifact.rpm_name is None:
+        return None
+    return {field: getattr(artifact, f'rpm_{field}')
+            for field in NEVRA_FIELDS}
+
+
+def set_artifact_nevra(artifact: models.BuildTaskArtifact, package: dict):
+    for field in NEVRA_FIELDS:
+        value = package.get(field)
+        setattr(artifact, f'rpm_{field}',
+                str(value) if value is not None else None)
+
+
+async def get_artifacts_nevra(
+        pulp_client: PulpClient,
+        artifacts: typing.Iterable[models.BuildTaskArtifact]
+) -> typing.Dict[str, dict]:
+    """
+    Returns NEVRA of RPM artifacts stored in the database. Artifacts
+    created before NEVRA was stored are resolved in Pulp with a bulk query
+    and updated in place, so they will be saved on next commit.
+    """
+    result = {}
+    missing = []
+    for artifact in artifacts:
+        nevra = get_artifact_nevra(artifact)
+        if nevra is None:
+            missing.append(artifact)
+            continue
+        result[artifact.href] = nevra
+    if not missing:
+        return result
+    packages = await pulp_client.get_rpm_packages_by_hrefs(
+        [artifact.href for artifact in missing],
+        include_fields=list(NEVRA_FIELDS)
+    )
+    for artifact in missing:
+        package = packages.get(artifact.href)
+        if package is None:
+            continue
+        set_artifact_nevra(artifact, package)
+        result[artifact.href] = get_artifact_nevra(artifact)
+    return result
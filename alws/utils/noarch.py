@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session, selectinload
 from alws import models
 from alws.config import settings
 from alws.constants import BuildTaskStatus
+from alws.utils.nevra import get_artifact_nevra, set_artifact_nevra
 from alws.utils.pulp_client import PulpClient
 
 
@@ -68,6 +69,11 @@ async def save_noarch_packages(db: Session, build_task: models.BuildTask):
 
         repos_to_update = {}
         new_noarch_artifacts = []
+        source_artifacts = {
+            artifact.href: artifact
+            for task in build_tasks
+            for artifact in task.artifacts
+        }
         hrefs_to_add = list(noarch_packages.values())
         debug_hrefs_to_add = list(debug_noarch_packages.values())
 
@@ -92,14 +98,16 @@ async def save_noarch_packages(db: Session, build_task: models.BuildTask):
 
             artifacts_to_create = {**noarch, **debug_noarch}
             for name, href in artifacts_to_create.items():
-                new_noarch_artifacts.append(
-                    models.BuildTaskArtifact(
-                        build_task_id=task.id,
-                        name=name,
-                        type='rpm',
-                        href=href,
-                    )
+                new_artifact = models.BuildTaskArtifact(
+                    build_task_id=task.id,
+                    name=name,
+                    type='rpm',
+                    href=href,
                 )
+                nevra = get_artifact_nevra(source_artifacts[href])
+                if nevra:
+                    set_artifact_nevra(new_artifact, nevra)
+                new_noarch_artifacts.append(new_artifact)
 
             for repo in build_task.build.repos:
                 if (repo.arch == 'src' or repo.type != 'rpm'
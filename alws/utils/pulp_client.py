@@ -1,25 +1,172 @@
 import io
 import hashlib
+import logging
 import asyncio
+import contextlib
 import typing
 import urllib.parse
+import weakref
 from typing import Optional, List
 
 import aiohttp
 
+from alws.config import settings
+from alws.utils.artifact_cache import get_artifact_cache
 from alws.utils.modularity import ModuleWrapper, get_random_unique_version
+from alws.utils.pulp_task_waiter import PulpTaskWaiter
 
 
 PULP_SEMAPHORE = asyncio.Semaphore(10)
+PULP_SESSION: typing.Optional[aiohttp.ClientSession] = None
+PULP_SESSION_LOOP: typing.Optional[asyncio.AbstractEventLoop] = None
+# Task waiters are bound to the event loop, keep one per loop and Pulp host
+PULP_TASK_WAITERS: typing.MutableMapping[
+    asyncio.AbstractEventLoop, typing.Dict[str, PulpTaskWaiter]
+] = weakref.WeakKeyDictionary()
+
+
+async def open_pulp_session() -> aiohttp.ClientSession:
+    """
+    Creates process-wide pooled session shared by all PulpClient instances.
+    Should be called from application startup, session lives until
+    close_pulp_session() is called.
+    """
+    global PULP_SESSION, PULP_SESSION_LOOP
+    if PULP_SESSION is not None and not PULP_SESSION.closed:
+        return PULP_SESSION
+    connector = aiohttp.TCPConnector(
+        limit=settings.pulp_connection_limit,
+        limit_per_host=settings.pulp_connection_limit_per_host,
+        keepalive_timeout=settings.pulp_keepalive_timeout,
+        ttl_dns_cache=settings.pulp_dns_cache_ttl,
+        use_dns_cache=True,
+    )
+    # connect and read timeouts stay even if the total one is disabled,
+    # so a stalled connection doesn't hold a pool slot forever
+    timeout = aiohttp.ClientTimeout(
+        total=settings.pulp_request_timeout,
+        sock_connect=settings.pulp_connect_timeout,
+        sock_read=settings.pulp_read_timeout,
+    )
+    PULP_SESSION = aiohttp.ClientSession(connector=connector, timeout=timeout)
+    PULP_SESSION_LOOP = asyncio.get_running_loop()
+    return PULP_SESSION
+
+
+async def close_pulp_session():
+    global PULP_SESSION, PULP_SESSION_LOOP
+    if PULP_SESSION is None:
+        return
+    session, PULP_SESSION, PULP_SESSION_LOOP = PULP_SESSION, None, None
+    await session.close()
+
+
+async def get_cached_artifact(sha256: str) -> typing.Optional[str]:
+    cache = get_artifact_cache()
+    if cache is None:
+        return None
+    try:
+        return await cache.get(sha256)
+    except Exception:
+        # cache is an optimization, Pulp is asked instead
+        logging.exception('Cannot get artifact %s from cache', sha256)
+
+
+async def cache_artifact(sha256: str, artifact_href: str):
+    cache = get_artifact_cache()
+    if cache is None:
+        return
+    try:
+        await cache.set(sha256, artifact_href)
+    except Exception:
+        logging.exception('Cannot cache artifact %s', sha256)
+
+
+UploadContent = typing.Union[
+    str, bytes, typing.IO, typing.AsyncIterable[bytes]]
+
+
+def get_content_size(content: typing.IO) -> int:
+    if not hasattr(content, 'seek') or isinstance(content, io.TextIOBase):
+        raise ValueError('Size is required for streamed content')
+    position = content.tell()
+    size = content.seek(0, io.SEEK_END) - position
+    content.seek(position)
+    return size
+
+
+async def iter_content_chunks(
+            content: UploadContent,
+            chunk_size: int
+        ) -> typing.AsyncIterator[bytes]:
+    """
+    Yields content in chunks of chunk_size bytes, the last one can be
+    shorter.
+    """
+    if isinstance(content, str):
+        content = content.encode()
+    if isinstance(content, bytes):
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+        return
+    if hasattr(content, 'read'):
+        while True:
+            chunk = content.read(chunk_size)
+            if not chunk:
+                return
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            yield chunk
+    buffer = bytearray()
+    async for data in content:
+        buffer.extend(data)
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+# gunicorn rejects request lines longer than 4094 bytes by default,
+# the rest of the line is left for the endpoint and other parameters
+MAX_HREFS_QUERY_LENGTH = 3000
+
+
+def iter_href_chunks(
+            hrefs: typing.Iterable[str],
+            max_count: int,
+            max_length: int = MAX_HREFS_QUERY_LENGTH
+        ) -> typing.Iterator[typing.List[str]]:
+    """
+    Splits hrefs into chunks which URL encoded `pulp_href__in` value
+    fits into max_length.
+    """
+    chunk = []
+    chunk_length = 0
+    for href in hrefs:
+        # counted with slashes encoded too, comma separator is %2C
+        href_length = len(urllib.parse.quote(href, safe='')) + 3
+        if chunk and (len(chunk) >= max_count
+                      or chunk_length + href_length > max_length):
+            yield chunk
+            chunk = []
+            chunk_length = 0
+        chunk.append(href)
+        chunk_length += href_length
+    if chunk:
+        yield chunk
 
 
 class PulpClient:
 
-    def __init__(self, host: str, username: str, password: str):
+    def __init__(self, host: str, username: str, password: str,
+                 semaphore: typing.Optional[asyncio.Semaphore] = None):
         self._host = host
         self._username = username
         self._password = password
         self._auth = aiohttp.BasicAuth(self._username, self._password)
+        # limits concurrent write requests, shared by default
+        self._semaphore = semaphore or PULP_SEMAPHORE
 
     async def create_log_repo(
             self, name: str, distro_path_start: str = 'build_logs') -> (str, str):
@@ -72,6 +219,23 @@ class PulpClient:
             return None
         return response['results'][0]
 
+    async def get_log_repository(
+            self, name: str) -> typing.Union[dict, None]:
+        endpoint = 'pulp/api/v3/repositories/file/file/'
+        params = {'name': name}
+        response = await self.make_get_request(endpoint, params=params)
+        if response['count'] == 0:
+            return None
+        return response['results'][0]
+
+    async def get_log_distro(self, name: str) -> typing.Union[dict, None]:
+        endpoint = 'pulp/api/v3/distributions/file/file/'
+        params = {'name': f'{name}-distro'}
+        response = await self.make_get_request(endpoint, params=params)
+        if response['count'] == 0:
+            return None
+        return response['results'][0]
+
     async def get_rpm_remote(self, name: str) -> typing.Union[dict, None]:
         endpoint = 'pulp/api/v3/remotes/rpm/rpm/'
         params = {'name__contains': name}
@@ -102,54 +266,121 @@ class PulpClient:
         }
         task = await self.make_post_request(ENDPOINT, data=payload)
         task_result = await self.wait_for_task(task['task'])
-        return task_result['created_resources'][0], sha256
+        module_href = task_result['created_resources'][0]
+        return module_href, sha256
 
     async def check_if_artifact_exists(self, sha256: str) -> str:
+        artifact_href = await get_cached_artifact(sha256)
+        if artifact_href:
+            return artifact_href
         ENDPOINT = 'pulp/api/v3/artifacts/'
         payload = {
             'sha256': sha256
         }
         response = await self.make_get_request(ENDPOINT, params=payload)
         if response['count']:
-            return response['results'][0]['pulp_href']
+            artifact_href = response['results'][0]['pulp_href']
+            await cache_artifact(sha256, artifact_href)
+            return artifact_href
 
-    async def _upload_file(self, content, sha256):
+    async def _upload_file(
+                self,
+                content: UploadContent,
+                size: int,
+                chunk_size: int,
+                concurrency: int
+            ) -> typing.Tuple[str, str]:
         response = await self.make_post_request(
-            'pulp/api/v3/uploads/', {'size': len(content)}
+            'pulp/api/v3/uploads/', {'size': size}
         )
         upload_href = response['pulp_href']
-        payload = {
-            'file': io.StringIO(content)
-        }
-        headers = {
-            'Content-Range': f'bytes 0-{len(content) - 1}/{len(content)}'
-        }
-        await self.make_put_request(
-            upload_href, data=payload, headers=headers
-        )
+        hasher = hashlib.sha256()
+        # at most `concurrency` chunks are read ahead and kept in memory
+        slots = asyncio.Semaphore(concurrency)
+        uploads = []
+
+        async def upload_chunk(chunk: bytes, start: int):
+            try:
+                headers = {
+                    'Content-Range':
+                        f'bytes {start}-{start + len(chunk) - 1}/{size}'
+                }
+                await self.make_put_request(
+                    upload_href, data={'file': io.BytesIO(chunk)},
+                    headers=headers
+                )
+            finally:
+                slots.release()
+
+        try:
+            offset = 0
+            async for chunk in iter_content_chunks(content, chunk_size):
+                hasher.update(chunk)
+                await slots.acquire()
+                uploads.append(asyncio.ensure_future(
+                    upload_chunk(chunk, offset)))
+                offset += len(chunk)
+            await asyncio.gather(*uploads)
+        except BaseException:
+            for upload in uploads:
+                upload.cancel()
+            await asyncio.gather(*uploads, return_exceptions=True)
+            await self.make_delete_request(upload_href)
+            raise
+        if offset != size:
+            await self.make_delete_request(upload_href)
+            raise ValueError(
+                f'Uploaded {offset} bytes instead of declared {size}')
+        sha256 = hasher.hexdigest()
+        reference = await self.check_if_artifact_exists(sha256)
+        if reference:
+            # streamed content turned out to be a known artifact
+            await self.make_delete_request(upload_href)
+            return reference, sha256
         task = await self.make_post_request(
             f'{upload_href}commit/', data={'sha256': sha256}
         )
         task_result = await self.wait_for_task(task['task'])
-        return task_result['created_resources'][0]
+        artifact_href = task_result['created_resources'][0]
+        await cache_artifact(sha256, artifact_href)
+        return artifact_href, sha256
 
-    # TODO: move this to utils, make it looks better
-    def _hash_content(self, content):
-        hasher = hashlib.new('sha256')
-        hasher.update(content.encode())
-        return hasher.hexdigest()
+    async def upload_file(
+                self,
+                content: UploadContent = None,
+                size: typing.Optional[int] = None,
+                chunk_size: typing.Optional[int] = None,
+                concurrency: typing.Optional[int] = None
+            ) -> typing.Tuple[str, str]:
+        """
+        Uploads content to Pulp as an artifact in chunks, returns
+        artifact href and sha256 of the content.
 
-    async def upload_file(self, content=None):
-        file_sha256 = self._hash_content(content)
-        reference = await self.check_if_artifact_exists(file_sha256)
-        if not reference:
-            reference = await self._upload_file(content, file_sha256)
-        return reference, file_sha256
+        Content can be a string, bytes, a binary or text file object
+        or an async iterable of bytes. Size is required for iterables
+        and unseekable files, Pulp needs it before the first chunk.
+        """
+        if isinstance(content, str):
+            content = content.encode()
+        if isinstance(content, bytes):
+            # in-memory content is cheap to hash before the upload
+            sha256 = hashlib.sha256(content).hexdigest()
+            reference = await self.check_if_artifact_exists(sha256)
+            if reference:
+                return reference, sha256
+            size = len(content)
+        elif size is None:
+            size = get_content_size(content)
+        return await self._upload_file(
+            content, size,
+            chunk_size or settings.pulp_upload_chunk_size,
+            concurrency or settings.pulp_upload_concurrency
+        )
 
     async def get_repo_modules_yaml(self, url: str, sha256: str):
         full_url = urllib.parse.urljoin(url, f'repodata/{sha256}-modules.yaml')
-        async with aiohttp.ClientSession(auth=self._auth) as session:
-            async with session.get(full_url) as response:
+        async with self._session() as session:
+            async with session.get(full_url, auth=self._auth) as response:
                 text = await response.text()
                 response.raise_for_status()
                 return text
@@ -182,14 +413,15 @@ class PulpClient:
                 self,
                 file_name: str,
                 artifact_href: str,
-                repo: str
+                repo: typing.Optional[str] = None
             ) -> str:
         ENDPOINT = 'pulp/api/v3/content/file/files/'
         payload = {
             'relative_path': file_name,
             'artifact': artifact_href,
-            'repository': repo
         }
+        if repo:
+            payload['repository'] = repo
         task = await self.make_post_request(ENDPOINT, data=payload)
         task_result = await self.wait_for_task(task['task'])
         hrefs = [item for item in task_result['created_resources']
@@ -200,14 +432,15 @@ class PulpClient:
                 self,
                 package_name: str,
                 artifact_href: str,
-                repo: str
+                repo: typing.Optional[str] = None
             ) -> str:
         ENDPOINT = 'pulp/api/v3/content/rpm/packages/'
         payload = {
             'relative_path': package_name,
             'artifact': artifact_href,
-            'repository': repo
         }
+        if repo:
+            payload['repository'] = repo
         task = await self.make_post_request(ENDPOINT, data=payload)
         task_result = await self.wait_for_task(task['task'])
         hrefs = [item for item in task_result['created_resources']
@@ -257,6 +490,60 @@ class PulpClient:
             params['exclude_fields'] = exclude_fields
         return await self.make_get_request(package_href, params=params)
 
+    async def get_rpm_packages_by_hrefs(
+                self,
+                package_hrefs: typing.Iterable[str],
+                include_fields: typing.List[str] = None,
+                chunk_size: int = 100
+            ) -> typing.Dict[str, dict]:
+        """
+        Fetches many RPM packages with a few `pulp_href__in` queries
+        instead of one request per package.
+        Returns mapping of package href to package info.
+        """
+        ENDPOINT = 'pulp/api/v3/content/rpm/packages/'
+        params = {}
+        if include_fields:
+            params['fields'] = ','.join(set(include_fields) | {'pulp_href'})
+        return await self.get_by_hrefs(
+            ENDPOINT, package_hrefs, params=params, chunk_size=chunk_size)
+
+    async def get_by_hrefs(
+                self,
+                endpoint: str,
+                hrefs: typing.Iterable[str],
+                params: dict = None,
+                chunk_size: int = 100
+            ) -> typing.Dict[str, dict]:
+        """
+        Fetches many objects of the endpoint with `pulp_href__in` queries.
+        Returns mapping of object href to object.
+        """
+        requests = []
+        for chunk in iter_href_chunks(dict.fromkeys(hrefs), chunk_size):
+            chunk_params = dict(params or {})
+            chunk_params.update({
+                'pulp_href__in': ','.join(chunk),
+                'limit': len(chunk),
+            })
+            requests.append(self.get_all_pages(endpoint, params=chunk_params))
+        result = {}
+        for pages in await asyncio.gather(*requests):
+            for item in pages:
+                result[item['pulp_href']] = item
+        return result
+
+    async def get_all_pages(self, endpoint: str,
+                         params: dict = None) -> typing.List[dict]:
+        results = []
+        response = await self.make_get_request(endpoint, params=params)
+        results.extend(response['results'])
+        while response.get('next'):
+            # next link already contains all query parameters
+            response = await self.make_get_request(response['next'])
+            results.extend(response['results'])
+        return results
+
     async def remove_artifact(self, artifact_href: str,
                               need_wait_sync: bool=False):
         await self.make_delete_request(artifact_href)
@@ -264,6 +551,20 @@ class PulpClient:
             remove_task = await self.get_distro(artifact_href)
             return remove_task
 
+    async def remove_repository(self, name: str, repo_href: str,
+                                content_type: str = 'rpm'):
+        """
+        Removes repository with its distribution without waiting for
+        Pulp tasks. Already removed ones are skipped, so removal
+        can be retried.
+        """
+        endpoint = f'pulp/api/v3/distributions/{content_type}/{content_type}/'
+        response = await self.make_get_request(
+            endpoint, params={'name': f'{name}-distro'})
+        for distro in response['results']:
+            await self.make_delete_request(distro['pulp_href'])
+        await self.make_delete_request(repo_href)
+
     async def create_rpm_remote(self, remote_name: str, remote_url: str,
                                 remote_policy: str = 'on_demand') -> str:
         """
@@ -311,17 +612,48 @@ class PulpClient:
     async def get_distro(self, distro_href: str):
         return await self.make_get_request(distro_href)
 
-    async def wait_for_task(self, task_href: str):
-        task = await self.make_get_request(task_href)
-        while task['state'] not in ('failed', 'completed'):
-            await asyncio.sleep(0.3)
-            task = await self.make_get_request(task_href)
-        return task
+    async def get_tasks(self, task_hrefs: typing.List[str]) -> List[dict]:
+        ENDPOINT = 'pulp/api/v3/tasks/'
+        tasks = await self.get_by_hrefs(ENDPOINT, task_hrefs)
+        return list(tasks.values())
+
+    def _get_task_waiter(self) -> PulpTaskWaiter:
+        loop = asyncio.get_running_loop()
+        loop_waiters = PULP_TASK_WAITERS.setdefault(loop, {})
+        waiter = loop_waiters.get(self._host)
+        if waiter is None:
+            waiter = PulpTaskWaiter(
+                self.get_tasks,
+                min_interval=settings.pulp_task_poll_min_interval,
+                max_interval=settings.pulp_task_poll_max_interval,
+            )
+            loop_waiters[self._host] = waiter
+        return waiter
+
+    async def wait_for_task(self, task_href: str,
+                            timeout: typing.Optional[float] = None):
+        if timeout is None:
+            timeout = settings.pulp_task_timeout
+        return await self._get_task_waiter().wait(task_href, timeout=timeout)
+
+    @contextlib.asynccontextmanager
+    async def _session(self):
+        # Shared session is bound to the event loop it was created in,
+        # standalone scripts and other threads fall back to a short-lived
+        # session of their own
+        session = PULP_SESSION
+        if (session is not None and not session.closed
+                and PULP_SESSION_LOOP is asyncio.get_running_loop()):
+            yield session
+            return
+        async with aiohttp.ClientSession() as session:
+            yield session
 
     async def make_get_request(self, endpoint: str, params: dict = None):
         full_url = urllib.parse.urljoin(self._host, endpoint)
-        async with aiohttp.ClientSession(auth=self._auth) as session:
-            async with session.get(full_url, params=params) as response:
+        async with self._session() as session:
+            async with session.get(full_url, params=params,
+                                   auth=self._auth) as response:
                 json = await response.json(content_type=None)
                 response.raise_for_status()
                 return json
@@ -329,9 +661,10 @@ class PulpClient:
     async def make_post_request(self, endpoint: str, data: Optional[dict],
                                 headers: Optional[dict] = None):
         full_url = urllib.parse.urljoin(self._host, endpoint)
-        async with PULP_SEMAPHORE:
-            async with aiohttp.ClientSession(auth=self._auth) as session:
-                async with session.post(full_url, json=data, headers=headers) as response:
+        async with self._semaphore:
+            async with self._session() as session:
+                async with session.post(full_url, json=data, headers=headers,
+                                       auth=self._auth) as response:
                     json = await response.json(content_type=None)
                     response.raise_for_status()
                     return json
@@ -339,9 +672,10 @@ class PulpClient:
     async def make_put_request(self, endpoint: str, data: Optional[dict],
                                headers: Optional[dict] = None):
         full_url = urllib.parse.urljoin(self._host, endpoint)
-        async with PULP_SEMAPHORE:
-            async with aiohttp.ClientSession(auth=self._auth) as session:
-                async with session.put(full_url, data=data, headers=headers) as response:
+        async with self._semaphore:
+            async with self._session() as session:
+                async with session.put(full_url, data=data, headers=headers,
+                                       auth=self._auth) as response:
                     json = await response.json(content_type=None)
                     response.raise_for_status()
                     return json
@@ -349,17 +683,19 @@ class PulpClient:
     async def make_patch_request(self, endpoint: str, data: Optional[dict],
                                  headers: Optional[dict] = None):
         full_url = urllib.parse.urljoin(self._host, endpoint)
-        async with PULP_SEMAPHORE:
-            async with aiohttp.ClientSession(auth=self._auth) as session:
-                async with session.patch(full_url, data=data, headers=headers) as response:
+        async with self._semaphore:
+            async with self._session() as session:
+                async with session.patch(full_url, data=data, headers=headers,
+                                       auth=self._auth) as response:
                     json = await response.json(content_type=None)
                     response.raise_for_status()
                     return json
 
     async def make_delete_request(self, endpoint: str):
         full_url = urllib.parse.urljoin(self._host, endpoint)
-        async with PULP_SEMAPHORE:
-            async with aiohttp.ClientSession(auth=self._auth) as session:
-                async with session.delete(full_url) as response:
+        async with self._semaphore:
+            async with self._session() as session:
+                async with session.delete(full_url,
+                                          auth=self._auth) as response:
                     json = await response.json(content_type=None)
                     return json
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import typing
+
+from alws.errors import PulpTaskTimeoutError
+
+
+__all__ = ['PulpTaskWaiter']
+
+
+FINISHED_STATES = ('completed', 'failed', 'canceled', 'skipped')
+
+
+class PulpTaskWaiter:
+    """
+    Watches many in-flight Pulp tasks with a single batched query
+    per tick. Poll interval grows exponentially while nothing finishes
+    and falls back to the minimal one as soon as new tasks arrive
+    or some task completes.
+    """
+
+    def __init__(
+                self,
+                fetch_tasks: typing.Callable[
+                    [typing.List[str]], typing.Awaitable[typing.List[dict]]],
+                min_interval: float = 0.3,
+                max_interval: float = 5.0,
+                backoff_factor: float = 1.5,
+                batch_size: int = 100
+            ):
+        self._fetch_tasks = fetch_tasks
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._backoff_factor = backoff_factor
+        self._batch_size = batch_size
+        self._interval = min_interval
+        # task href -> list of (future, deadline) pairs, one per caller
+        self._pending: typing.Dict[str, typing.List[
+            typing.Tuple[asyncio.Future, typing.Optional[float]]]] = {}
+        self._next_poll_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._runner: typing.Optional[asyncio.Task] = None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def wait(self, task_href: str,
+                   timeout: typing.Optional[float] = None) -> dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        deadline = loop.time() + timeout if timeout else None
+        self._pending.setdefault(task_href, []).append((future, deadline))
+        self._interval = self._min_interval
+        next_poll_at = loop.time() + self._min_interval
+        if self._runner is None or self._runner.done():
+            self._next_poll_at = next_poll_at
+            self._runner = loop.create_task(self._run())
+        elif next_poll_at < self._next_poll_at:
+            self._next_poll_at = next_poll_at
+            self._wakeup.set()
+        try:
+            return await future
+        finally:
+            if not future.done():
+                # caller was cancelled, forget about its future
+                future.cancel()
+            self._discard(task_href, future)
+
+    def _discard(self, task_href: str, future: asyncio.Future):
+        waiters = [item for item in self._pending.get(task_href, [])
+                   if item[0] is not future]
+        if waiters:
+            self._pending[task_href] = waiters
+        else:
+            self._pending.pop(task_href, None)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            self._wakeup.clear()
+            delay = self._next_poll_at - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._poll()
+            self._next_poll_at = loop.time() + self._interval
+
+    def _expire(self, now: float):
+        for task_href, waiters in list(self._pending.items()):
+            for future, deadline in waiters:
+                if deadline is not None and deadline <= now \
+                        and not future.done():
+                    future.set_exception(PulpTaskTimeoutError(
+                        f'Pulp task {task_href} is not finished in time'))
+
+    async def _poll(self):
+        loop = asyncio.get_running_loop()
+        self._expire(loop.time())
+        hrefs = [href for href, waiters in self._pending.items()
+                 if any(not future.done() for future, _ in waiters)]
+        if not hrefs:
+            return
+        chunks = [hrefs[start:start + self._batch_size]
+                  for start in range(0, len(hrefs), self._batch_size)]
+        try:
+            responses = await asyncio.gather(
+                *(self._fetch_tasks(chunk) for chunk in chunks))
+        except Exception as err:
+            logging.warning('Cannot fetch Pulp tasks state: %s', err)
+            self._backoff()
+            return
+        has_finished = False
+        for task in (task for response in responses for task in response):
+            if task.get('state') not in FINISHED_STATES:
+                continue
+            waiters = self._pending.get(task['pulp_href'])
+            if not waiters:
+                continue
+            has_finished = True
+            for future, _ in waiters:
+                if not future.done():
+                    future.set_result(task)
+        if has_finished:
+            self._interval = self._min_interval
+        else:
+            self._backoff()
+
+    def _backoff(self):
+        self._interval = min(self._interval * self._backoff_factor,
+                             self._max_interval)
@@ -0,0 +1,179 @@
+import asyncio
+import collections
+import logging
+import time
+import typing
+
+from alws.config import settings
+from alws.utils.pulp_client import PulpClient
+
+
+__all__ = [
+    'RepositoryProvisioner',
+    'RepositoryRequest',
+    'provisioning_metrics',
+]
+
+
+# Pulp endpoints of repositories, publications and distributions
+REPOSITORY_TYPES = {
+    'rpm': (
+        'pulp/api/v3/repositories/rpm/rpm/',
+        'pulp/api/v3/publications/rpm/rpm/',
+        'pulp/api/v3/distributions/rpm/rpm/',
+    ),
+    'file': (
+        'pulp/api/v3/repositories/file/file/',
+        'pulp/api/v3/publications/file/file/',
+        'pulp/api/v3/distributions/file/file/',
+    ),
+}
+
+
+class RepositoryRequest(typing.NamedTuple):
+
+    name: str
+    content_type: str = 'rpm'
+    base_path_start: str = 'builds'
+    retain_repo_versions: typing.Optional[int] = None
+
+
+class StageMetrics:
+
+    def __init__(self):
+        self.stages = collections.defaultdict(
+            lambda: {'count': 0, 'total': 0.0, 'max': 0.0})
+
+    def record(self, stage: str, duration: float):
+        stats = self.stages[stage]
+        stats['count'] += 1
+        stats['total'] += duration
+        stats['max'] = max(stats['max'], duration)
+
+    def get_stats(self) -> dict:
+        return {
+            stage: {**stats, 'avg': stats['total'] / stats['count']}
+            for stage, stats in self.stages.items()
+        }
+
+
+provisioning_metrics = StageMetrics()
+
+
+class RepositoryProvisioner:
+    """
+    Creates Pulp repositories with publications and distributions.
+
+    Publication and distribution of a repository are created at the same
+    time, Pulp tasks of all repositories are awaited together and created
+    distributions are fetched with a few bulk requests. Requests to Pulp
+    are limited by a semaphore of their own, so provisioning doesn't wait
+    for other Pulp traffic of the process.
+    """
+
+    def __init__(self, host: str, username: str, password: str,
+                 concurrency: typing.Optional[int] = None):
+        self._semaphore = asyncio.Semaphore(
+            concurrency or settings.pulp_provisioning_concurrency)
+        self._pulp_client = PulpClient(
+            host, username, password, semaphore=self._semaphore)
+
+    async def _timed(self, stage: str, coroutine,
+                     timings: typing.Dict[str, float]):
+        start = time.monotonic()
+        try:
+            return await coroutine
+        finally:
+            duration = time.monotonic() - start
+            timings[stage] += duration
+            provisioning_metrics.record(stage, duration)
+
+    async def _wait_for_resource(self, endpoint: str, payload: dict) -> str:
+        task = await self._pulp_client.make_post_request(
+            endpoint, data=payload)
+        task_result = await self._pulp_client.wait_for_task(task['task'])
+        return task_result['created_resources'][0]
+
+    async def _create_repository(
+                self,
+                request: RepositoryRequest,
+                timings: typing.Dict[str, float]
+            ) -> typing.Tuple[str, str]:
+        repo_endpoint, publication_endpoint, distro_endpoint = \
+            REPOSITORY_TYPES[request.content_type]
+        payload = {'name': request.name, 'autopublish': True}
+        if request.retain_repo_versions:
+            payload['retain_repo_versions'] = request.retain_repo_versions
+        repository = await self._timed(
+            'repository',
+            self._pulp_client.make_post_request(repo_endpoint, data=payload),
+            timings
+        )
+        repo_href = repository['pulp_href']
+        # distribution serves the latest publication of the repository,
+        # so it doesn't have to wait for the initial one
+        _, distro_href = await asyncio.gather(
+            self._timed('publication', self._wait_for_resource(
+                publication_endpoint, {'repository': repo_href}), timings),
+            self._timed('distribution', self._wait_for_resource(
+                distro_endpoint, {
+                    'repository': repo_href,
+                    'name': f'{request.name}-distro',
+                    'base_path': f'{request.base_path_start}/{request.name}',
+                }), timings),
+        )
+        return repo_href, distro_href
+
+    async def provision(
+                self,
+                requests: typing.List[RepositoryRequest]
+            ) -> typing.List[typing.Tuple[str, str]]:
+        """
+        Returns (distribution URL, repository href) for every request.
+        """
+        timings = collections.defaultdict(float)
+        start = time.monotonic()
+        created = await asyncio.gather(*(
+            self._create_repository(request, timings)
+            for request in requests
+        ))
+        distros = {}
+        for content_type in {request.content_type for request in requests}:
+            distro_hrefs = [
+                distro_href
+                for request, (_, distro_href) in zip(requests, created)
+                if request.content_type == content_type
+            ]
+            distros.update(await self._timed(
+                'distribution_lookup',
+                self._pulp_client.get_by_hrefs(
+                    REPOSITORY_TYPES[content_type][2], distro_hrefs),
+                timings
+            ))
+        total = time.monotonic() - start
+        provisioning_metrics.record('total', total)
+        logging.info(
+            'Provisioned %d repositories in %.2fs, cumulative stage time: %s',
+            len(requests), total, ', '.join(
+                f'{stage} {duration:.2f}s'
+                for stage, duration in timings.items()
+            )
+        )
+        return [
+            (distros[distro_href]['base_url'], repo_href)
+            for repo_href, distro_href in created
+        ]
+
+    async def remove(
+                self,
+                requests: typing.List[RepositoryRequest],
+                repo_hrefs: typing.List[str]
+            ):
+        """
+        Removes provisioned repositories which weren't used.
+        """
+        await asyncio.gather(*(
+            self._pulp_client.remove_repository(
+                request.name, repo_href, content_type=request.content_type)
+            for request, repo_href in zip(requests, repo_hrefs)
+        ))
@@ -0,0 +1,149 @@
+import collections
+import typing
+
+
+__all__ = [
+    'FairSharePolicy',
+    'FifoPolicy',
+    'PriorityPolicy',
+    'ReadyTask',
+    'SchedulingPolicy',
+    'get_scheduling_policy',
+]
+
+
+class ReadyTask(typing.NamedTuple):
+
+    task_id: int
+    arch: str
+    priority: int
+    build_id: int
+    user_id: int
+    platform_id: int
+
+
+def priority_order(task: ReadyTask):
+    return -task.priority, task.task_id
+
+
+class SchedulingPolicy:
+    """
+    Chooses which of the ready build tasks goes to a build node.
+
+    Tasks of one group are always taken in (priority DESC, task_id)
+    order, so policy chooses between the first tasks of every group.
+    Without a group key the first ready task is taken.
+    """
+
+    group_key: typing.Optional[str] = None
+    use_priority: bool = True
+
+    def get_candidates(
+                self,
+                ready_tasks: typing.Iterable[ReadyTask]
+            ) -> typing.List[ReadyTask]:
+        best = {}
+        for task in ready_tasks:
+            group = getattr(task, self.group_key) if self.group_key else None
+            current = best.get(group)
+            if current is None or priority_order(task) < \
+                    priority_order(current):
+                best[group] = task
+        return list(best.values())
+
+    def select(
+                self,
+                candidates: typing.List[ReadyTask],
+                running: typing.Dict[int, int]
+            ) -> typing.Optional[ReadyTask]:
+        """
+        Returns the task to start. running maps IDs of candidate groups
+        to the number of their currently running tasks.
+        """
+        if not candidates:
+            return None
+        return min(candidates, key=priority_order)
+
+    def pick(
+                self,
+                ready_tasks: typing.Iterable[ReadyTask],
+                running: typing.Dict[int, int]
+            ) -> typing.Optional[ReadyTask]:
+        return self.select(self.get_candidates(ready_tasks), running)
+
+
+class FifoPolicy(SchedulingPolicy):
+    """
+    Tasks are started in order of creation, priorities are ignored.
+    """
+
+    use_priority = False
+
+    def get_candidates(
+                self,
+                ready_tasks: typing.Iterable[ReadyTask]
+            ) -> typing.List[ReadyTask]:
+        first = min(ready_tasks, key=lambda task: task.task_id, default=None)
+        return [first] if first else []
+
+    def select(self, candidates, running):
+        return min(candidates, key=lambda task: task.task_id, default=None)
+
+
+class PriorityPolicy(SchedulingPolicy):
+    """
+    Tasks with the highest priority are started first,
+    equal ones in order of creation.
+    """
+
+
+class FairSharePolicy(SchedulingPolicy):
+    """
+    Starts a task of the group (user, platform or build) which has the
+    least running tasks relative to its weight, so a large build can't
+    take all build nodes while other groups have ready tasks.
+    """
+
+    def __init__(self, group_key: str = 'user_id',
+                 weights: typing.Optional[typing.Dict[int, float]] = None):
+        if group_key not in ReadyTask._fields:
+            raise ValueError(f'Unknown group key: {group_key}')
+        self.group_key = group_key
+        self.weights = weights or {}
+
+    def get_weight(self, group: int) -> float:
+        return self.weights.get(group, 1.0)
+
+    def select(
+                self,
+                candidates: typing.List[ReadyTask],
+                running: typing.Dict[int, int]
+            ) -> typing.Optional[ReadyTask]:
+        if not candidates:
+            return None
+
+        def share_order(task: ReadyTask):
+            group = getattr(task, self.group_key)
+            share = running.get(group, 0) / self.get_weight(group)
+            return (share, *priority_order(task))
+
+        return min(candidates, key=share_order)
+
+
+SCHEDULING_POLICIES = collections.OrderedDict((
+    ('fifo', FifoPolicy),
+    ('priority', PriorityPolicy),
+    ('fair_share', FairSharePolicy),
+))
+
+
+def get_scheduling_policy(
+            name: str,
+            group_key: str = 'user_id',
+            weights: typing.Optional[typing.Dict[int, float]] = None
+        ) -> SchedulingPolicy:
+    if name not in SCHEDULING_POLICIES:
+        raise ValueError(f'Unknown scheduling policy: {name}')
+    if name == 'fair_share':
+        return FairSharePolicy(group_key=group_key, weights=weights)
+    return SCHEDULING_POLICIES[name]()
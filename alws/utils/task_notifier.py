@@ -0,0 +1,150 @@
+import asyncio
+import collections
+import contextlib
+import json
+import logging
+import typing
+
+import aioredis
+
+from alws.config import settings
+
+
+__all__ = [
+    'RedisTaskNotifier',
+    'TaskNotifier',
+    'create_task_notifier',
+    'get_task_notifier',
+    'notify_build_tasks_ready',
+    'set_task_notifier',
+]
+
+
+TASK_NOTIFIER: typing.Optional['TaskNotifier'] = None
+
+
+def get_task_notifier() -> typing.Optional['TaskNotifier']:
+    return TASK_NOTIFIER
+
+
+def set_task_notifier(notifier: typing.Optional['TaskNotifier']):
+    global TASK_NOTIFIER
+    TASK_NOTIFIER = notifier
+
+
+async def notify_build_tasks_ready(arches: typing.Iterable[str]):
+    """
+    Wakes build nodes waiting for tasks of given architectures.
+    Notification is best effort: waiting nodes poll again on timeout.
+    """
+    arches = set(arches)
+    if TASK_NOTIFIER is None or not arches:
+        return
+    try:
+        await TASK_NOTIFIER.notify(arches)
+    except Exception:
+        logging.exception('Cannot send build tasks notification')
+
+
+class TaskNotifier:
+    """
+    Wakes requests waiting for build tasks of some architectures.
+    Works only within a single process.
+    """
+
+    def __init__(self):
+        self._waiters: typing.Dict[str, typing.Set[asyncio.Event]] = \
+            collections.defaultdict(set)
+
+    @contextlib.contextmanager
+    def subscribe(self, arches: typing.Iterable[str]):
+        """
+        Returns event which is set when tasks of one of the architectures
+        may have become available. Subscription should be made before
+        checking for tasks, so notifications sent meanwhile aren't lost.
+        """
+        arches = set(arches)
+        event = asyncio.Event()
+        for arch in arches:
+            self._waiters[arch].add(event)
+        try:
+            yield event
+        finally:
+            for arch in arches:
+                self._waiters[arch].discard(event)
+                if not self._waiters[arch]:
+                    del self._waiters[arch]
+
+    @property
+    def waiters_count(self) -> int:
+        return len({event for events in self._waiters.values()
+                    for event in events})
+
+    def wake(self, arches: typing.Iterable[str]):
+        for arch in arches:
+            for event in self._waiters.get(arch, ()):
+                event.set()
+
+    async def notify(self, arches: typing.Iterable[str]):
+        self.wake(arches)
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class RedisTaskNotifier(TaskNotifier):
+    """
+    Delivers notifications to all web server processes
+    through Redis pub/sub channel.
+    """
+
+    def __init__(self, redis_url: str,
+                 channel: str = 'alws:build_tasks:ready'):
+        super().__init__()
+        self._redis = aioredis.from_url(redis_url)
+        self._channel = channel
+        self._pubsub = None
+        self._listener: typing.Optional[asyncio.Task] = None
+
+    async def notify(self, arches: typing.Iterable[str]):
+        await self._redis.publish(self._channel, json.dumps(sorted(arches)))
+
+    async def start(self):
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.subscribe(self._channel)
+        self._listener = asyncio.get_running_loop().create_task(
+            self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception('Cannot receive build tasks notification')
+                await asyncio.sleep(1)
+                continue
+            if message is None:
+                continue
+            self.wake(json.loads(message['data']))
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+        await self._redis.close()
+
+
+def create_task_notifier() -> TaskNotifier:
+    if settings.task_notifier_backend == 'local':
+        return TaskNotifier()
+    return RedisTaskNotifier(settings.redis_url)
@@ -0,0 +1,75 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import logging
+
+from sqlalchemy.future import select
+from syncer import sync
+
+from alws import database, models
+from alws.config import settings
+from alws.utils.nevra import get_artifacts_nevra
+from alws.utils.pulp_client import PulpClient
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        'backfill_artifacts_nevra',
+        description='Fills NEVRA columns of RPM build artifacts '
+                    'created before they were stored in the database')
+    parser.add_argument(
+        '-b', '--batch-size', type=int, default=500, required=False,
+        help='Number of artifacts processed per transaction')
+    parser.add_argument('-v', '--verbose', action='store_true', default=False,
+                        required=False, help='Enable verbose output')
+    return parser.parse_args()
+
+
+async def backfill(pulp_client: PulpClient, batch_size: int,
+                   logger: logging.Logger) -> int:
+    last_id = 0
+    total = 0
+    while True:
+        async with database.Session() as db, db.begin():
+            query = select(models.BuildTaskArtifact).where(
+                models.BuildTaskArtifact.id > last_id,
+                models.BuildTaskArtifact.type == 'rpm',
+                models.BuildTaskArtifact.rpm_name.is_(None),
+            ).order_by(models.BuildTaskArtifact.id).limit(batch_size)
+            artifacts = (await db.execute(query)).scalars().all()
+            if not artifacts:
+                return total
+            last_id = artifacts[-1].id
+            resolved = await get_artifacts_nevra(pulp_client, artifacts)
+            # multilib and noarch artifacts share hrefs, so artifacts
+            # are counted instead of resolved hrefs
+            missing = sum(
+                1 for artifact in artifacts if artifact.href not in resolved)
+            total += len(artifacts) - missing
+            logger.info('Processed artifacts up to ID %d, %d resolved',
+                        last_id, total)
+            if missing:
+                logger.warning('%d artifacts are missing in Pulp', missing)
+
+
+def main():
+    args = parse_args()
+    logger = logging.getLogger('nevra-backfill')
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.INFO)
+    pulp_client = PulpClient(
+        settings.pulp_host,
+        settings.pulp_user,
+        settings.pulp_password
+    )
+    total = sync(backfill(pulp_client, args.batch_size, logger))
+    logger.info('Backfill is completed, %d artifacts updated', total)
+
+
+if __name__ == '__main__':
+    main()
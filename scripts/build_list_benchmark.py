@@ -0,0 +1,93 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import logging
+import statistics
+import time
+
+from syncer import sync
+
+from alws import database
+from alws.crud import build as build_crud
+from alws.schemas import build_schema
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        'build_list_benchmark',
+        description='Compares query time, serialization time and response '
+                    'size of the full and summary views of the builds list')
+    parser.add_argument(
+        '-p', '--pages', type=int, default=5, required=False,
+        help='Number of builds list pages to request')
+    parser.add_argument(
+        '-r', '--repeats', type=int, default=3, required=False,
+        help='Number of requests of every page')
+    parser.add_argument(
+        '--project', type=str, default=None, required=False,
+        help='Search builds by project name')
+    parser.add_argument('-v', '--verbose', action='store_true', default=False,
+                        required=False, help='Enable verbose output')
+    return parser.parse_args()
+
+
+async def measure(get_page, response_model, pages: int, repeats: int):
+    query_times = []
+    serialization_times = []
+    sizes = []
+    for page_number in range(1, pages + 1):
+        for _ in range(repeats):
+            async with database.Session() as db:
+                started = time.monotonic()
+                page = await get_page(db, page_number)
+                query_times.append(time.monotonic() - started)
+            started = time.monotonic()
+            response = response_model(**page).json()
+            serialization_times.append(time.monotonic() - started)
+            sizes.append(len(response.encode()))
+    return (
+        statistics.median(query_times),
+        statistics.median(serialization_times),
+        statistics.median(sizes),
+    )
+
+
+async def benchmark(args, logger: logging.Logger):
+    search_params = build_schema.BuildSearch(project=args.project)
+
+    async def get_full_page(db, page_number):
+        return await build_crud.get_builds(
+            db, page_number=page_number, search_params=search_params)
+
+    async def get_summary_page(db, page_number):
+        return await build_crud.get_builds_summary(
+            db, page_number=page_number, search_params=search_params)
+
+    views = (
+        ('full', get_full_page, build_schema.BuildsResponse),
+        ('summary', get_summary_page, build_schema.BuildsSummaryResponse),
+    )
+    for view, get_page, response_model in views:
+        query_time, serialization_time, size = await measure(
+            get_page, response_model, args.pages, args.repeats)
+        logger.info('%s view: query %.1f ms, serialization %.1f ms, '
+                    'response %d bytes (medians of %d pages)',
+                    view, query_time * 1e3, serialization_time * 1e3,
+                    size, args.pages)
+
+
+def main():
+    args = parse_args()
+    logger = logging.getLogger('build-list-benchmark')
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.INFO)
+    sync(benchmark(args, logger))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import asyncio
+import logging
+import time
+import typing
+import uuid
+
+from sqlalchemy import delete, update
+from sqlalchemy.future import select
+from syncer import sync
+
+from alws import build_scheduler, database, models
+from alws.constants import BuildTaskStatus
+from alws.crud import build_node
+from alws.schemas import build_node_schema
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        'dispatch_load_benchmark',
+        description='Measures build task dispatch throughput for a number '
+                    'of concurrently polling build nodes. Tasks are created '
+                    'for a synthetic architecture and removed afterwards')
+    parser.add_argument(
+        '-t', '--tasks', type=int, default=500, required=False,
+        help='Number of build tasks to dispatch in every round')
+    parser.add_argument(
+        '-n', '--nodes', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+        required=False, help='Numbers of concurrent build nodes to test')
+    parser.add_argument(
+        '-p', '--platform-id', type=int, required=False,
+        help='Platform for test tasks, the first one is used by default')
+    parser.add_argument(
+        '-u', '--user-id', type=int, required=False,
+        help='Owner of test build, the first user is used by default')
+    parser.add_argument('-v', '--verbose', action='store_true', default=False,
+                        required=False, help='Enable verbose output')
+    return parser.parse_args()
+
+
+async def create_test_build(tasks_count: int, arch: str,
+                            platform_id: int, user_id: int) -> int:
+    async with database.Session() as db, db.begin():
+        if platform_id is None:
+            platform_id = (await db.execute(
+                select(models.Platform.id).limit(1))).scalar()
+        if user_id is None:
+            user_id = (await db.execute(
+                select(models.User.id).limit(1))).scalar()
+        if platform_id is None or user_id is None:
+            raise RuntimeError('Database should contain a platform '
+                               'and a user to run load test')
+        ref = models.BuildTaskRef(url='https://example.com/load-test.git')
+        build = models.Build(user_id=user_id)
+        db.add_all([ref, build])
+        await db.flush()
+        db.add_all([
+            models.BuildTask(
+                build_id=build.id,
+                platform_id=platform_id,
+                ref_id=ref.id,
+                status=BuildTaskStatus.IDLE,
+                index=index,
+                arch=arch
+            )
+            for index in range(tasks_count)
+        ])
+        await db.commit()
+        return build.id
+
+
+async def reset_test_tasks(build_id: int):
+    async with database.Session() as db, db.begin():
+        await db.execute(update(models.BuildTask).where(
+            models.BuildTask.build_id == build_id
+        ).values(status=BuildTaskStatus.IDLE, ts=None))
+        await build_scheduler.enqueue_ready_tasks(db, build_id=build_id)
+        await db.commit()
+
+
+async def delete_test_build(build_id: int):
+    async with database.Session() as db, db.begin():
+        ref_ids = (await db.execute(
+            select(models.BuildTask.ref_id).where(
+                models.BuildTask.build_id == build_id).distinct()
+        )).scalars().all()
+        await db.execute(delete(models.BuildTask).where(
+            models.BuildTask.build_id == build_id))
+        await db.execute(delete(models.BuildTaskRef).where(
+            models.BuildTaskRef.id.in_(ref_ids)))
+        await db.execute(delete(models.Build).where(
+            models.Build.id == build_id))
+        await db.commit()
+
+
+async def run_node(request: build_node_schema.RequestTask,
+                   claimed: list):
+    while True:
+        async with database.Session() as db:
+            task = await build_node.get_available_build_task(db, request)
+        if task is None:
+            return
+        claimed.append(task.id)
+
+
+async def run_round(nodes: int, arch: str) -> typing.Tuple[float, list]:
+    request = build_node_schema.RequestTask(supported_arches=[arch])
+    claimed = []
+    start = time.monotonic()
+    await asyncio.gather(*(run_node(request, claimed) for _ in range(nodes)))
+    return time.monotonic() - start, claimed
+
+
+async def load_test(args, logger: logging.Logger):
+    arch = f'load-test-{uuid.uuid4().hex[:8]}'
+    build_id = await create_test_build(
+        args.tasks, arch, args.platform_id, args.user_id)
+    try:
+        for nodes in args.nodes:
+            await reset_test_tasks(build_id)
+            elapsed, claimed = await run_round(nodes, arch)
+            duplicates = len(claimed) - len(set(claimed))
+            logger.info(
+                '%3d nodes: %d tasks in %.2fs, %.1f tasks/s, '
+                '%d claimed twice', nodes, len(claimed), elapsed,
+                len(claimed) / elapsed, duplicates)
+    finally:
+        await delete_test_build(build_id)
+    logger.info('Database pool: %s', database.get_pool_stats())
+
+
+def main():
+    args = parse_args()
+    logger = logging.getLogger('dispatch-load-benchmark')
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.INFO)
+    sync(load_test(args, logger))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import contextlib
+import logging
+import time
+
+from syncer import sync
+
+from alws import database
+from alws.config import settings
+from alws.crud import build_node
+from alws.utils.heartbeats import (
+    HeartbeatFlusher,
+    LocalHeartbeatStore,
+    RedisHeartbeatStore,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        'heartbeat_benchmark',
+        description='Compares database write rate of direct and buffered '
+                    'build task heartbeats for a simulated build node fleet')
+    parser.add_argument(
+        '-n', '--nodes', type=int, default=1000, required=False,
+        help='Number of simulated build nodes')
+    parser.add_argument(
+        '-t', '--tasks-per-node', type=int, default=2, required=False,
+        help='Number of active tasks reported by every node')
+    parser.add_argument(
+        '-p', '--ping-interval', type=int, default=10, required=False,
+        help='Interval between pings of a node, in seconds')
+    parser.add_argument(
+        '-f', '--flush-interval', type=int,
+        default=int(settings.heartbeat_flush_interval), required=False,
+        help='Interval between heartbeat flushes, in seconds')
+    parser.add_argument(
+        '-d', '--duration', type=int, default=600, required=False,
+        help='Simulated time, in seconds')
+    parser.add_argument(
+        '-b', '--backend', choices=('local', 'redis'), default='local',
+        required=False, help='Heartbeat store to benchmark')
+    parser.add_argument(
+        '-D', '--database', action='store_true', default=False,
+        required=False, help='Execute flushes against the database, '
+                             'tasks IDs are synthetic so no rows change')
+    parser.add_argument('-v', '--verbose', action='store_true', default=False,
+                        required=False, help='Enable verbose output')
+    return parser.parse_args()
+
+
+@contextlib.asynccontextmanager
+async def dry_run_session():
+    yield None
+
+
+async def benchmark(args, logger: logging.Logger):
+    if args.backend == 'redis':
+        store = RedisHeartbeatStore(
+            settings.redis_url, prefix='alws:heartbeats-benchmark')
+    else:
+        store = LocalHeartbeatStore()
+    flushed_rows = []
+
+    async def save(db, heartbeats):
+        flushed_rows.append(len(heartbeats))
+        if db is not None:
+            await build_node.save_heartbeats(db, heartbeats)
+
+    flusher = HeartbeatFlusher(
+        store, save, session_factory=(
+            database.Session if args.database else dry_run_session)
+    )
+    nodes_tasks = [
+        list(range(node * args.tasks_per_node,
+                   (node + 1) * args.tasks_per_node))
+        for node in range(args.nodes)
+    ]
+    pings = 0
+    record_time = 0.0
+    flush_time = 0.0
+    start_ts = time.time()
+    for second in range(1, args.duration + 1):
+        for node, task_ids in enumerate(nodes_tasks):
+            # nodes are spread evenly over the ping interval
+            if (second + node) % args.ping_interval:
+                continue
+            started = time.monotonic()
+            await store.record(task_ids, timestamp=start_ts + second)
+            record_time += time.monotonic() - started
+            pings += 1
+        if second % args.flush_interval == 0:
+            started = time.monotonic()
+            await flusher.flush()
+            flush_time += time.monotonic() - started
+    await store.close()
+
+    logger.info('%d nodes with %d tasks each pinging every %ds, '
+                '%ds simulated', args.nodes, args.tasks_per_node,
+                args.ping_interval, args.duration)
+    logger.info('Direct updates: %d statements (%.1f/s), %d rows (%.1f/s)',
+                pings, pings / args.duration,
+                pings * args.tasks_per_node,
+                pings * args.tasks_per_node / args.duration)
+    logger.info('Buffered updates: %d statements (%.2f/s), %d rows (%.1f/s)',
+                len(flushed_rows), len(flushed_rows) / args.duration,
+                sum(flushed_rows), sum(flushed_rows) / args.duration)
+    logger.info('Store ingestion: %.1f us per ping, flush: %.1f ms average',
+                record_time / max(pings, 1) * 1e6,
+                flush_time / max(len(flushed_rows), 1) * 1e3)
+
+
+def main():
+    args = parse_args()
+    logger = logging.getLogger('heartbeat-benchmark')
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.INFO)
+    sync(benchmark(args, logger))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import collections
+import heapq
+import logging
+import random
+import typing
+
+from alws.utils.scheduling import (
+    SCHEDULING_POLICIES,
+    ReadyTask,
+    SchedulingPolicy,
+    get_scheduling_policy,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        'scheduling_simulator',
+        description='Replays a synthetic build task stream with different '
+                    'scheduling policies and reports queue wait percentiles')
+    parser.add_argument(
+        '-n', '--nodes', type=int, default=20, required=False,
+        help='Number of build nodes')
+    parser.add_argument(
+        '-l', '--large-build', type=int, default=300, required=False,
+        help='Number of tasks in the large build submitted first')
+    parser.add_argument(
+        '-b', '--builds', type=int, default=60, required=False,
+        help='Number of small builds submitted by other users')
+    parser.add_argument(
+        '-u', '--users', type=int, default=10, required=False,
+        help='Number of users submitting small builds')
+    parser.add_argument(
+        '-w', '--window', type=float, default=4 * 3600, required=False,
+        help='Time window of small builds submission, in seconds')
+    parser.add_argument(
+        '-d', '--duration', type=float, default=900, required=False,
+        help='Median build task duration, in seconds')
+    parser.add_argument(
+        '-p', '--policies', nargs='+', default=list(SCHEDULING_POLICIES),
+        choices=list(SCHEDULING_POLICIES), required=False,
+        help='Scheduling policies to compare')
+    parser.add_argument(
+        '-g', '--group-key', default='user_id', required=False,
+        choices=('user_id', 'platform_id', 'build_id'),
+        help='Fair share group')
+    parser.add_argument('-s', '--seed', type=int, default=1, required=False,
+                        help='Random seed of the task stream')
+    parser.add_argument('-v', '--verbose', action='store_true', default=False,
+                        required=False, help='Enable verbose output')
+    return parser.parse_args()
+
+
+class SimulatedTask(typing.NamedTuple):
+
+    task: ReadyTask
+    submitted_at: float
+    duration: float
+
+
+def generate_tasks(args) -> typing.List[SimulatedTask]:
+    rnd = random.Random(args.seed)
+    tasks = []
+
+    def add_build(build_id, user_id, size, submitted_at, priority=0):
+        for _ in range(size):
+            task = ReadyTask(
+                task_id=len(tasks) + 1,
+                arch='x86_64',
+                priority=priority,
+                build_id=build_id,
+                user_id=user_id,
+                platform_id=1,
+            )
+            duration = rnd.lognormvariate(0, 0.8) * args.duration
+            tasks.append(SimulatedTask(task, submitted_at, duration))
+
+    # module build which used to starve everyone else
+    add_build(1, 1, args.large_build, 0.0)
+    for build_id in range(2, args.builds + 2):
+        add_build(
+            build_id,
+            rnd.randint(2, args.users + 1),
+            rnd.randint(1, 5),
+            rnd.uniform(0, args.window),
+            priority=rnd.choice((0, 0, 0, 1)),
+        )
+    tasks.sort(key=lambda item: (item.submitted_at, item.task.task_id))
+    return tasks
+
+
+def simulate(policy: SchedulingPolicy, tasks: typing.List[SimulatedTask],
+             nodes: int) -> typing.Dict[int, float]:
+    """
+    Returns queue wait of every task.
+    """
+    by_id = {item.task.task_id: item for item in tasks}
+    pending = collections.deque(tasks)
+    ready = {}
+    running = collections.Counter()
+    finishing = []
+    waits = {}
+    free_nodes = nodes
+    now = 0.0
+    group_key = policy.group_key or 'user_id'
+    while pending or ready or finishing:
+        next_times = []
+        if pending:
+            next_times.append(pending[0].submitted_at)
+        if finishing:
+            next_times.append(finishing[0][0])
+        if not ready or not free_nodes:
+            now = max(now, min(next_times))
+        while pending and pending[0].submitted_at <= now:
+            item = pending.popleft()
+            ready[item.task.task_id] = item.task
+        while finishing and finishing[0][0] <= now:
+            _, task_id = heapq.heappop(finishing)
+            running[getattr(by_id[task_id].task, group_key)] -= 1
+            free_nodes += 1
+        while free_nodes and ready:
+            task = policy.pick(ready.values(), running)
+            del ready[task.task_id]
+            item = by_id[task.task_id]
+            waits[task.task_id] = now - item.submitted_at
+            running[getattr(task, group_key)] += 1
+            heapq.heappush(finishing, (now + item.duration, task.task_id))
+            free_nodes -= 1
+    return waits
+
+
+def percentile(values: typing.List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def format_waits(waits: typing.List[float]) -> str:
+    return ' '.join(
+        f'p{percent}={percentile(waits, percent) / 60:7.1f}m'
+        for percent in (50, 90, 99)
+    )
+
+
+def main():
+    args = parse_args()
+    logger = logging.getLogger('scheduling-simulator')
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.INFO)
+    tasks = generate_tasks(args)
+    logger.info('%d tasks, %d build nodes, large build of %d tasks',
+                len(tasks), args.nodes, args.large_build)
+    for name in args.policies:
+        policy = get_scheduling_policy(name, group_key=args.group_key)
+        waits = simulate(policy, tasks, args.nodes)
+        large = [wait for task_id, wait in waits.items()
+                 if task_id <= args.large_build]
+        others = [wait for task_id, wait in waits.items()
+                  if task_id > args.large_build]
+        logger.info('%-10s all:    %s', name, format_waits(list(waits.values())))
+        logger.info('%-10s large:  %s', name, format_waits(large))
+        logger.info('%-10s others: %s', name, format_waits(others))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import datetime
+import unittest
+import unittest.mock
+
+from alws import build_scheduler
+from alws.constants import BuildTaskStatus
+from alws.crud.build_node import claim_build_task
+
+
+class FakeResult:
+
+    def __init__(self, row):
+        self._row = row
+
+    def first(self):
+        return self._row
+
+
+class FakeSession:
+
+    def __init__(self, claimed):
+        self.claimed = claimed
+
+    async def execute(self, statement):
+        return FakeResult(self.claimed)
+
+
+class TestBuildTaskClaim(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        build_scheduler.REQUEUED_AT.clear()
+
+    def tearDown(self):
+        build_scheduler.REQUEUED_AT.clear()
+
+    async def test_expired_tasks_are_requeued_with_backlog(self):
+        db = FakeSession((2, 1, 'x86_64', BuildTaskStatus.IDLE))
+        ts_expired = datetime.datetime.now() - datetime.timedelta(minutes=20)
+        with unittest.mock.patch.object(
+                    build_scheduler, 'claim_ready_task',
+                    unittest.mock.AsyncMock(return_value=2)), \
+                unittest.mock.patch.object(
+                    build_scheduler, 'requeue_expired_tasks',
+                    unittest.mock.AsyncMock(return_value=[])) as requeue:
+            for _ in range(3):
+                claimed = await claim_build_task(
+                    db, ['x86_64'], ts_expired)
+        message = "Ready task should be claimed"
+        self.assertEqual(claimed[0], 2, message)
+        message = ("Expired tasks should be requeued while there are "
+                   "ready tasks, once per requeue interval")
+        self.assertEqual(requeue.await_count, 1, message)
+        self.assertEqual(requeue.await_args.args[1], ['x86_64'], message)
@@ -0,0 +1,45 @@
+import unittest
+
+from sqlalchemy.dialects import postgresql
+
+from alws.crud.build import delete_builds
+
+
+class FakeResult:
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return []
+
+
+class FakeSession:
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(str(statement.compile(
+            dialect=postgresql.dialect())))
+        return FakeResult()
+
+
+class TestBuildRemoval(unittest.IsolatedAsyncioTestCase):
+
+    async def test_statements_dont_depend_on_builds_number(self):
+        single = FakeSession()
+        await delete_builds(single, [1])
+        bulk = FakeSession()
+        await delete_builds(bulk, list(range(1, 1001)))
+        message = "Builds should be deleted with set-based statements"
+        self.assertEqual(len(single.statements), len(bulk.statements),
+                         message)
+        self.assertEqual(single.statements, bulk.statements, message)
+
+    async def test_build_is_deleted_last(self):
+        db = FakeSession()
+        await delete_builds(db, [1])
+        message = "Build should be deleted after rows which reference it"
+        self.assertTrue(db.statements[-1].startswith('DELETE FROM builds '),
+                        message)
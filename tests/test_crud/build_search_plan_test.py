@@ -0,0 +1,41 @@
+import unittest
+
+from alws.crud.build import get_build_search_conditions, get_builds_page_query
+from alws.schemas import build_schema
+
+from tests.test_crud.dispatch_plan_test import QueryPlanTestCase
+
+
+def get_page_query(last_build_id=None, **search_params):
+    conditions = get_build_search_conditions(
+        build_schema.BuildSearch(**search_params))
+    return get_builds_page_query(
+        conditions, page_number=1, last_build_id=last_build_id)
+
+
+class TestBuildSearchQuery(unittest.TestCase):
+
+    def test_page_query_has_no_joins(self):
+        query = str(get_page_query(
+            last_build_id=1000, project='bash', platform_id=1, created_by=1))
+        message = "Build filters shouldn't join tasks into the page query"
+        self.assertNotIn('JOIN', query, message)
+        message = "Task filters should be checked in one EXISTS subquery"
+        self.assertEqual(query.count('EXISTS'), 2, message)
+
+
+class TestBuildSearchQueryPlan(QueryPlanTestCase):
+
+    tables = ('builds', 'build_tasks', 'build_task_refs', 'build_artifacts')
+
+    def test_ref_search_uses_indexes(self):
+        query = get_page_query(last_build_id=1000, ref='bash')
+        seq_scans = self.get_seq_scans(query)
+        message = f"Build search uses sequential scans on {seq_scans}"
+        self.assertEqual(seq_scans, [], message)
+
+    def test_package_search_uses_indexes(self):
+        query = get_page_query(rpm_name='bash', rpm_version='5.1.8')
+        seq_scans = self.get_seq_scans(query)
+        message = f"Package search uses sequential scans on {seq_scans}"
+        self.assertEqual(seq_scans, [], message)
@@ -0,0 +1,118 @@
+import datetime
+import unittest
+
+from sqlalchemy.dialects import postgresql
+
+from alws import build_status
+from alws.constants import BuildTaskStatus
+
+from tests.test_crud.dispatch_plan_test import QueryPlanTestCase
+
+
+class FakeSession:
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement.compile(
+            dialect=postgresql.dialect()))
+
+    def begin(self):
+        return self
+
+    async def commit(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FailingSession(FakeSession):
+
+    async def execute(self, statement):
+        raise ConnectionError()
+
+
+class TestBuildStatusRollup(unittest.IsolatedAsyncioTestCase):
+
+    async def test_status_change_updates_arch_row(self):
+        db = FakeSession()
+        await build_status.update_build_status_rollup(
+            db, 1, 'x86_64', BuildTaskStatus.STARTED,
+            BuildTaskStatus.COMPLETED)
+        arches = [statement.params['arch_1'] for statement in db.statements]
+        message = "Only the row of the task arch should be updated"
+        self.assertEqual(arches, ['x86_64'], message)
+        statement = str(db.statements[0])
+        message = "Task should move from started to completed"
+        self.assertIn('started=(build_status_rollup.started -', statement,
+                      message)
+        self.assertIn('completed=(build_status_rollup.completed +',
+                      statement, message)
+        self.assertIn('last_finished_at=greatest(', statement)
+
+    async def test_same_status_is_skipped(self):
+        db = FakeSession()
+        await build_status.update_build_status_rollup(
+            db, 1, 'x86_64', BuildTaskStatus.STARTED,
+            BuildTaskStatus.STARTED)
+        message = "Requeued task shouldn't be counted twice"
+        self.assertEqual(db.statements, [], message)
+
+    def test_refresh_query_counts_arches(self):
+        query = str(build_status.get_rollup_refresh_query(1))
+        message = "Rollup should be recounted with a single query"
+        self.assertIn('GROUP BY build_tasks.build_id, build_tasks.arch',
+                      query, message)
+
+
+class TestStartedTasksBuffer(unittest.IsolatedAsyncioTestCase):
+
+    async def test_started_tasks_are_saved_in_one_statement(self):
+        db = FakeSession()
+        buffer = build_status.StartedTasksBuffer(session_factory=lambda: db)
+        first_ts = datetime.datetime(2022, 2, 3, 10)
+        buffer.add(1, 'x86_64', ts=first_ts + datetime.timedelta(minutes=1))
+        buffer.add(1, 'x86_64', ts=first_ts)
+        buffer.add(1, 'i686', ts=first_ts)
+        saved = await buffer.flush()
+        message = "All claimed tasks should be saved"
+        self.assertEqual(saved, 3, message)
+        message = "Claimed tasks should be saved with a single update"
+        self.assertEqual(len(db.statements), 1, message)
+        params = db.statements[0].params
+        message = "Claimed tasks should be grouped by build and arch"
+        self.assertEqual(params['param_2'], ['i686', 'x86_64'], message)
+        self.assertEqual(params['param_3'], [1, 2], message)
+        message = "Earliest claim time should be saved"
+        self.assertEqual(params['param_4'], [first_ts, first_ts], message)
+        message = "Saved tasks shouldn't be saved again"
+        self.assertEqual(await buffer.flush(), 0, message)
+
+    async def test_failed_flush_keeps_started_tasks(self):
+        db = FailingSession()
+        buffer = build_status.StartedTasksBuffer(session_factory=lambda: db)
+        buffer.add(1, 'x86_64')
+        with self.assertRaises(ConnectionError):
+            await buffer.flush()
+        buffer.add(1, 'x86_64')
+        db = FakeSession()
+        buffer._session_factory = lambda: db
+        await buffer.flush()
+        message = "Tasks of the failed flush should be saved by the next one"
+        self.assertEqual(db.statements[0].params['param_3'], [2], message)
+
+
+class TestBuildStatusQueryPlan(QueryPlanTestCase):
+
+    tables = ('build_status_rollup',)
+
+    def test_unfinished_builds_query_uses_index(self):
+        query = build_status.get_unfinished_builds_query()
+        seq_scans = self.get_seq_scans(query)
+        message = f"Unfinished builds query uses seq scans on {seq_scans}"
+        self.assertEqual(seq_scans, [], message)
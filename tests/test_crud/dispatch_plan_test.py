@@ -0,0 +1,96 @@
+import datetime
+import unittest
+
+import sqlalchemy
+from sqlalchemy.dialects import postgresql
+
+from alws import build_scheduler
+from alws.database import sync_engine
+
+
+DISPATCH_TABLES = ('build_tasks', 'build_task_dependency', 'build_task_ready')
+
+
+def iter_plan_nodes(plan: dict):
+    yield plan
+    for subplan in plan.get('Plans', []):
+        yield from iter_plan_nodes(subplan)
+
+
+class QueryPlanTestCase(unittest.TestCase):
+
+    tables = DISPATCH_TABLES
+
+    def setUp(self):
+        try:
+            self.connection = sync_engine.connect()
+        except sqlalchemy.exc.OperationalError as err:
+            self.skipTest(f'Database is not available: {err}')
+
+    def tearDown(self):
+        self.connection.close()
+
+    def get_plan_nodes(self, query) -> list:
+        compiled = query.compile(
+            dialect=sync_engine.dialect,
+            compile_kwargs={'render_postcompile': True})
+        with self.connection.begin() as transaction:
+            # planner falls back to sequential scans only if there is
+            # no suitable index
+            self.connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            plan = self.connection.exec_driver_sql(
+                f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params
+            ).scalar()
+            transaction.rollback()
+        return list(iter_plan_nodes(plan[0]['Plan']))
+
+    def get_seq_scans(self, query) -> list:
+        return [
+            node['Relation Name'] for node in self.get_plan_nodes(query)
+            if node['Node Type'] == 'Seq Scan'
+            and node['Relation Name'] in self.tables
+        ]
+
+
+class TestDispatchQueryPlan(QueryPlanTestCase):
+
+    def test_ready_task_query_uses_indexes(self):
+        query = build_scheduler.get_ready_task_claim_query(
+            ['x86_64', 'i686'])
+        seq_scans = self.get_seq_scans(query)
+        message = f"Dispatch query uses sequential scans on {seq_scans}"
+        self.assertEqual(seq_scans, [], message)
+
+    def test_expired_tasks_query_uses_indexes(self):
+        ts_expired = datetime.datetime.now() - datetime.timedelta(minutes=20)
+        query = build_scheduler.get_expired_tasks_query(
+            ['x86_64', 'i686'], ts_expired, alive_task_ids=[1, 2])
+        seq_scans = self.get_seq_scans(query)
+        message = f"Expired tasks query uses sequential scans on {seq_scans}"
+        self.assertEqual(seq_scans, [], message)
+
+    def test_fair_share_candidates_query_isnt_sorted(self):
+        for group_key in ('user_id', 'platform_id', 'build_id'):
+            query = build_scheduler.get_ready_candidates_query(
+                ['x86_64', 'i686'], group_key)
+            sorts = [node for node in self.get_plan_nodes(query)
+                     if node['Node Type'] == 'Sort']
+            message = f"Candidates by {group_key} are sorted without index"
+            self.assertEqual(sorts, [], message)
+
+
+class TestExpiredTasksQuery(unittest.TestCase):
+
+    def test_alive_tasks_are_bound_as_array(self):
+        ts_expired = datetime.datetime.now() - datetime.timedelta(minutes=20)
+        alive_task_ids = list(range(1, 5001))
+        query = build_scheduler.get_expired_tasks_query(
+            ['x86_64'], ts_expired, alive_task_ids=alive_task_ids)
+        compiled = query.compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={'render_postcompile': True})
+        message = "Alive tasks should be bound as a single array parameter"
+        self.assertIn('build_tasks.id != ALL (%(alive_task_ids)s',
+                      str(compiled), message)
+        self.assertEqual(compiled.params['alive_task_ids'], alive_task_ids,
+                         message)
@@ -0,0 +1,158 @@
+import unittest
+
+from sqlalchemy.dialects import postgresql
+
+from alws import models
+from alws.repository_pool import (
+    PoolBucket,
+    claim_pooled_repositories,
+    get_pool_deficit,
+    pool_metrics,
+    refill_repository_pool,
+    trim_repository_pool,
+)
+
+
+class FakeResult:
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+
+class FakeSession:
+
+    def __init__(self, results=None, fail_inserts=False):
+        self.results = list(results or [])
+        self.statements = []
+        self.fail_inserts = fail_inserts
+        self.transactions = 0
+
+    async def execute(self, statement):
+        statement = str(statement.compile(dialect=postgresql.dialect()))
+        self.statements.append(statement)
+        if statement.startswith('INSERT'):
+            if self.fail_inserts:
+                raise ConnectionError()
+            return FakeResult([])
+        return FakeResult(self.results.pop(0) if self.results else [])
+
+    def begin(self):
+        self.transactions += 1
+        return self
+
+    async def commit(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeProvisioner:
+
+    def __init__(self):
+        self.provisioned = []
+        self.removed = []
+
+    async def provision(self, requests):
+        self.provisioned.append([request.name for request in requests])
+        return [(f'http://pulp/builds/{request.name}',
+                 f'/pulp/api/v3/repositories/rpm/rpm/{request.name}/')
+                for request in requests]
+
+    async def remove(self, requests, repo_hrefs):
+        self.removed.extend(repo_hrefs)
+
+
+def get_platform():
+    return models.Platform(id=1, name='AlmaLinux-8', arch_list=['x86_64'])
+
+
+class TestRepositoryPool(unittest.IsolatedAsyncioTestCase):
+
+    async def test_deficit_of_platform_buckets(self):
+        db = FakeSession(results=[[
+            (1, 'src', 'rpm', False, 2),
+            (1, 'x86_64', 'rpm', False, 5),
+        ]])
+        deficit = await get_pool_deficit(db, [get_platform()], 3)
+        message = "Only buckets below the pool size should be refilled"
+        self.assertEqual(deficit, {
+            PoolBucket(1, 'src', 'rpm'): 1,
+            PoolBucket(1, 'x86_64', 'rpm', debug=True): 3,
+        }, message)
+
+    async def test_claim_counts_misses(self):
+        db = FakeSession(results=[[('repo', 'http://pulp/repo', '/href/')]])
+        hits, misses = pool_metrics.hits, pool_metrics.misses
+        repos = await claim_pooled_repositories(
+            db, PoolBucket(1, 'x86_64', 'rpm'), 2)
+        message = "Claimed repositories should be returned"
+        self.assertEqual([repo.name for repo in repos], ['repo'], message)
+        message = "Missing repositories should be counted as misses"
+        self.assertEqual(pool_metrics.hits - hits, 1, message)
+        self.assertEqual(pool_metrics.misses - misses, 1, message)
+        message = "Concurrent claims should skip each other's rows"
+        self.assertIn('FOR UPDATE SKIP LOCKED', db.statements[0], message)
+
+    async def test_refill_inserts_batches(self):
+        platform = get_platform()
+        db = FakeSession(results=[
+            [platform], [],
+            [platform], [(1, 'src', 'rpm', False, 1),
+                         (1, 'x86_64', 'rpm', False, 1)],
+            [platform], [(1, 'src', 'rpm', False, 1),
+                         (1, 'x86_64', 'rpm', False, 1),
+                         (1, 'x86_64', 'rpm', True, 1)],
+        ])
+        provisioner = FakeProvisioner()
+        refilled = await refill_repository_pool(
+            db, provisioner, 1, batch_size=2)
+        message = "Pool should be refilled in batches"
+        self.assertEqual(refilled, 3, message)
+        self.assertEqual(
+            [len(names) for names in provisioner.provisioned], [2, 1],
+            message)
+        inserts = [statement for statement in db.statements
+                   if statement.startswith('INSERT')]
+        message = "Every batch should be added to the pool separately"
+        self.assertEqual(len(inserts), 2, message)
+
+    async def test_failed_insert_removes_repositories(self):
+        db = FakeSession(results=[[get_platform()], []], fail_inserts=True)
+        provisioner = FakeProvisioner()
+        with self.assertRaises(ConnectionError):
+            await refill_repository_pool(db, provisioner, 1)
+        message = "Repositories which aren't in the pool should be removed"
+        self.assertEqual(len(provisioner.removed), 3, message)
+
+    async def test_refill_trims_surplus(self):
+        db = FakeSession(results=[
+            [get_platform()], [(1, 'src', 'rpm', False, 2),
+                               (1, 'x86_64', 'rpm', False, 1),
+                               (1, 'x86_64', 'rpm', True, 1)],
+            [], [('surplus', 'rpm', '/surplus/')],
+        ])
+        provisioner = FakeProvisioner()
+        refilled = await refill_repository_pool(db, provisioner, 1)
+        message = "Full pool shouldn't be refilled"
+        self.assertEqual(refilled, 0, message)
+        message = "Surplus of concurrent refills should be removed"
+        self.assertEqual(provisioner.removed, ['/surplus/'], message)
+
+    async def test_trim_keeps_pool_size(self):
+        db = FakeSession()
+        await trim_repository_pool(db, FakeProvisioner(), 3)
+        message = "Trims should be serialized"
+        self.assertIn('pg_advisory_xact_lock', db.statements[0], message)
+        message = "Repositories beyond the pool size should be removed"
+        self.assertIn('positions.position > %(position_1)s',
+                      db.statements[1], message)
@@ -0,0 +1,91 @@
+import asyncio
+import types
+import unittest
+import unittest.mock
+
+from alws.utils.artifact_cache import LocalArtifactCache, set_artifact_cache
+from alws.utils.pulp_client import PulpClient
+
+
+class FakeArtifactsPulpClient(PulpClient):
+
+    def __init__(self):
+        super().__init__('http://pulp', 'user', 'password')
+        self.requests = 0
+
+    async def make_get_request(self, endpoint, params=None):
+        self.requests += 1
+        return {'count': 1,
+                'results': [{'pulp_href': f'artifact/{params["sha256"]}/'}]}
+
+
+class FakeModulesPulpClient(PulpClient):
+
+    def __init__(self):
+        super().__init__('http://pulp', 'user', 'password')
+        self.modules = []
+
+    async def make_get_request(self, endpoint, params=None):
+        return {'count': 0, 'results': []}
+
+    async def make_post_request(self, endpoint, data, headers=None):
+        if endpoint.endswith('modulemds/'):
+            self.modules.append(data)
+            return {'task': f'modulemd/{len(self.modules)}/'}
+        if endpoint.endswith('commit/'):
+            return {'task': 'artifact/'}
+        return {'pulp_href': 'upload/'}
+
+    async def make_put_request(self, endpoint, data, headers=None):
+        return {}
+
+    async def wait_for_task(self, task_href):
+        return {'created_resources': [task_href]}
+
+
+class TestArtifactCache(unittest.IsolatedAsyncioTestCase):
+
+    def tearDown(self):
+        set_artifact_cache(None)
+
+    async def test_lru_eviction(self):
+        cache = LocalArtifactCache(max_size=2)
+        await cache.set('a', 'artifact/a/')
+        await cache.set('b', 'artifact/b/')
+        await cache.get('a')
+        await cache.set('c', 'artifact/c/')
+        message = "Least recently used artifact should be evicted"
+        self.assertIsNone(await cache.get('b'), message)
+        self.assertEqual(await cache.get('a'), 'artifact/a/', message)
+
+    async def test_ttl_expiry(self):
+        cache = LocalArtifactCache(ttl=0.01)
+        await cache.set('a', 'artifact/a/')
+        await asyncio.sleep(0.02)
+        message = "Expired artifact shouldn't be returned"
+        self.assertIsNone(await cache.get('a'), message)
+
+    async def test_existence_check_is_cached(self):
+        cache = LocalArtifactCache()
+        set_artifact_cache(cache)
+        client = FakeArtifactsPulpClient()
+        for _ in range(3):
+            href = await client.check_if_artifact_exists('abc')
+        self.assertEqual(href, 'artifact/abc/')
+        message = "Pulp should be asked only once for the same sha256"
+        self.assertEqual(client.requests, 1, message)
+        self.assertEqual(cache.get_stats()['hits'], 2)
+
+    async def test_module_content_isnt_cached_as_artifact(self):
+        set_artifact_cache(LocalArtifactCache())
+        client = FakeModulesPulpClient()
+        module = types.SimpleNamespace(
+            name='nodejs', stream='12', context='abcdef', arch='x86_64')
+        with unittest.mock.patch('alws.utils.modularity.ModuleWrapper.'
+                                 'from_template', return_value=module):
+            for _ in range(2):
+                await client.create_module('document: modulemd')
+        message = "Modules of the same template should use its artifact"
+        self.assertEqual(
+            [payload['artifact'] for payload in client.modules],
+            ['artifact/', 'artifact/'], message)
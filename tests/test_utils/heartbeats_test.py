@@ -0,0 +1,54 @@
+import contextlib
+import unittest
+
+from alws.utils.heartbeats import HeartbeatFlusher, LocalHeartbeatStore
+
+
+@contextlib.asynccontextmanager
+async def fake_session():
+    yield None
+
+
+class TestHeartbeats(unittest.IsolatedAsyncioTestCase):
+
+    async def test_alive_tasks(self):
+        store = LocalHeartbeatStore()
+        await store.record([1, 2], timestamp=100.0)
+        await store.record([2, 3], timestamp=200.0)
+        message = "Only tasks pinged after given time should be alive"
+        self.assertEqual(await store.get_alive_task_ids(150.0), {2, 3},
+                         message)
+        await store.prune(150.0)
+        self.assertEqual(await store.get_alive_task_ids(0), {2, 3})
+
+    async def test_flush_in_bulk(self):
+        store = LocalHeartbeatStore()
+        saved = []
+
+        async def save(db, heartbeats):
+            saved.append(heartbeats)
+
+        flusher = HeartbeatFlusher(store, save, session_factory=fake_session)
+        for timestamp in (100.0, 110.0, 120.0):
+            await store.record(range(1000), timestamp=timestamp)
+        self.assertEqual(await flusher.flush(), 1000)
+        message = "Buffered pings should be saved with a single call"
+        self.assertEqual(len(saved), 1, message)
+        message = "Only the latest heartbeat of a task should be saved"
+        self.assertEqual(set(saved[0].values()), {120.0}, message)
+        self.assertEqual(await flusher.flush(), 0)
+
+    async def test_restore_on_failure(self):
+        store = LocalHeartbeatStore()
+
+        async def save(db, heartbeats):
+            raise ConnectionError('database is down')
+
+        flusher = HeartbeatFlusher(store, save, session_factory=fake_session)
+        await store.record([1], timestamp=100.0)
+        with self.assertRaises(ConnectionError):
+            await flusher.flush()
+        await store.record([2], timestamp=110.0)
+        message = "Heartbeats should be kept until they are saved"
+        self.assertEqual(await store.take_pending(), {1: 100.0, 2: 110.0},
+                         message)
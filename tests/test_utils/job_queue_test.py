@@ -0,0 +1,136 @@
+import asyncio
+import unittest
+
+from alws.constants import JobStatus
+from alws.utils.job_queue import (
+    JobWorkerPool,
+    LocalJobQueue,
+    RedisJobQueue,
+)
+
+
+class ExpiringKeyRedis:
+    """
+    Idempotency key expires right after SET NX fails.
+    """
+
+    def __init__(self):
+        self.values = {'alws:jobs:idempotency:key': b'old-job'}
+        self.queue = []
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            self.values.pop(key)
+            return None
+        self.values[key] = value
+        return True
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def lpush(self, key, value):
+        self.queue.append(value)
+
+
+class StaleJobsQueue(LocalJobQueue):
+
+    def __init__(self):
+        super().__init__()
+        self.requeues = 0
+
+    async def requeue_stale_jobs(self, stale_timeout: float):
+        self.requeues += 1
+
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+
+    async def test_idempotency_key(self):
+        queue = LocalJobQueue()
+        first_id = await queue.enqueue('job', {}, idempotency_key='key')
+        second_id = await queue.enqueue('job', {}, idempotency_key='key')
+        message = "Job with the same idempotency key is enqueued twice"
+        self.assertEqual(first_id, second_id, message)
+
+    async def test_retry(self):
+        queue = LocalJobQueue(max_attempts=3)
+        calls = []
+
+        async def flaky_handler(payload):
+            calls.append(payload)
+            if len(calls) < 2:
+                raise ValueError('temporary error')
+
+        workers = JobWorkerPool(queue, {'flaky': flaky_handler},
+                                concurrency=2, retry_delay=0.01,
+                                poll_timeout=0.01)
+        workers.start()
+        job_id = await queue.enqueue('flaky', {'task_id': 1})
+        await asyncio.sleep(0.2)
+        await workers.stop()
+        job = await queue.get_job(job_id)
+        message = "Failed job isn't retried"
+        self.assertEqual(job['status'], JobStatus.COMPLETED, message)
+        self.assertEqual(job['attempts'], 2, message)
+
+    async def test_failed_job(self):
+        queue = LocalJobQueue(max_attempts=2)
+
+        async def failing_handler(payload):
+            raise ValueError('permanent error')
+
+        workers = JobWorkerPool(queue, {'failing': failing_handler},
+                                retry_delay=0.01, poll_timeout=0.01)
+        workers.start()
+        job_id = await queue.enqueue('failing', {}, idempotency_key='key')
+        await asyncio.sleep(0.2)
+        await workers.stop()
+        job = await queue.get_job(job_id)
+        message = "Job isn't marked as failed after all attempts"
+        self.assertEqual(job['status'], JobStatus.FAILED, message)
+        self.assertEqual(job['error'], 'permanent error', message)
+        new_job_id = await queue.enqueue('failing', {}, idempotency_key='key')
+        message = "Failed job should be enqueued again"
+        self.assertNotEqual(job_id, new_job_id, message)
+
+    async def test_expired_idempotency_key(self):
+        queue = RedisJobQueue('redis://localhost')
+        queue._redis = ExpiringKeyRedis()
+        job_id = await queue.enqueue('job', {}, idempotency_key='key')
+        message = "Job should be enqueued if its idempotency key expired"
+        self.assertEqual(queue._redis.queue, [job_id], message)
+        self.assertEqual(
+            queue._redis.values['alws:jobs:idempotency:key'], job_id,
+            message)
+
+    async def test_stale_jobs_are_requeued_periodically(self):
+        queue = StaleJobsQueue()
+        workers = JobWorkerPool(queue, {}, poll_timeout=0.01,
+                                requeue_interval=0.01)
+        workers.start()
+        await asyncio.sleep(0.1)
+        await workers.stop()
+        message = "Stale jobs should be requeued while workers run"
+        self.assertGreater(queue.requeues, 1, message)
+
+    async def test_running_job_is_kept_alive(self):
+        queue = LocalJobQueue()
+        saved = []
+
+        async def slow_handler(payload):
+            await asyncio.sleep(0.1)
+
+        workers = JobWorkerPool(queue, {'slow': slow_handler},
+                                poll_timeout=0.01, stale_timeout=0.03)
+        original_save_job = queue.save_job
+
+        async def save_job(job):
+            saved.append(job['status'])
+            await original_save_job(job)
+
+        queue.save_job = save_job
+        workers.start()
+        await queue.enqueue('slow', {})
+        await asyncio.sleep(0.2)
+        await workers.stop()
+        message = "Running job should be saved while its handler runs"
+        self.assertGreater(saved.count(JobStatus.RUNNING), 2, message)
@@ -0,0 +1,64 @@
+import unittest
+import urllib.parse
+import uuid
+
+from alws.utils.pulp_client import (
+    MAX_HREFS_QUERY_LENGTH,
+    PulpClient,
+    iter_href_chunks,
+)
+
+
+# default request line limit of gunicorn
+MAX_REQUEST_LINE_LENGTH = 4094
+
+
+class TestHrefChunks(unittest.TestCase):
+
+    def test_chunks_fit_into_request_line(self):
+        hrefs = [
+            f'/pulp/api/v3/content/rpm/packages/'
+            f'00000000-0000-0000-0000-{index:012d}/'
+            for index in range(250)
+        ]
+        chunks = list(iter_href_chunks(hrefs, 100))
+        message = "All hrefs should be requested once"
+        self.assertEqual(sum(chunks, []), hrefs, message)
+        for chunk in chunks:
+            query = urllib.parse.urlencode({'pulp_href__in': ','.join(chunk)})
+            message = f"Query of {len(chunk)} hrefs is too long"
+            self.assertLessEqual(len(query), MAX_HREFS_QUERY_LENGTH, message)
+
+    def test_chunks_are_limited_by_count(self):
+        hrefs = [f'/{index}/' for index in range(5)]
+        chunks = list(iter_href_chunks(hrefs, 2))
+        message = "Chunk shouldn't exceed max count of hrefs"
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1], message)
+
+
+
+class TestPulpTasksQuery(unittest.IsolatedAsyncioTestCase):
+
+    async def test_tasks_query_fits_into_request_line(self):
+        task_hrefs = [f'/pulp/api/v3/tasks/{uuid.uuid4()}/'
+                      for _ in range(150)]
+        request_lines = []
+
+        async def make_get_request(endpoint, params=None):
+            request_lines.append(
+                f'GET /{endpoint}?{urllib.parse.urlencode(params)} HTTP/1.1')
+            return {'results': [
+                {'pulp_href': href, 'state': 'completed'}
+                for href in params['pulp_href__in'].split(',')
+            ]}
+
+        client = PulpClient('http://pulp', 'user', 'password')
+        client.make_get_request = make_get_request
+        tasks = await client.get_tasks(task_hrefs)
+        message = "All tasks should be fetched"
+        self.assertEqual(sorted(task['pulp_href'] for task in tasks),
+                         sorted(task_hrefs), message)
+        for request_line in request_lines:
+            message = f"Request line of {len(request_line)} bytes is too long"
+            self.assertLessEqual(len(request_line), MAX_REQUEST_LINE_LENGTH,
+                                 message)
@@ -0,0 +1,61 @@
+import asyncio
+import unittest
+
+from alws.errors import PulpTaskTimeoutError
+from alws.utils.pulp_task_waiter import PulpTaskWaiter
+
+
+class FakePulpTasks:
+
+    def __init__(self):
+        self.states = {}
+        self.requests = []
+
+    async def fetch(self, hrefs):
+        self.requests.append(list(hrefs))
+        return [{'pulp_href': href, 'state': self.states.get(href, 'running')}
+                for href in hrefs]
+
+
+class TestPulpTaskWaiter(unittest.IsolatedAsyncioTestCase):
+
+    async def test_batched_polling(self):
+        tasks = FakePulpTasks()
+        waiter = PulpTaskWaiter(tasks.fetch, min_interval=0.01)
+        hrefs = [f'/pulp/api/v3/tasks/{i}/' for i in range(50)]
+        waiting = asyncio.gather(*(waiter.wait(href) for href in hrefs))
+        await asyncio.sleep(0.05)
+        for href in hrefs:
+            tasks.states[href] = 'completed'
+        results = await asyncio.wait_for(waiting, 1)
+        message = "All tasks should be resolved"
+        self.assertEqual([task['pulp_href'] for task in results],
+                         hrefs, message)
+        message = "Every poll should request all pending tasks at once"
+        self.assertTrue(all(len(request) == 50
+                            for request in tasks.requests), message)
+        self.assertEqual(waiter.pending_count, 0)
+
+    async def test_task_timeout(self):
+        tasks = FakePulpTasks()
+        waiter = PulpTaskWaiter(tasks.fetch, min_interval=0.01)
+        with self.assertRaises(PulpTaskTimeoutError):
+            await waiter.wait('/pulp/api/v3/tasks/1/', timeout=0.05)
+        self.assertEqual(waiter.pending_count, 0)
+
+    async def test_backoff(self):
+        tasks = FakePulpTasks()
+        waiter = PulpTaskWaiter(tasks.fetch, min_interval=0.01,
+                                max_interval=0.04, backoff_factor=2)
+        with self.assertRaises(PulpTaskTimeoutError):
+            await waiter.wait('/pulp/api/v3/tasks/1/', timeout=0.3)
+        message = "Poll interval should grow while nothing finishes"
+        self.assertLess(len(tasks.requests), 15, message)
+
+    async def test_skipped_task_is_finished(self):
+        tasks = FakePulpTasks()
+        tasks.states['/pulp/api/v3/tasks/1/'] = 'skipped'
+        waiter = PulpTaskWaiter(tasks.fetch, min_interval=0.01)
+        task = await waiter.wait('/pulp/api/v3/tasks/1/', timeout=1)
+        message = "Skipped task shouldn't be polled until timeout"
+        self.assertEqual(task['state'], 'skipped', message)
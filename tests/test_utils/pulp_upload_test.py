@@ -0,0 +1,90 @@
+import hashlib
+import io
+import unittest
+
+from alws.utils.pulp_client import PulpClient, iter_content_chunks
+
+
+class FakeUploadPulpClient(PulpClient):
+
+    def __init__(self, known_sha256=None):
+        super().__init__('http://pulp', 'user', 'password')
+        self.known_sha256 = known_sha256
+        self.chunks = {}
+        self.committed = None
+        self.deleted = []
+
+    async def make_post_request(self, endpoint, data, headers=None):
+        if endpoint.endswith('commit/'):
+            self.committed = data['sha256']
+            return {'task': 'commit-task'}
+        return {'pulp_href': 'upload/'}
+
+    async def make_put_request(self, endpoint, data, headers=None):
+        start = int(headers['Content-Range'].split()[1].split('-')[0])
+        self.chunks[start] = data['file'].read()
+        return {}
+
+    async def make_delete_request(self, endpoint):
+        self.deleted.append(endpoint)
+
+    async def wait_for_task(self, task_href):
+        return {'created_resources': ['artifact/']}
+
+    async def check_if_artifact_exists(self, sha256):
+        if sha256 == self.known_sha256:
+            return 'known-artifact/'
+
+
+async def as_async_iterable(parts):
+    for part in parts:
+        yield part
+
+
+class TestPulpUpload(unittest.IsolatedAsyncioTestCase):
+
+    async def test_iter_content_chunks(self):
+        parts = [b'ab', b'cdefg', b'', b'hij']
+        chunks = [chunk async for chunk in
+                  iter_content_chunks(as_async_iterable(parts), 4)]
+        message = "Async iterable should be re-chunked"
+        self.assertEqual(chunks, [b'abcd', b'efgh', b'ij'], message)
+        chunks = [chunk async for chunk in
+                  iter_content_chunks(io.BytesIO(b'abcdefghij'), 4)]
+        message = "File object should be read in chunks"
+        self.assertEqual(chunks, [b'abcd', b'efgh', b'ij'], message)
+
+    async def test_chunked_upload(self):
+        content = bytes(range(256)) * 100
+        client = FakeUploadPulpClient()
+        href, sha256 = await client.upload_file(
+            io.BytesIO(content), chunk_size=1000, concurrency=3)
+        message = "Content should be uploaded with all chunks"
+        self.assertEqual(b''.join(
+            client.chunks[start] for start in sorted(client.chunks)),
+            content, message)
+        self.assertEqual(len(client.chunks), 26)
+        message = "sha256 should be computed while streaming"
+        self.assertEqual(sha256, hashlib.sha256(content).hexdigest(), message)
+        self.assertEqual(client.committed, sha256, message)
+        self.assertEqual(href, 'artifact/')
+
+    async def test_known_stream_is_not_committed(self):
+        content = b'modules' * 10
+        sha256 = hashlib.sha256(content).hexdigest()
+        client = FakeUploadPulpClient(known_sha256=sha256)
+        href, _ = await client.upload_file(
+            as_async_iterable([content]), size=len(content))
+        message = "Existing artifact should be reused"
+        self.assertEqual(href, 'known-artifact/', message)
+        self.assertIsNone(client.committed, message)
+        self.assertEqual(client.deleted, ['upload/'])
+
+    async def test_known_string_is_not_uploaded(self):
+        content = 'document: modulemd'
+        sha256 = hashlib.sha256(content.encode()).hexdigest()
+        client = FakeUploadPulpClient(known_sha256=sha256)
+        href, _ = await client.upload_file(content)
+        message = "In-memory content should be checked before upload"
+        self.assertEqual(href, 'known-artifact/', message)
+        self.assertEqual(client.chunks, {}, message)
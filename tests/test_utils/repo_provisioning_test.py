@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+
+from alws.utils.repo_provisioning import (
+    RepositoryProvisioner,
+    RepositoryRequest,
+)
+
+
+class FakePulpClient:
+
+    def __init__(self):
+        self.lookups = []
+        self.distros = {}
+
+    async def _request(self):
+        await asyncio.sleep(0.01)
+
+    async def make_post_request(self, endpoint: str, data: dict):
+        await self._request()
+        if 'repositories' in endpoint:
+            return {'pulp_href': f'{endpoint}{data["name"]}/'}
+        if 'distributions' in endpoint:
+            href = f'{endpoint}{data["name"]}/'
+            self.distros[href] = {'base_url': f'http://pulp/{data["base_path"]}'}
+            return {'task': href}
+        return {'task': f'{endpoint}{data["repository"]}'}
+
+    async def wait_for_task(self, task_href: str):
+        await self._request()
+        return {'created_resources': [task_href]}
+
+    async def get_by_hrefs(self, endpoint: str, hrefs):
+        self.lookups.append(endpoint)
+        return {href: self.distros[href] for href in hrefs}
+
+
+class TestRepositoryProvisioner(unittest.IsolatedAsyncioTestCase):
+
+    async def test_provision(self):
+        provisioner = RepositoryProvisioner('http://pulp', 'user', 'password',
+                                            concurrency=3)
+        fake_client = FakePulpClient()
+        provisioner._pulp_client = fake_client
+        requests = [
+            RepositoryRequest(name=f'repo-{i}') for i in range(5)
+        ] + [
+            RepositoryRequest(name='logs', content_type='file',
+                              base_path_start='build_logs'),
+        ]
+        created = await provisioner.provision(requests)
+        message = "Repositories should be returned in order of requests"
+        self.assertEqual(
+            [url for url, _ in created],
+            [f'http://pulp/builds/repo-{i}' for i in range(5)] +
+            ['http://pulp/build_logs/logs'],
+            message
+        )
+        message = "Distributions should be fetched once per repository type"
+        self.assertEqual(len(fake_client.lookups), 2, message)
@@ -0,0 +1,53 @@
+import unittest
+
+from alws.utils.scheduling import (
+    FairSharePolicy,
+    FifoPolicy,
+    PriorityPolicy,
+    ReadyTask,
+)
+
+
+def make_task(task_id, user_id=1, priority=0, build_id=1):
+    return ReadyTask(task_id=task_id, arch='x86_64', priority=priority,
+                     build_id=build_id, user_id=user_id, platform_id=1)
+
+
+class TestSchedulingPolicies(unittest.TestCase):
+
+    def setUp(self):
+        # large build of the first user is submitted before the others
+        self.ready = [make_task(i, user_id=1) for i in range(1, 301)]
+        self.ready += [
+            make_task(301, user_id=2, build_id=2),
+            make_task(302, user_id=3, build_id=3, priority=5),
+        ]
+
+    def test_fifo(self):
+        message = "FIFO policy should take the oldest task"
+        task = FifoPolicy().pick(self.ready, {})
+        self.assertEqual(task.task_id, 1, message)
+
+    def test_priority(self):
+        message = "Priority policy should take the task with top priority"
+        task = PriorityPolicy().pick(self.ready, {})
+        self.assertEqual(task.task_id, 302, message)
+
+    def test_fair_share(self):
+        policy = FairSharePolicy(group_key='user_id')
+        task = policy.pick(self.ready, {1: 10, 3: 1})
+        message = "Fair share should prefer user without running tasks"
+        self.assertEqual(task.task_id, 301, message)
+        task = policy.pick(self.ready, {1: 10, 2: 1, 3: 1})
+        message = "Priority should break ties between equal shares"
+        self.assertEqual(task.task_id, 302, message)
+
+    def test_fair_share_weights(self):
+        policy = FairSharePolicy(group_key='user_id', weights={1: 20.0})
+        task = policy.pick(self.ready, {1: 10, 2: 1, 3: 1})
+        message = "Weighted group should get more running tasks"
+        self.assertEqual(task.task_id, 1, message)
+
+    def test_unknown_group(self):
+        with self.assertRaises(ValueError):
+            FairSharePolicy(group_key='arch_id')
@@ -0,0 +1,34 @@
+import asyncio
+import unittest
+
+from alws.utils.task_notifier import TaskNotifier
+
+
+class TestTaskNotifier(unittest.IsolatedAsyncioTestCase):
+
+    async def test_notify_matching_arch(self):
+        notifier = TaskNotifier()
+        with notifier.subscribe(['x86_64', 'i686']) as x86_ready, \
+                notifier.subscribe(['aarch64']) as arm_ready:
+            await notifier.notify(['i686'])
+            message = "Waiter for notified arch should be woken"
+            self.assertTrue(x86_ready.is_set(), message)
+            message = "Waiter for other arches shouldn't be woken"
+            self.assertFalse(arm_ready.is_set(), message)
+            self.assertEqual(notifier.waiters_count, 2)
+        message = "Waiters should be removed on unsubscribe"
+        self.assertEqual(notifier.waiters_count, 0, message)
+
+    async def test_wake_waiting_request(self):
+        notifier = TaskNotifier()
+
+        async def wait_for_task():
+            with notifier.subscribe(['ppc64le']) as ready:
+                await asyncio.wait_for(ready.wait(), 1)
+                return True
+
+        waiting = asyncio.ensure_future(wait_for_task())
+        await asyncio.sleep(0)
+        await notifier.notify(['ppc64le'])
+        message = "Waiting request should be woken by notification"
+        self.assertTrue(await waiting, message)